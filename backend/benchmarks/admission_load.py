@@ -0,0 +1,201 @@
+"""Load test for admission control: open-loop traffic past saturation.
+
+Starts one uvicorn worker on the synthetic corpus's trained model and the
+in-memory database, then offers each request rate for a fixed time, as
+Poisson arrivals that do not wait for earlier responses: a mix of
+``POST /journal`` and ``POST /analyze-sentiment`` from many users. With
+admission control, latency of admitted requests should stay bounded as
+load grows, while the excess is shed with 503 and creates are scored with
+the lexicon instead; ``--no-admission`` serves the same load without limits
+for comparison. Per-user rate limits are off, as in the benchmark suite,
+so every rejection comes from a concurrency limit. From the backend
+directory::
+
+    python -m benchmarks.admission_load --rates 50 100 200 400 --seconds 10
+    python -m benchmarks.admission_load --rates 50 100 200 400 --seconds 10 --no-admission
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Tuple
+from urllib.parse import urlencode
+
+import jwt
+
+from benchmarks.live_load import _free_port, _percentile, _wait_for_server
+from benchmarks.run import BACKEND_DIR, configure_environment
+
+ADMISSION_COUNTERS = ("shed", "timed_out", "degraded")
+
+
+def serve(port: int):
+    """Run the app on the in-memory database; the parent configured the environment"""
+    import uvicorn
+
+    from benchmarks.fake_db import FakeSupabase
+    from core.database import db
+    import main
+
+    FakeSupabase().install(db)
+    uvicorn.run(main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+class _Client:
+    """Bare keep-alive HTTP/1.1 client.
+
+    httpx spends more CPU per request than the endpoints under test, so on
+    a small machine it, not the server, would set the offered load.
+    """
+
+    def __init__(self, port: int):
+        self.port = port
+        self._idle = []
+
+    async def request(self, method: str, target: str, headers: Dict[str, str], body: bytes = b"") -> Tuple[int, bytes]:
+        reader, writer = self._idle.pop() if self._idle else await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            lines = [f"{method} {target} HTTP/1.1", "Host: 127.0.0.1", f"Content-Length: {len(body)}"]
+            lines += [f"{name}: {value}" for name, value in headers.items()]
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+            head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+            length = next(int(line.split(":", 1)[1]) for line in head if line.lower().startswith("content-length:"))
+            content = await reader.readexactly(length)
+        except BaseException:
+            writer.close()
+            raise
+        self._idle.append((reader, writer))
+        return int(head[0].split(" ", 2)[1]), content
+
+    def close(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+async def _admission_counters(client: _Client) -> Dict[str, float]:
+    _, content = await client.request("GET", "/metrics", {})
+    counters = {}
+    for line in content.decode().splitlines():
+        name, _, value = line.partition(" ")
+        for counter in ADMISSION_COUNTERS:
+            if name == f"sentiment_journal_admission_inference_{counter}":
+                counters[counter] = float(value)
+    return counters
+
+
+async def _run_level(port: int, tokens, texts, rate: float, seconds: float, create_share: float, seed: int):
+    rng = random.Random(seed)
+    latencies: Dict[object, list] = {}
+    client = _Client(port)
+    before = await _admission_counters(client)
+
+    async def request(index: int):
+        headers = {"Authorization": f"Bearer {tokens[index % len(tokens)]}"}
+        text = texts[index % len(texts)]
+        started = time.perf_counter()
+        try:
+            if rng.random() < create_share:
+                body = json.dumps({"content": text}).encode()
+                status, _ = await client.request("POST", "/journal", {**headers, "Content-Type": "application/json"}, body)
+            else:
+                status, _ = await client.request("POST", f"/analyze-sentiment?{urlencode({'text': text})}", headers)
+        except (OSError, asyncio.IncompleteReadError):
+            status = "error"
+        latencies.setdefault(status, []).append(time.perf_counter() - started)
+
+    # Arrivals follow a fixed schedule, so a slow server cannot slow the load down
+    tasks = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    next_arrival = started
+    while next_arrival < started + seconds:
+        await asyncio.sleep(next_arrival - loop.time())
+        tasks.append(asyncio.create_task(request(len(tasks))))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    after = await _admission_counters(client)
+    client.close()
+    return len(tasks), latencies, {name: after.get(name, 0) - before.get(name, 0) for name in ADMISSION_COUNTERS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Admission control load test")
+    parser.add_argument("--rates", type=float, nargs="+", default=[50, 100, 200, 400], help="Offered requests per second")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Time per offered rate")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--create-share", type=float, default=0.5, help="Fraction of requests that create entries")
+    parser.add_argument("--no-admission", action="store_true", help="Serve without concurrency limits")
+    parser.add_argument("--size", type=int, default=2000, help="Entries the served model is trained on")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve is not None:
+        serve(args.serve)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="sentiment-journal-admission-")
+    if args.no_admission:
+        for limit in ("MAX_IN_FLIGHT", "INFERENCE_CONCURRENCY", "TRAINING_CONCURRENCY", "STATS_CONCURRENCY"):
+            os.environ[f"ADMISSION_{limit}"] = "0"
+    configure_environment(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+
+    from benchmarks.corpus import make_entries, make_texts
+    from core import config
+    from services.sentiment import sentiment_analyzer
+    result = sentiment_analyzer.train_model(make_entries(args.size, args.seed))
+    if result["status"] != "success":
+        raise RuntimeError(f"Could not train the served model: {result}")
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.admission_load", "--serve", str(port)],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))},
+        cwd=workdir
+    )
+    now = int(time.time())
+    tokens = [
+        jwt.encode({"sub": f"load-{i}", "aud": "authenticated", "exp": now + 3600}, config.SUPABASE_JWT_SECRET, algorithm="HS256")
+        for i in range(args.users)
+    ]
+    texts = make_texts(1000, args.seed + 1)
+    try:
+        asyncio.run(_wait_for_server(port))
+        print(
+            f"in flight {config.ADMISSION_MAX_IN_FLIGHT or 'unlimited'}, "
+            f"inference concurrency {config.ADMISSION_INFERENCE_CONCURRENCY or 'unlimited'}, "
+            f"queue {config.ADMISSION_INFERENCE_QUEUE}, wait {config.ADMISSION_INFERENCE_WAIT_MS:.0f} ms, "
+            f"inference workers {config.INFERENCE_WORKERS}"
+        )
+        print(
+            f"{'offered/s':>9} {'sent/s':>7} {'ok/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+            f"{'503':>6} {'503 p99':>8} {'429':>6} {'degraded':>8} {'other':>6}"
+        )
+        for rate in args.rates:
+            sent, latencies, counters = asyncio.run(_run_level(
+                port, tokens, texts, rate, args.seconds, args.create_share, args.seed
+            ))
+            ok, shed = latencies.get(200, []), latencies.get(503, [])
+            other = sum(len(values) for status, values in latencies.items() if status not in (200, 429, 503))
+            print(
+                f"{rate:9.0f} {sent / args.seconds:7.1f} {len(ok) / args.seconds:7.1f} "
+                f"{_percentile(ok, 0.5) * 1000:8.1f} {_percentile(ok, 0.95) * 1000:8.1f} "
+                f"{_percentile(ok, 0.99) * 1000:8.1f} {max(ok, default=float('nan')) * 1000:8.1f} "
+                f"{len(shed):6d} {_percentile(shed, 0.99) * 1000:8.1f} {len(latencies.get(429, [])):6d} "
+                f"{counters['degraded']:8.0f} {other:6d}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,641 @@
+"""Benchmark cases. Importing this module registers them."""
+import itertools
+import json
+import os
+import tempfile
+
+from benchmarks.context import USER_ID, WRITER_ID, newest_first
+from benchmarks.harness import case
+
+BATCH = 100
+# Entries per user in the search index cases
+SEARCH_ENTRIES = 50000
+SEARCH_QUERIES = ["work meeting", "happy", "family dinner", "tired project", "calm morning walk", "anxious"]
+# Sentences in the live scoring draft
+LIVE_SENTENCES = 40
+# Years of history in the analytics cases
+ANALYTICS_YEARS = 5
+ANALYTICS_POINTS = 200
+# Texts in the largest bulk inference case
+BULK_TEXTS = 100000
+# Entries per upload in the import case
+IMPORT_ENTRIES = 5000
+# Database round trip in the concurrent request cases, like a nearby PostgREST
+CONCURRENT_DB_LATENCY = 0.005
+GOLDEN_POLARITY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden_polarity.jsonl")
+
+
+# Preprocessing
+
+@case("preprocess.single", "preprocess")
+def preprocess_single(ctx):
+    counter = itertools.count()
+    return lambda: ctx.analyzer.preprocess_text(ctx.text(next(counter)))
+
+
+@case("preprocess.corpus", "preprocess", items=lambda ctx: ctx.size)
+def preprocess_corpus(ctx):
+    texts = [entry["content"] for entry in ctx.entries]
+    return lambda: list(ctx.analyzer.preprocess_many(texts))
+
+
+# Vectorizing
+
+@case("vectorize.batch", "vectorize", items=lambda ctx: BATCH)
+def vectorize_batch(ctx):
+    processed = list(ctx.analyzer.preprocess_many(ctx.texts[:BATCH]))
+    return lambda: ctx.analyzer.vectorizer.transform(processed)
+
+
+# Polarity
+
+def check_golden_polarity(scorer, path: str = GOLDEN_POLARITY):
+    """Fail if the lexicon scorer drifts from the recorded TextBlob scores"""
+    from services.polarity import TOLERANCE
+    with open(path) as f:
+        golden = [json.loads(line) for line in f if line.strip()]
+    texts = [row["text"] for row in golden]
+    batch = scorer.polarity_many(texts)
+    for row, scored in zip(golden, batch):
+        for value in (scored, scorer.polarity(row["text"])):
+            if abs(value - row["polarity"]) > TOLERANCE:
+                raise AssertionError(f"polarity {value} != TextBlob {row['polarity']} for {row['text']!r}")
+
+
+@case("polarity.lexicon_batch", "polarity", items=lambda ctx: BATCH)
+def polarity_lexicon_batch(ctx):
+    from services.polarity import polarity_scorer
+    check_golden_polarity(polarity_scorer)
+    texts = ctx.texts[:BATCH]
+    return lambda: polarity_scorer.polarity_many(texts)
+
+
+@case("polarity.lexicon_single", "polarity")
+def polarity_lexicon_single(ctx):
+    from services.polarity import polarity_scorer
+    counter = itertools.count()
+    return lambda: polarity_scorer.polarity(ctx.text(next(counter)))
+
+
+@case("polarity.textblob_batch", "polarity", items=lambda ctx: BATCH)
+def polarity_textblob_batch(ctx):
+    from textblob import TextBlob
+    texts = ctx.texts[:BATCH]
+    return lambda: [TextBlob(text).sentiment.polarity for text in texts]
+
+
+# Training
+
+@case("train.model", "train", items=lambda ctx: ctx.size, max_iterations=3)
+def train_model(ctx):
+    from services.sentiment import SentimentAnalyzer
+    directory = tempfile.mkdtemp(prefix="train-", dir=os.getcwd())
+    analyzer = SentimentAnalyzer(
+        bundle_path=os.path.join(directory, "sentiment_model.bundle"),
+        model_path=os.path.join(directory, "sentiment_model.pkl"),
+        vectorizer_path=os.path.join(directory, "vectorizer.pkl")
+    )
+    return lambda: analyzer.train_model(ctx.entries)
+
+
+def _online_analyzer(prefix: str):
+    from services.sentiment import OnlineSentimentAnalyzer
+    directory = tempfile.mkdtemp(prefix=prefix, dir=os.getcwd())
+    return OnlineSentimentAnalyzer(bundle_path=os.path.join(directory, "sentiment_model.bundle"))
+
+
+@case("train.online_model", "train", items=lambda ctx: ctx.size, max_iterations=3)
+def train_online_model(ctx):
+    analyzer = _online_analyzer("train-online-")
+    return lambda: analyzer.train_model(ctx.entries)
+
+
+@case("train.online_update", "train")
+def train_online_update(ctx):
+    """Learning from one new entry, as after POST /journal"""
+    analyzer = _online_analyzer("update-online-")
+    analyzer.train_model(ctx.entries)
+    counter = itertools.count()
+    return lambda: analyzer.partial_update([ctx.entries[next(counter) % ctx.size]])
+
+
+@case("train.online_checkpoint", "train", max_iterations=10)
+def train_online_checkpoint(ctx):
+    analyzer = _online_analyzer("checkpoint-online-")
+    analyzer.train_model(ctx.entries)
+    return analyzer.save_model
+
+
+# Model loading
+
+def _saved_models(ctx):
+    """Paths of the context's model saved once as a bundle and once as legacy pickles"""
+    if not hasattr(ctx, "saved_models"):
+        import pickle
+        from services.model_artifacts import save_bundle
+        directory = tempfile.mkdtemp(prefix="load-", dir=os.getcwd())
+        missing = os.path.join(directory, "missing")
+        bundle = {"bundle_path": os.path.join(directory, "sentiment_model.bundle"),
+                  "model_path": missing, "vectorizer_path": missing}
+        pickles = {"bundle_path": missing, "model_path": os.path.join(directory, "sentiment_model.pkl"),
+                   "vectorizer_path": os.path.join(directory, "vectorizer.pkl")}
+        save_bundle(bundle["bundle_path"], ctx.analyzer.vectorizer, ctx.analyzer.model, ctx.analyzer.bundle_metadata())
+        with open(pickles["model_path"], "wb") as f:
+            pickle.dump(ctx.analyzer.model, f)
+        with open(pickles["vectorizer_path"], "wb") as f:
+            pickle.dump(ctx.analyzer.vectorizer, f)
+        ctx.saved_models = {"bundle": bundle, "pickles": pickles}
+    return ctx.saved_models
+
+
+def _load(ctx, kind: str):
+    """Time ``load_model``; report RSS after one load in a fresh interpreter"""
+    from benchmarks.model_load import measure_rss
+    from services.sentiment import SentimentAnalyzer
+    paths = _saved_models(ctx)[kind]
+
+    def run():
+        analyzer = SentimentAnalyzer(**paths)
+        assert analyzer.load_model()
+        return analyzer
+    run.metrics = lambda: measure_rss(paths["bundle_path"], paths["model_path"], paths["vectorizer_path"])
+    return run
+
+
+@case("models.load_bundle", "models", max_iterations=50)
+def models_load_bundle(ctx):
+    return _load(ctx, "bundle")
+
+
+@case("models.load_pickles", "models", max_iterations=50)
+def models_load_pickles(ctx):
+    return _load(ctx, "pickles")
+
+
+# Inference
+
+@case("inference.single", "inference")
+def inference_single(ctx):
+    counter = itertools.count()
+    return lambda: ctx.analyzer.predict_sentiment(ctx.text(next(counter)))
+
+
+@case("inference.batch", "inference", items=lambda ctx: BATCH)
+def inference_batch(ctx):
+    texts = ctx.texts[:BATCH]
+    return lambda: ctx.analyzer.predict_batch(texts)
+
+
+def _bulk_texts(ctx, count: int):
+    """Synthetic texts for the bulk inference cases, built once per run"""
+    if not hasattr(ctx, "bulk_texts"):
+        from benchmarks.corpus import make_texts
+        ctx.bulk_texts = make_texts(BULK_TEXTS, ctx.seed + 4)
+    return ctx.bulk_texts[:count]
+
+
+def _per_item(ctx, count: int):
+    texts = _bulk_texts(ctx, count)
+    return lambda: [ctx.analyzer.predict_sentiment(text) for text in texts]
+
+
+def _batched(ctx, count: int):
+    texts = _bulk_texts(ctx, count)
+    return lambda: ctx.analyzer.predict_batch(texts)
+
+
+# Batched throughput at each size against scoring the same texts one call at a
+# time; per-item cost does not depend on the count, so that is timed at 1k only
+@case("inference.bulk_per_item_1k", "inference", items=lambda ctx: 1000, max_iterations=5)
+def inference_bulk_per_item_1k(ctx):
+    return _per_item(ctx, 1000)
+
+
+@case("inference.bulk_batch_1k", "inference", items=lambda ctx: 1000, max_iterations=5)
+def inference_bulk_batch_1k(ctx):
+    return _batched(ctx, 1000)
+
+
+@case("inference.bulk_batch_10k", "inference", items=lambda ctx: 10000, max_iterations=3)
+def inference_bulk_batch_10k(ctx):
+    return _batched(ctx, 10000)
+
+
+@case("inference.bulk_batch_100k", "inference", items=lambda ctx: 100000, max_iterations=1)
+def inference_bulk_batch_100k(ctx):
+    return _batched(ctx, 100000)
+
+
+# Insights
+
+@case("insights.aggregate_build", "insights", items=lambda ctx: ctx.size)
+def insights_aggregate_build(ctx):
+    from services.stats_store import UserAggregate
+    return lambda: UserAggregate.from_entries(ctx.rows).to_insights()
+
+
+@case("insights.aggregate_read", "insights")
+def insights_aggregate_read(ctx):
+    from services.stats_store import UserAggregate
+    aggregate = UserAggregate.from_entries(ctx.rows)
+    return lambda: (aggregate.to_stats(), aggregate.to_insights())
+
+
+@case("insights.full_scan", "insights", items=lambda ctx: ctx.size)
+def insights_full_scan(ctx):
+    rows = newest_first(ctx.rows)
+    return lambda: ctx.analyzer.get_sentiment_insights(rows)
+
+
+# Full request path
+
+def _get(ctx, url):
+    headers = ctx.headers()
+
+    def run():
+        response = ctx.client.get(url, headers=headers)
+        assert response.status_code == 200, response.text
+        return response
+    return run
+
+
+@case("api.create_journal", "api")
+def api_create_journal(ctx):
+    headers = ctx.headers(WRITER_ID)
+    counter = itertools.count()
+
+    def run():
+        response = ctx.client.post("/journal", json={"content": ctx.text(next(counter))}, headers=headers)
+        assert response.status_code == 200, response.text
+    return run
+
+
+@case("api.list_journals", "api", items=lambda ctx: 50)
+def api_list_journals(ctx):
+    return _get(ctx, "/journals?limit=50")
+
+
+@case("api.list_journals_deep", "api", items=lambda ctx: 50)
+def api_list_journals_deep(ctx):
+    from services.journal_queries import encode_cursor
+    # Keyset cursor for a page in the middle of the journal
+    rows = sorted(ctx.fake.rows_by_user[USER_ID].values(), key=lambda r: (r["created_at"], r["id"]), reverse=True)
+    row = rows[len(rows) // 2]
+    return _get(ctx, f"/journals?limit=50&cursor={encode_cursor(row)}")
+
+
+@case("api.list_journals_previews", "api", items=lambda ctx: 50)
+def api_list_journals_previews(ctx):
+    return _get(ctx, "/journals?limit=50&fields=title,content,sentiment&content_length=120")
+
+
+@case("api.stats", "api")
+def api_stats(ctx):
+    return _get(ctx, "/stats")
+
+
+@case("api.insights", "api")
+def api_insights(ctx):
+    return _get(ctx, "/insights")
+
+
+@case("api.stats_not_modified", "api")
+def api_stats_not_modified(ctx):
+    etag = _get(ctx, "/stats")().headers["etag"]
+    headers = {**ctx.headers(), "If-None-Match": etag}
+
+    def run():
+        response = ctx.client.get("/stats", headers=headers)
+        assert response.status_code == 304, response.text
+    return run
+
+
+@case("api.analyze_batch", "api", items=lambda ctx: BATCH)
+def api_analyze_batch(ctx):
+    texts = ctx.texts[:BATCH]
+    headers = ctx.headers()
+
+    def run():
+        response = ctx.client.post("/analyze-sentiment/batch", json={"texts": texts}, headers=headers)
+        assert response.status_code == 200, response.text
+    return run
+
+
+@case("api.search", "api", items=lambda ctx: 10)
+def api_search(ctx):
+    return _get(ctx, "/journals/search?q=work%20meeting&limit=10")
+
+
+@case("api.export_ndjson", "api", items=lambda ctx: ctx.size, max_iterations=10)
+def api_export_ndjson(ctx):
+    return _get(ctx, "/journals/export?format=ndjson")
+
+
+@case("api.import_ndjson", "api", items=lambda ctx: IMPORT_ENTRIES, max_iterations=5)
+def api_import_ndjson(ctx):
+    """Parse, score and insert an upload chunk by chunk; reports entries/sec"""
+    upload = "".join(
+        json.dumps({"content": ctx.text(i)}) + "\n" for i in range(IMPORT_ENTRIES)
+    ).encode("utf-8")
+    headers = ctx.headers(WRITER_ID)
+
+    def run():
+        response = ctx.client.post(
+            "/journals/import?format=ndjson", files={"file": ("entries.ndjson", upload)}, headers=headers
+        )
+        assert response.status_code == 200, response.text
+        assert response.json()["imported"] == IMPORT_ENTRIES, response.json()["failed"]
+    return run
+
+
+def _concurrent(ctx, url, clients: int):
+    """``clients`` simultaneous GETs, each database call taking CONCURRENT_DB_LATENCY.
+
+    The requests are sent together on the app's own event loop. If none of
+    them blocks the loop, their round trips overlap and the wave takes one
+    round trip plus the requests' CPU time, rather than ``clients`` round trips.
+    """
+    import asyncio
+    import httpx
+    import main
+    headers = ctx.headers()
+    portal = ctx.client.portal
+
+    async def wave():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            responses = await asyncio.gather(*(client.get(url, headers=headers) for _ in range(clients)))
+        for response in responses:
+            assert response.status_code == 200, response.text
+
+    def run():
+        ctx.fake.latency = CONCURRENT_DB_LATENCY
+        try:
+            portal.call(wave)
+        finally:
+            ctx.fake.latency = 0.0
+    return run
+
+
+def _entry_url(ctx):
+    return f"/journal/{ctx.rows[0]['id']}"
+
+
+@case("api.concurrent_1", "api")
+def api_concurrent_1(ctx):
+    return _concurrent(ctx, _entry_url(ctx), 1)
+
+
+@case("api.concurrent_10", "api", items=lambda ctx: 10)
+def api_concurrent_10(ctx):
+    return _concurrent(ctx, _entry_url(ctx), 10)
+
+
+@case("api.concurrent_100", "api", items=lambda ctx: 100)
+def api_concurrent_100(ctx):
+    return _concurrent(ctx, _entry_url(ctx), 100)
+
+
+# Search
+
+def _search_terms(ctx):
+    """Preprocessed synthetic entries for the search cases, built once per run"""
+    if not hasattr(ctx, "search_terms"):
+        from benchmarks.corpus import make_entries
+        entries = make_entries(SEARCH_ENTRIES, ctx.seed + 2)
+        ctx.search_terms = [ctx.analyzer.preprocess_text(entry["content"]) for entry in entries]
+    return ctx.search_terms
+
+
+def _user_index(ctx):
+    from services.search_index import UserIndex
+    index = UserIndex(built_at=0.0)
+    for entry_id, terms in enumerate(_search_terms(ctx), start=1):
+        index.upsert(entry_id, terms)
+    index.compact()
+    return index
+
+
+@case("search.keyword", "search")
+def search_keyword(ctx):
+    index = _user_index(ctx)
+    queries = itertools.cycle([ctx.analyzer.preprocess_text(query).split() for query in SEARCH_QUERIES])
+    return lambda: index.search(next(queries), 10)
+
+
+@case("search.similar", "search")
+def search_similar(ctx):
+    index = _user_index(ctx)
+    entry_ids = itertools.cycle(range(1, SEARCH_ENTRIES + 1, 997))
+    return lambda: index.similar(next(entry_ids), 10)
+
+
+@case("search.write_then_query", "search")
+def search_write_then_query(ctx):
+    """Edit an entry, then search: exercises the uncompacted recent writes"""
+    index = _user_index(ctx)
+    terms = _search_terms(ctx)
+    counter = itertools.count()
+    query = ctx.analyzer.preprocess_text(SEARCH_QUERIES[0]).split()
+
+    def run():
+        entry_id = next(counter) % SEARCH_ENTRIES + 1
+        index.upsert(entry_id, terms[-entry_id])
+        return index.search(query, 10)
+    return run
+
+
+@case("search.load", "search", items=lambda ctx: SEARCH_ENTRIES, max_iterations=3)
+def search_load(ctx):
+    """Load a user's index from the SQLite store, as on a worker's first search"""
+    from services.search_index import SearchIndex
+    from services.sentiment import sentiment_analyzer
+    store = SearchIndex(os.path.join(tempfile.mkdtemp(prefix="search-", dir=os.getcwd()), "search.db"), sentiment_analyzer)
+    from core.sqlite import connect
+    with connect(store.path) as conn:
+        conn.execute("INSERT INTO search_users (user_id, seq, built_at) VALUES (?, 0, 1.0)", (USER_ID,))
+        conn.executemany(
+            "INSERT INTO search_entries (user_id, entry_id, seq, terms) VALUES (?, ?, 0, ?)",
+            [(USER_ID, entry_id, terms) for entry_id, terms in enumerate(_search_terms(ctx), start=1)]
+        )
+    return lambda: store._load(USER_ID)
+
+
+# Live scoring
+
+def check_live_segments(analyzer, texts, drafts: int = 500, seed: int = 0):
+    """Fail if a segmented draft's preprocessing or polarity differs from the whole draft's"""
+    import random
+    from services.live_scoring import DraftSession
+    from services.polarity import polarity_scorer
+    rng = random.Random(seed)
+    separators = [" ", "  ", "\n", "\n\n", " \n\n ", "\r\n\r\n", "\t"]
+    for _ in range(drafts):
+        draft = "".join(rng.choice(texts) + rng.choice(separators) for _ in range(rng.randint(1, 8)))
+        if rng.random() < 0.2:
+            # Emoticons written across a would-be sentence break
+            draft = draft.replace(". ", ". O ").replace("!", "o.O !")
+        processed, polarity, _, _ = DraftSession("check").prepare(draft, analyzer)
+        assert processed == analyzer.preprocess_text(draft), draft
+        assert polarity == polarity_scorer.polarity(draft), draft
+
+
+def _live_draft(ctx):
+    return " ".join(ctx.text(i).rstrip(".") + "." for i in range(LIVE_SENTENCES))
+
+
+@case("live.edit_rescore", "live")
+def live_edit_rescore(ctx):
+    """Rewrite one sentence of a long draft and rescore it, as an editing session does"""
+    from services.live_scoring import DraftSession
+    check_live_segments(ctx.analyzer, ctx.texts)
+    draft = _live_draft(ctx)
+    session = DraftSession(USER_ID)
+    session.apply({"type": "replace", "text": draft})
+    session.prepare(session.text, ctx.analyzer)
+    counter = itertools.count()
+
+    def run():
+        n = next(counter)
+        session.apply({"type": "replace", "text": draft + f" Edit {n} felt {'good' if n % 2 else 'bad'}."})
+        processed, polarity, _, _ = session.prepare(session.text, ctx.analyzer)
+        return ctx.analyzer.predict_prepared([processed], [polarity])
+    return run
+
+
+@case("live.full_rescore", "live")
+def live_full_rescore(ctx):
+    """The same update scored from scratch, as repeated POST /analyze-sentiment calls are"""
+    draft = _live_draft(ctx)
+    counter = itertools.count()
+
+    def run():
+        n = next(counter)
+        return ctx.analyzer.predict_batch([draft + f" Edit {n} felt {'good' if n % 2 else 'bad'}."])
+    return run
+
+
+# Analytics
+
+def _history(ctx):
+    if not hasattr(ctx, "history"):
+        from benchmarks.corpus import make_history
+        ctx.history = make_history(ANALYTICS_YEARS, ctx.seed + 3)
+    return ctx.history
+
+
+def reference_timeseries(rows, bucket: str, window: int):
+    """Plain-Python per-bucket statistics to check the vectorized version against"""
+    from datetime import datetime, timedelta
+    from services.sentiment import LABELS
+
+    def start_of(day):
+        if bucket == "week":
+            return day - timedelta(days=day.weekday())
+        return day.replace(day=1) if bucket == "month" else day
+
+    def ordinal(start):
+        if bucket == "month":
+            return start.year * 12 + start.month
+        return start.toordinal() // 7 if bucket == "week" else start.toordinal()
+
+    groups = {}
+    for row in rows:
+        day = datetime.fromisoformat(row["created_at"]).date()
+        groups.setdefault(start_of(day), []).append(row)
+    buckets = []
+    for start in sorted(groups):
+        values = [row["sentiment"] for row in groups[start]]
+        recent = [
+            row["sentiment"] for other, members in groups.items()
+            if 0 <= ordinal(start) - ordinal(other) < window for row in members
+        ]
+        buckets.append({
+            "start": start.isoformat(),
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "min": min(values),
+            "max": max(values),
+            "labels": {label: sum(row["mood_category"] == label for row in groups[start]) for label in LABELS},
+            "rolling_mean": sum(recent) / len(recent),
+        })
+    return buckets
+
+
+def check_timeseries(rows, window: int = 7):
+    """Fail if the vectorized buckets differ from the reference, or LTTB misbehaves"""
+    import numpy as np
+    from services.analytics import Series, lttb, timeseries
+    series = Series.from_rows(rows)
+    for bucket in ("day", "week", "month"):
+        buckets, downsampled = timeseries(series, bucket, window)
+        expected = reference_timeseries(rows, bucket, window)
+        assert not downsampled and len(buckets) == len(expected), (bucket, len(buckets), len(expected))
+        for got, want in zip(buckets, expected):
+            assert got["start"].date().isoformat() == want["start"], (bucket, got["start"], want["start"])
+            for key in ("count", "labels"):
+                assert got[key] == want[key], (bucket, want["start"], key, got[key], want[key])
+            for key in ("mean", "min", "max", "rolling_mean"):
+                assert abs(got[key] - want[key]) < 1e-9, (bucket, want["start"], key, got[key], want[key])
+
+        points = max(3, len(expected) // 4)
+        kept, downsampled = timeseries(series, bucket, window, points)
+        days = np.array([row["start"].toordinal() for row in buckets])
+        indices = lttb(days, np.array([row["mean"] for row in buckets]), points)
+        assert downsampled == (len(expected) > points) and len(kept) == min(points, len(expected))
+        assert kept[0]["start"] == buckets[0]["start"] and kept[-1]["start"] == buckets[-1]["start"]
+        assert all(a < b for a, b in zip(indices, indices[1:]))
+        assert [row["start"] for row in kept] == [buckets[i]["start"] for i in indices]
+
+
+@case("analytics.timeseries_day", "analytics", items=lambda ctx: len(_history(ctx)))
+def analytics_timeseries_day(ctx):
+    from services.analytics import Series, timeseries
+    rows = _history(ctx)
+    check_timeseries(rows)
+    series = Series.from_rows(rows)
+    return lambda: timeseries(series, "day", 7, ANALYTICS_POINTS)
+
+
+@case("analytics.timeseries_week", "analytics", items=lambda ctx: len(_history(ctx)))
+def analytics_timeseries_week(ctx):
+    from services.analytics import Series, timeseries
+    series = Series.from_rows(_history(ctx))
+    return lambda: timeseries(series, "week", 4, ANALYTICS_POINTS)
+
+
+@case("analytics.columns", "analytics", items=lambda ctx: len(_history(ctx)))
+def analytics_columns(ctx):
+    """Rows as returned by the database to sorted NumPy columns"""
+    from services.analytics import Series
+    rows = _history(ctx)
+    return lambda: Series.from_rows(rows)
+
+
+@case("api.analytics_timeseries", "api")
+def api_analytics_timeseries(ctx):
+    """A year of weekly buckets; each request ends a day later, so none is cached"""
+    from datetime import date, timedelta
+    counter = itertools.count()
+    headers = ctx.headers()
+
+    def run():
+        end = date(2024, 1, 1) + timedelta(days=next(counter))
+        response = ctx.client.get(
+            f"/analytics/timeseries?from={end - timedelta(days=365)}&to={end}&bucket=week&window=4",
+            headers=headers
+        )
+        assert response.status_code == 200, response.text
+        return response
+    return run
+
+
+# Startup
+
+@case("startup.import_main", "startup", max_iterations=5)
+def startup_import_main(ctx):
+    from benchmarks.importtime import import_once, measure, problems
+    found = problems(measure("main"))
+    if found:
+        raise RuntimeError("; ".join(found))
+    return import_once
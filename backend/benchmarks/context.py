@@ -0,0 +1,80 @@
+"""Shared state for benchmark cases: corpus, fake database, trained model and API client"""
+import time
+from typing import Dict, Optional
+
+import jwt
+
+from benchmarks.corpus import make_entries, make_texts
+from benchmarks.fake_db import FakeSupabase
+
+USER_ID = "00000000-0000-4000-8000-000000000001"
+WRITER_ID = "00000000-0000-4000-8000-000000000002"
+
+
+class BenchContext:
+    """Builds everything once per run; cases only read from it.
+
+    The reader user's journal holds ``size`` entries. Cases that write use
+    a separate user so they never change what the read cases measure.
+    """
+
+    def __init__(self, size: int, seed: int = 0):
+        from core.database import db
+        from services.sentiment import sentiment_analyzer
+
+        self.size = size
+        self.seed = seed
+        self.entries = make_entries(size, seed)
+        self.texts = make_texts(max(size, 100), seed + 1)
+        self.db = db
+        self.fake = FakeSupabase()
+        self.fake.install(db)
+        self.fake.add_entries(USER_ID, self.entries)
+        # Stored rows, with ids, as the database would return them
+        self.rows = [dict(row) for row in self.fake.rows_by_user[USER_ID].values()]
+
+        # The baseline model lives in the working directory, so the app and
+        # the inference cases both serve it
+        self.analyzer = sentiment_analyzer
+        result = self.analyzer.train_model(self.entries)
+        if result["status"] != "success":
+            raise RuntimeError(f"Could not train benchmark model: {result}")
+        self.train_result = result
+        self._client = None
+        self._headers: Dict[str, Dict[str, str]] = {}
+
+    @property
+    def client(self):
+        """TestClient over the real app, with its lifespan running"""
+        if self._client is None:
+            from fastapi.testclient import TestClient
+            import main
+            self._client = TestClient(main.app)
+            self._client.__enter__()
+        return self._client
+
+    def headers(self, user_id: str = USER_ID) -> Dict[str, str]:
+        """Auth headers; one token per user so the verified-token cache behaves as in production"""
+        if user_id in self._headers:
+            return self._headers[user_id]
+        from core import config
+        token = jwt.encode(
+            {"sub": user_id, "aud": config.SUPABASE_JWT_AUDIENCE, "exp": int(time.time()) + 86400, "role": "authenticated"},
+            config.SUPABASE_JWT_SECRET,
+            algorithm="HS256"
+        )
+        self._headers[user_id] = {"Authorization": f"Bearer {token}"}
+        return self._headers[user_id]
+
+    def text(self, index: int) -> str:
+        return self.texts[index % len(self.texts)]
+
+    def close(self):
+        if self._client is not None:
+            self._client.__exit__(None, None, None)
+            self._client = None
+
+
+def newest_first(entries, limit: Optional[int] = None):
+    ordered = sorted(entries, key=lambda e: e["created_at"], reverse=True)
+    return ordered[:limit] if limit else ordered
@@ -0,0 +1,77 @@
+"""Synthetic, seeded journal corpora"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+POSITIVE = [
+    "happy", "grateful", "excited", "calm", "proud", "relaxed", "wonderful", "great",
+    "loved", "amazing", "hopeful", "cheerful", "peaceful", "inspired", "energized",
+]
+NEGATIVE = [
+    "sad", "anxious", "tired", "angry", "lonely", "stressed", "awful", "terrible",
+    "worried", "frustrated", "upset", "exhausted", "disappointed", "overwhelmed", "bored",
+]
+NEUTRAL = [
+    "work", "meeting", "lunch", "walk", "weather", "train", "email", "project", "friend",
+    "family", "dinner", "morning", "evening", "weekend", "coffee", "book", "gym", "city",
+]
+TEMPLATES = [
+    "Today I felt {mood} after the {thing}.",
+    "The {thing} was {mood} and I can't stop thinking about it.",
+    "I'm so {mood} about the {thing} with my {other}.",
+    "Honestly the {thing} made me feel {mood}, but the {other} was fine.",
+    "Woke up {mood}. Spent the {thing} on the {other}.",
+    "Another {thing}, another {other}. Feeling pretty {mood} tonight.",
+]
+SENTIMENTS = {"positive": 0.6, "negative": -0.5, "neutral": 0.0}
+
+
+def make_text(rng: random.Random, label: str, sentences: int) -> str:
+    words = POSITIVE if label == "positive" else NEGATIVE if label == "negative" else NEUTRAL
+    return " ".join(
+        rng.choice(TEMPLATES).format(mood=rng.choice(words), thing=rng.choice(NEUTRAL), other=rng.choice(NEUTRAL))
+        for _ in range(sentences)
+    )
+
+
+def make_entries(count: int, seed: int = 0, min_sentences: int = 2, max_sentences: int = 12) -> List[Dict]:
+    """Entries shaped like journals rows (without id/user_id), oldest first"""
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1, tzinfo=timezone.utc)
+    entries = []
+    for i in range(count):
+        label = rng.choice(list(SENTIMENTS))
+        entries.append({
+            "title": f"Day {i + 1}",
+            "content": make_text(rng, label, rng.randint(min_sentences, max_sentences)),
+            "sentiment": max(-1.0, min(1.0, SENTIMENTS[label] + rng.uniform(-0.3, 0.3))),
+            "mood_category": label,
+            "created_at": (start + timedelta(hours=12 * i, minutes=rng.randint(0, 600))).isoformat(),
+        })
+    return entries
+
+
+def make_texts(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    return [make_text(rng, rng.choice(list(SENTIMENTS)), rng.randint(1, 8)) for _ in range(count)]
+
+
+def make_history(years: int, seed: int = 0, entries_per_day: float = 1.5) -> List[Dict]:
+    """Analytics columns only, oldest first: uneven days, gaps of up to weeks, slow mood drift"""
+    rng = random.Random(seed)
+    moment = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    end = moment + timedelta(days=365 * years)
+    rows = []
+    while moment < end:
+        drift = 0.4 * ((moment.timetuple().tm_yday / 183.0) - 1.0)
+        label = rng.choices(list(SENTIMENTS), weights=(1.0 + drift, 1.0 - drift, 1.0))[0]
+        rows.append({
+            "sentiment": max(-1.0, min(1.0, SENTIMENTS[label] + rng.uniform(-0.3, 0.3))),
+            "mood_category": label,
+            "created_at": moment.isoformat(),
+        })
+        gap = rng.expovariate(entries_per_day)
+        if rng.random() < 0.01:
+            gap += rng.uniform(3, 21)
+        moment += timedelta(days=gap)
+    return rows
@@ -0,0 +1,220 @@
+"""In-memory stand-in for the Supabase REST API.
+
+Speaks just enough PostgREST over an ``httpx.MockTransport`` for the app's
+own queries: ``eq``/``lt``/``gt`` filters, keyset ``or=`` filters, ordering,
+limit/offset, column selection (including the computed preview columns),
+bulk inserts, updates, deletes and the ``get_journal_aggregate`` RPC.
+Requests still go through the real postgrest client, so serialization
+costs are part of every measurement; only the network and Postgres are
+missing. Set ``latency`` to add a simulated round trip to every request;
+it is awaited, so it only slows the app down if the app blocks on it.
+"""
+import asyncio
+import json
+import math
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+COMPUTED_COLUMNS = {
+    "content_preview": lambda row: row["content"][:280],
+    "content_length": lambda row: len(row["content"]),
+}
+
+
+def _parse_value(value: str):
+    value = value.strip('"')
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _compare(row: Dict, column: str, operator: str, value: str) -> bool:
+    actual = row.get(column)
+    expected = _parse_value(value) if not isinstance(actual, str) else value.strip('"')
+    if column == "created_at":
+        actual, expected = _timestamp(actual), _timestamp(expected)
+    if operator == "eq":
+        return str(actual) == str(expected) if not isinstance(actual, float) else actual == expected
+    if operator == "neq":
+        return str(actual) != str(expected)
+    if operator == "in":
+        return str(actual) in value.strip("()").split(",")
+    return {"lt": actual < expected, "lte": actual <= expected,
+            "gt": actual > expected, "gte": actual >= expected}[operator]
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+
+
+def _split_top_level(expression: str) -> List[str]:
+    return re.split(r",(?![^()]*\))", expression)
+
+
+def _matches_or(row: Dict, expression: str) -> bool:
+    for part in _split_top_level(expression[1:-1]):
+        if part.startswith("and("):
+            conditions = [condition.split(".", 2) for condition in part[4:-1].split(",")]
+            if all(_compare(row, *condition) for condition in conditions):
+                return True
+        elif _compare(row, *part.split(".", 2)):
+            return True
+    return False
+
+
+class FakeSupabase:
+    """Journals table and RPCs held in memory, indexed by user"""
+
+    def __init__(self):
+        self.rows_by_user: Dict[str, Dict[int, Dict]] = {}
+        self.next_id = 1
+        self.requests = 0
+        self.bytes_sent = 0
+        # Simulated network round trip per request, in seconds
+        self.latency = 0.0
+
+    def install(self, database):
+        """Point a core.database.Database at this fake"""
+        from core.database import HttpClient, TimedTransport
+        database._http = HttpClient(transport=TimedTransport(httpx.MockTransport(self.handle_async)))
+        database._client = None
+
+    def add_entries(self, user_id: str, entries: List[Dict]):
+        table = self.rows_by_user.setdefault(user_id, {})
+        for entry in entries:
+            row = {"id": self.next_id, "user_id": user_id, "title": None, **entry}
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat())
+            table[row["id"]] = row
+            self.next_id += 1
+
+    def reset_counters(self):
+        self.requests = 0
+        self.bytes_sent = 0
+
+    async def handle_async(self, request: httpx.Request) -> httpx.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.handle(request)
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        path = request.url.path
+        if "/rpc/" in path:
+            response = self._rpc(path.rsplit("/", 1)[1], json.loads(request.content or b"{}"))
+        elif request.method == "GET":
+            response = self._select(request.url.params)
+        elif request.method == "POST":
+            response = self._insert(json.loads(request.content))
+        elif request.method == "PATCH":
+            response = self._update(request.url.params, json.loads(request.content))
+        elif request.method == "DELETE":
+            response = self._delete(request.url.params)
+        else:
+            response = httpx.Response(405)
+        self.bytes_sent += len(response.content)
+        return response
+
+    def _filtered(self, params) -> List[Dict]:
+        user_id = None
+        conditions = []
+        for key, value in params.multi_items():
+            if key in ("select", "order", "limit", "offset", "columns"):
+                continue
+            if key == "user_id" and value.startswith("eq."):
+                user_id = value[3:]
+            elif key == "or":
+                conditions.append(lambda row, expression=value: _matches_or(row, expression))
+            else:
+                operator, _, expected = value.partition(".")
+                conditions.append(lambda row, k=key, o=operator, e=expected: _compare(row, k, o, e))
+
+        tables = [self.rows_by_user.get(user_id, {})] if user_id is not None else self.rows_by_user.values()
+        return [row for table in tables for row in table.values() if all(c(row) for c in conditions)]
+
+    def _select(self, params) -> httpx.Response:
+        rows = self._filtered(params)
+        for order in reversed([o for o in (params.get("order") or "").split(",") if o]):
+            column, direction = order.split(".")[:2]
+            key = (lambda row: _timestamp(row[column])) if column == "created_at" else (lambda row: row[column])
+            rows.sort(key=key, reverse=direction == "desc")
+        offset = int(params.get("offset", 0))
+        limit = params.get("limit")
+        rows = rows[offset:offset + int(limit)] if limit else rows[offset:]
+        return httpx.Response(200, json=[self._project(row, params.get("select", "*")) for row in rows])
+
+    @staticmethod
+    def _project(row: Dict, select: str) -> Dict:
+        if select == "*":
+            return dict(row)
+        return {
+            column: COMPUTED_COLUMNS[column](row) if column in COMPUTED_COLUMNS else row.get(column)
+            for column in select.split(",")
+        }
+
+    def _insert(self, body) -> httpx.Response:
+        inserted = []
+        for values in body if isinstance(body, list) else [body]:
+            user_id = values["user_id"]
+            before = self.next_id
+            self.add_entries(user_id, [{k: v for k, v in values.items() if k != "user_id"}])
+            inserted.append(dict(self.rows_by_user[user_id][before]))
+        return httpx.Response(201, json=inserted)
+
+    def _update(self, params, values: Dict) -> httpx.Response:
+        rows = self._filtered(params)
+        for row in rows:
+            row.update(values)
+        return httpx.Response(200, json=rows)
+
+    def _delete(self, params) -> httpx.Response:
+        rows = self._filtered(params)
+        for row in rows:
+            del self.rows_by_user[row["user_id"]][row["id"]]
+        return httpx.Response(200, json=rows)
+
+    def _rpc(self, function: str, params: Dict) -> httpx.Response:
+        if function != "get_journal_aggregate":
+            return httpx.Response(404, json={"code": "PGRST202", "message": f"Unknown function {function}"})
+        return httpx.Response(200, json=self.journal_aggregate(params["user_uuid"], params.get("recent_limit", 32)))
+
+    def journal_aggregate(self, user_id: str, recent_limit: int) -> Dict:
+        """Python mirror of get_journal_aggregate in database_schema.sql"""
+        rows = sorted(
+            self.rows_by_user.get(user_id, {}).values(),
+            key=lambda row: (_timestamp(row["created_at"]), row["id"]),
+            reverse=True
+        )
+        count = len(rows)
+        mean = sum(row["sentiment"] for row in rows) / count if count else 0.0
+        m2 = sum((row["sentiment"] - mean) ** 2 for row in rows)
+        moods: Dict[str, int] = {}
+        polarity: Dict[str, int] = {}
+        for row in rows:
+            moods[row["mood_category"]] = moods.get(row["mood_category"], 0) + 1
+            label = "positive" if row["sentiment"] > 0.1 else "negative" if row["sentiment"] < -0.1 else "neutral"
+            polarity[label] = polarity.get(label, 0) + 1
+        return {
+            "total_entries": count,
+            "average_sentiment": mean,
+            "sentiment_m2": m2,
+            "sentiment_std": math.sqrt(m2 / count) if count else 0.0,
+            "mood_counts": moods,
+            "polarity_counts": polarity,
+            "recent_entries": [
+                {"id": row["id"], "sentiment": row["sentiment"], "created_at": row["created_at"]}
+                for row in rows[:max(recent_limit, 14)]
+            ],
+        }
+
+    def count(self, user_id: Optional[str] = None) -> int:
+        if user_id is not None:
+            return len(self.rows_by_user.get(user_id, {}))
+        return sum(len(table) for table in self.rows_by_user.values())
@@ -0,0 +1,125 @@
+"""Case registry, timing loop and baseline comparison"""
+import cProfile
+import gc
+import io
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+
+class Case:
+    """One benchmark. ``setup(ctx)`` returns the zero-argument callable to time.
+
+    A ``metrics`` attribute on that callable, if set, returns extra numbers
+    measured outside the timing loop; they are added to the result.
+    """
+
+    def __init__(self, name: str, group: str, setup: Callable, items: Callable = None,
+                 max_iterations: Optional[int] = None):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.items = items or (lambda ctx: 1)
+        self.max_iterations = max_iterations
+
+
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str, group: str, items: Callable = None, max_iterations: Optional[int] = None):
+    """Register a benchmark case. ``items`` gives the work items per call, for throughput."""
+    def register(setup: Callable) -> Callable:
+        CASES[name] = Case(name, group, setup, items, max_iterations)
+        return setup
+    return register
+
+
+def select_cases(patterns: Optional[List[str]]) -> List[Case]:
+    if not patterns:
+        return list(CASES.values())
+    return [c for c in CASES.values() if any(p == c.group or c.name.startswith(p) for p in patterns)]
+
+
+def run_case(case: Case, ctx, iterations: int, warmup: int = 1,
+             profile_dir: Optional[str] = None, trace_dir: Optional[str] = None) -> Dict:
+    """Time a case, then measure its peak allocations and optionally profile it"""
+    run = case.setup(ctx)
+    iterations = min(iterations, case.max_iterations or iterations)
+    for _ in range(warmup):
+        run()
+
+    gc.collect()
+    timings = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - started
+
+    # Separate pass so tracing overhead never skews the timings
+    gc.collect()
+    tracemalloc.start(25 if trace_dir else 1)
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    if trace_dir:
+        snapshot = tracemalloc.take_snapshot()
+        with open(os.path.join(trace_dir, f"{case.name}.tracemalloc.txt"), "w") as f:
+            for stat in snapshot.statistics("traceback")[:25]:
+                f.write(f"{stat.size / 1024:.1f} KiB in {stat.count} blocks\n")
+                f.write("\n".join(stat.traceback.format()) + "\n\n")
+    tracemalloc.stop()
+
+    if profile_dir:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        for _ in range(iterations):
+            run()
+        profiler.disable()
+        profiler.dump_stats(os.path.join(profile_dir, f"{case.name}.prof"))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(30)
+        with open(os.path.join(profile_dir, f"{case.name}.txt"), "w") as f:
+            f.write(summary.getvalue())
+
+    ms = np.array(timings) * 1000
+    items = case.items(ctx)
+    metrics = getattr(run, "metrics", None)
+    return {
+        "group": case.group,
+        "iterations": iterations,
+        "items_per_call": items,
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+        "calls_per_sec": iterations / elapsed if elapsed else 0.0,
+        "items_per_sec": iterations * items / elapsed if elapsed else 0.0,
+        "peak_alloc_bytes": int(peak),
+        **(metrics() if metrics else {}),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Cases whose p50 latency grew by more than ``threshold`` (a fraction) over the baseline"""
+    regressions = []
+    for name, current in results["cases"].items():
+        previous = baseline.get("cases", {}).get(name)
+        if not previous or not previous["p50_ms"]:
+            continue
+        ratio = current["p50_ms"] / previous["p50_ms"]
+        if ratio > 1 + threshold:
+            regressions.append({
+                "case": name,
+                "baseline_p50_ms": previous["p50_ms"],
+                "p50_ms": current["p50_ms"],
+                "ratio": ratio,
+            })
+    return regressions
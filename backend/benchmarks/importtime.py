@@ -0,0 +1,90 @@
+"""Import-time check for the API entry point.
+
+Runs ``python -X importtime -c "import main"`` in a fresh interpreter and
+fails if a module that should load lazily was imported, or if the total
+exceeds a budget. From the backend directory::
+
+    python -m benchmarks.importtime --budget-ms 800 --top 15
+
+The ``startup.import_main`` benchmark case times the same import, so the
+usual baseline comparison catches gradual regressions too.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.run import BACKEND_DIR, configure_environment
+
+# Loaded on first use only; importing any of these with main is a regression
+LAZY_MODULES = ("numpy", "pandas", "sklearn", "scipy", "nltk", "textblob")
+
+
+def _run(module: str, importtime: bool) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    flags = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *flags, "-c", f"import {module}"],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    return result
+
+
+def import_once(module: str = "main"):
+    """Import the module in a fresh interpreter; used as the timed benchmark body"""
+    _run(module, importtime=False)
+
+
+def measure(module: str = "main") -> Dict[str, Tuple[int, int]]:
+    """Module name -> (self, cumulative) import time in microseconds"""
+    timings = {}
+    for line in _run(module, importtime=True).stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # header line
+        timings[parts[2].strip()] = (int(parts[0]), int(parts[1]))
+    return timings
+
+
+def problems(timings: Dict[str, Tuple[int, int]], module: str = "main",
+             budget_ms: Optional[float] = None) -> List[str]:
+    """Eager imports of lazy modules, and a blown budget"""
+    found = [f"{name} is imported eagerly" for name in sorted(timings) if name in LAZY_MODULES]
+    if budget_ms is not None and module in timings:
+        total_ms = timings[module][1] / 1000
+        if total_ms > budget_ms:
+            found.append(f"import {module} took {total_ms:.0f} ms (budget {budget_ms:.0f} ms)")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check import time of the API entry point")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--budget-ms", type=float, help="Fail if the cumulative import exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="Show the slowest top-level imports")
+    args = parser.parse_args()
+
+    configure_environment(tempfile.mkdtemp(prefix="sentiment-journal-import-"))
+
+    timings = measure(args.module)
+    top_level = [(name, cumulative) for name, (_, cumulative) in timings.items() if "." not in name]
+    for name, cumulative in sorted(top_level, key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"{cumulative / 1000:9.1f} ms  {name}")
+
+    found = problems(timings, args.module, args.budget_ms)
+    for problem in found:
+        print(f"FAIL {problem}")
+    if found:
+        sys.exit(1)
+    print(f"import {args.module}: {timings.get(args.module, (0, 0))[1] / 1000:.1f} ms, no eager heavy imports")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Load test for live scoring: concurrent editing sessions against one worker.
+
+Starts one uvicorn worker on the synthetic corpus's trained model, then
+for each session count opens that many WebSockets which each type a draft
+a word at a time. Update latency is measured from the edit a score covers
+to the score's arrival, so it includes LIVE_DEBOUNCE_MS. From the backend
+directory::
+
+    python -m benchmarks.live_load --sessions 10 50 100 200 --seconds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import jwt
+
+from benchmarks.run import BACKEND_DIR, configure_environment
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else float("nan")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _wait_for_server(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not start on port {port}")
+
+
+async def _session(url: str, token: str, words, interval: float, until: float, seed: int, latencies, counts):
+    import websockets
+
+    rng = random.Random(seed)
+    sent = {}
+    async with websockets.connect(url, max_size=None) as ws:
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+
+        async def receive():
+            async for raw in ws:
+                message = json.loads(raw)
+                if message["type"] == "score":
+                    latencies.append(time.perf_counter() - sent[message["version"]])
+                    counts["scores"] += 1
+                else:
+                    counts["errors"] += 1
+
+        receiver = asyncio.create_task(receive())
+        draft, version = "", 0
+        # Start at a random point so sessions do not type in lockstep
+        await asyncio.sleep(rng.uniform(0, interval))
+        while time.perf_counter() < until:
+            word = rng.choice(words)
+            piece = (" " if draft else "") + word + ("." if rng.random() < 0.1 else "")
+            version += 1
+            sent[version] = time.perf_counter()
+            await ws.send(json.dumps({"type": "edit", "start": len(draft), "end": len(draft), "text": piece}))
+            draft += piece
+            counts["edits"] += 1
+            await asyncio.sleep(rng.uniform(0.5, 1.5) * interval)
+        # Let the last edit's score arrive
+        await asyncio.sleep(1.0)
+        receiver.cancel()
+
+
+async def _run_level(url: str, secret: str, sessions: int, seconds: float, interval: float, words):
+    now = int(time.time())
+    latencies, counts = [], {"edits": 0, "scores": 0, "errors": 0}
+    until = time.perf_counter() + seconds
+    tokens = [
+        jwt.encode({"sub": f"live-{i}", "aud": "authenticated", "exp": now + 3600}, secret, algorithm="HS256")
+        for i in range(sessions)
+    ]
+    await asyncio.gather(*[
+        _session(url, token, words, interval, until, i, latencies, counts) for i, token in enumerate(tokens)
+    ])
+    return latencies, counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live scoring load test")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[10, 50, 100, 200])
+    parser.add_argument("--seconds", type=float, default=20.0, help="Typing time per session count")
+    parser.add_argument("--interval-ms", type=float, default=300.0, help="Average time between edits per session")
+    parser.add_argument("--size", type=int, default=2000, help="Entries the served model is trained on")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sentiment-journal-live-")
+    configure_environment(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+
+    from benchmarks.corpus import NEGATIVE, NEUTRAL, POSITIVE, make_entries
+    from core import config
+    from services.sentiment import sentiment_analyzer
+    result = sentiment_analyzer.train_model(make_entries(args.size, args.seed))
+    if result["status"] != "success":
+        raise RuntimeError(f"Could not train the served model: {result}")
+
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))},
+        cwd=workdir
+    )
+    words = POSITIVE + NEGATIVE + NEUTRAL + ["the", "and", "was", "felt", "today", "not", "very"]
+    try:
+        asyncio.run(_wait_for_server(port))
+        print(
+            f"debounce {config.LIVE_DEBOUNCE_MS:.0f} ms, max delay {config.LIVE_MAX_DELAY_MS:.0f} ms, "
+            f"edit every ~{args.interval_ms:.0f} ms, inference workers {config.INFERENCE_WORKERS}"
+        )
+        print(f"{'sessions':>8} {'edits/s':>8} {'scores/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+        for sessions in args.sessions:
+            latencies, counts = asyncio.run(_run_level(
+                f"ws://127.0.0.1:{port}/analyze-sentiment/live", config.SUPABASE_JWT_SECRET,
+                sessions, args.seconds, args.interval_ms / 1000.0, words
+            ))
+            print(
+                f"{sessions:8d} {counts['edits'] / args.seconds:8.1f} {counts['scores'] / args.seconds:9.1f} "
+                f"{_percentile(latencies, 0.5) * 1000:8.1f} {_percentile(latencies, 0.95) * 1000:8.1f} "
+                f"{_percentile(latencies, 0.99) * 1000:8.1f} {counts['errors']:6d}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Resident memory after loading a saved model in a fresh interpreter.
+
+A memory-mapped bundle only pages in what scoring touches, while legacy
+pickles copy every array onto the heap, so the difference shows up in RSS
+rather than in allocations. Used by the ``models.load_*`` benchmark cases;
+to measure a model by hand, from the backend directory::
+
+    python -m benchmarks.model_load BUNDLE_PATH MODEL_PATH VECTORIZER_PATH
+"""
+import importlib
+import json
+import os
+import subprocess
+import sys
+from typing import Dict
+
+from benchmarks.run import BACKEND_DIR
+
+
+def rss_bytes() -> int:
+    """This process's current resident set size"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (macOS): peak RSS, in bytes there
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure_rss(bundle_path: str, model_path: str, vectorizer_path: str) -> Dict[str, int]:
+    """``rss_before_load_bytes`` and ``rss_after_load_bytes`` of a fresh interpreter loading the model"""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.model_load", bundle_path, model_path, vectorizer_path],
+        env=env, cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Model load failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    bundle_path, model_path, vectorizer_path = sys.argv[1:4]
+    # Everything unpickling needs is imported before the baseline
+    for module in ("numpy", "sklearn.ensemble", "sklearn.feature_extraction.text"):
+        importlib.import_module(module)
+    from services.sentiment import SentimentAnalyzer
+
+    analyzer = SentimentAnalyzer(bundle_path=bundle_path, model_path=model_path, vectorizer_path=vectorizer_path)
+    before = rss_bytes()
+    if not analyzer.load_model():
+        sys.exit(f"No model at {bundle_path} or {model_path}")
+    print(json.dumps({"rss_before_load_bytes": before, "rss_after_load_bytes": rss_bytes()}))
+
+
+if __name__ == "__main__":
+    main()
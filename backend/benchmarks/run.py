@@ -0,0 +1,142 @@
+"""Run the benchmark suite.
+
+From the backend directory::
+
+    python -m benchmarks.run --size 2000 --output bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.run api inference.batch --profile prof/ --trace-memory prof/
+
+Positional arguments select cases by group or name prefix. Everything runs
+in a scratch directory against an in-memory fake of Supabase, with
+inference and training in-process (INFERENCE_WORKERS=0, TRAINING_WORKERS=0)
+and the response/result caches off, so numbers reflect the code rather
+than the cache; export any of those variables to override. Exits with
+status 1 if a case regresses past the threshold.
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import resource
+import secrets
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def configure_environment(workdir: str):
+    """Must run before any app module reads core.config"""
+    defaults = {
+        "SUPABASE_URL": "http://supabase.bench",
+        "SUPABASE_KEY": "bench-key",
+        "SUPABASE_JWT_SECRET": secrets.token_hex(32),
+        "INFERENCE_WORKERS": "0",
+        "TRAINING_WORKERS": "0",
+        "SENTIMENT_CACHE_BYTES": "0",
+        "SENTIMENT_CACHE_DB": "",
+        "RESPONSE_CACHE_TTL": "0",
+        "MODEL_DIR": os.path.join(workdir, "models"),
+        "STATS_DB": os.path.join(workdir, "user_stats.db"),
+        "TRAINING_JOB_DB": os.path.join(workdir, "training_jobs.db"),
+        "USER_VERSION_DB": os.path.join(workdir, "user_versions.db"),
+        "SEARCH_INDEX_DB": os.path.join(workdir, "search_index.db"),
+        # Cases call the API as one user far faster than its rate limits allow
+        "ADMISSION_INFERENCE_RATE": "0",
+        "ADMISSION_TRAINING_RATE": "0",
+        "ADMISSION_STATS_RATE": "0",
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sentiment Journal benchmark suite")
+    parser.add_argument("cases", nargs="*", help="Groups or case-name prefixes to run (default: all)")
+    parser.add_argument("--size", type=int, default=2000, help="Entries in the synthetic journal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", help="Compare p50 latencies against a previous results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p50 slowdown vs baseline (0.2 = 20%%)")
+    parser.add_argument("--profile", metavar="DIR", help="Write cProfile output per case to DIR")
+    parser.add_argument("--trace-memory", metavar="DIR", help="Write tracemalloc top allocations per case to DIR")
+    parser.add_argument("--list", action="store_true", help="List cases and exit")
+    args = parser.parse_args()
+
+    for directory in (args.profile, args.trace_memory):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    profile_dir = os.path.abspath(args.profile) if args.profile else None
+    trace_dir = os.path.abspath(args.trace_memory) if args.trace_memory else None
+    output = os.path.abspath(args.output) if args.output else None
+    baseline_path = os.path.abspath(args.baseline) if args.baseline else None
+
+    workdir = tempfile.mkdtemp(prefix="sentiment-journal-bench-")
+    configure_environment(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+    os.chdir(workdir)
+
+    # Importing the module registers its cases
+    importlib.import_module("benchmarks.cases")
+    from benchmarks.context import BenchContext
+    from benchmarks.harness import compare, run_case, select_cases
+
+    selected = select_cases(args.cases)
+    if args.list or not selected:
+        for c in selected or select_cases(None):
+            print(f"{c.group:12} {c.name}")
+        return
+
+    print(f"Building context: {args.size} entries, seed {args.seed} (workdir {workdir})")
+    ctx = BenchContext(args.size, args.seed)
+    results = {
+        "meta": {
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "size": args.size,
+            "seed": args.seed,
+            "iterations": args.iterations,
+        },
+        "cases": {},
+    }
+    try:
+        for c in selected:
+            result = run_case(c, ctx, args.iterations, args.warmup, profile_dir, trace_dir)
+            results["cases"][c.name] = result
+            line = (
+                f"{c.name:28} p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms  "
+                f"{result['items_per_sec']:11.1f} items/s  peak {result['peak_alloc_bytes'] / 1024:9.1f} KiB"
+            )
+            if "rss_after_load_bytes" in result:
+                grown = result["rss_after_load_bytes"] - result["rss_before_load_bytes"]
+                line += f"  rss after load {result['rss_after_load_bytes'] / 1024:9.1f} KiB (+{grown / 1024:.1f})"
+            print(line)
+    finally:
+        ctx.close()
+    results["meta"]["max_rss_kib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {output}")
+
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression['case']}: p50 {regression['baseline_p50_ms']:.3f} -> "
+                f"{regression['p50_ms']:.3f} ms ({regression['ratio']:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Compare the forest and online training engines on the synthetic corpus.
+
+Trains both with ``train_model`` on the same entries, so the accuracy
+columns come from the same split and ``classification_report`` output the
+API returns, then times ``partial_update`` one entry at a time. From the
+backend directory::
+
+    python -m benchmarks.training_engines --size 2000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.run import BACKEND_DIR, configure_environment
+
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the forest and online training engines")
+    parser.add_argument("--size", type=int, default=2000, help="Entries in the synthetic journal")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--updates", type=int, default=500, help="Single-entry updates to time")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="sentiment-journal-engines-")
+    configure_environment(workdir)
+    sys.path.insert(0, BACKEND_DIR)
+
+    from benchmarks.corpus import make_entries
+    from services.sentiment import ANALYZERS
+
+    entries = make_entries(args.size, args.seed)
+    analyzers = {}
+    print(f"{'engine':8} {'train s':>8} {'accuracy':>9} {'macro f1':>9}  per-class f1")
+    for engine, analyzer_class in ANALYZERS.items():
+        analyzer = analyzer_class(bundle_path=os.path.join(workdir, engine, "sentiment_model.bundle"))
+        started = time.perf_counter()
+        result = analyzer.train_model(entries)
+        elapsed = time.perf_counter() - started
+        if result["status"] != "success":
+            raise RuntimeError(f"{engine} training failed: {result}")
+        report = result["classification_report"]
+        per_class = "  ".join(
+            f"{label} {scores['f1-score']:.3f}" for label, scores in report.items()
+            if isinstance(scores, dict) and label not in ("macro avg", "weighted avg")
+        )
+        print(f"{engine:8} {elapsed:8.2f} {result['accuracy']:9.3f} {report['macro avg']['f1-score']:9.3f}  {per_class}")
+        analyzers[engine] = analyzer
+
+    online = analyzers["online"]
+    timings = []
+    for i in range(args.updates):
+        started = time.perf_counter()
+        online.partial_update([entries[i % len(entries)]])
+        timings.append((time.perf_counter() - started) * 1000)
+    started = time.perf_counter()
+    online.save_model()
+    checkpoint_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"online update per entry: p50 {_percentile(timings, 0.5):.3f} ms  p99 {_percentile(timings, 0.99):.3f} ms; "
+        f"checkpoint {checkpoint_ms:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
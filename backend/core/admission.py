@@ -0,0 +1,293 @@
+"""Admission control: per-user rate limits and per-class concurrency limits.
+
+Requests are grouped into work classes (inference, training, stats). Each
+class admits at most ``concurrency`` requests at a time per worker; the next
+``max_waiting`` wait in FIFO order for at most ``wait_timeout`` seconds,
+and anything beyond that is shed at once with 503. A request whose
+expected wait (its place in line times the class's recent service time)
+already exceeds the deadline is shed up front instead of timing out.
+
+Each user also has a token bucket per class, ``burst`` deep and refilled
+at ``rate`` per second; a user who runs out gets 429. Both rejections
+carry Retry-After. A zero concurrency or rate disables that limit.
+
+In front of all of that, AdmissionMiddleware caps the HTTP requests in
+flight in the worker and turns the rest away before they are authenticated
+or their body is read, so shedding stays cheap even when the worker's own
+event loop is what is overloaded.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+
+from core import config
+
+
+class AdmissionRejected(HTTPException):
+    """A request turned away before doing any work, with a Retry-After hint"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(self.retry_after)})
+
+
+class RateLimited(AdmissionRejected):
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(429, detail, retry_after)
+
+
+class Saturated(AdmissionRejected):
+    def __init__(self, detail: str, retry_after: float):
+        super().__init__(503, detail, retry_after)
+
+
+class RateLimiter:
+    """Token buckets per user, for the ``max_users`` most recently seen.
+
+    A bucket left alone for ``burst / rate`` seconds is full again anyway,
+    so evicting the least recently seen user forgets nothing that matters.
+    """
+
+    def __init__(self, rate: float, burst: float, max_users: int = 10000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_users = max_users
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, user_id: str, cost: float = 1.0) -> float:
+        """Spend ``cost`` tokens; 0 if the user had them, else seconds until they will"""
+        if self.rate <= 0:
+            return 0.0
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(user_id, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / self.rate
+        self._buckets[user_id] = (tokens, now)
+        if len(self._buckets) > self.max_users:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class WorkClass:
+    """Concurrency limit, bounded wait queue and rate limiter for one kind of work.
+
+    Used from the event loop only, so it needs no lock.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        concurrency: int = 0,
+        max_waiting: int = 0,
+        wait_timeout: float = 1.0,
+        rate: float = 0.0,
+        burst: float = 1.0,
+        max_users: int = 10000
+    ):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.limiter = RateLimiter(rate, burst, max_users)
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of how long admitted requests hold their slot
+        self._service_seconds = 0.0
+
+        # Metrics
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.degraded = 0
+        self.queued = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _expected_wait(self, position: int) -> float:
+        return position * self._service_seconds / self.concurrency
+
+    def _retry_after(self) -> float:
+        return max(self._expected_wait(len(self._waiters) + 1), self._service_seconds)
+
+    def _release(self):
+        # Hand the slot straight to the first waiter still waiting
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    async def _acquire(self):
+        if self._active < self.concurrency and not self._waiters:
+            self._active += 1
+            return
+        if len(self._waiters) >= self.max_waiting or self._expected_wait(len(self._waiters) + 1) > self.wait_timeout:
+            self.shed += 1
+            raise Saturated(f"Server busy ({self.name}), try again later", self._retry_after())
+
+        self.queued += 1
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.wait_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot arrived as the deadline passed; give it back
+                self._release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise Saturated(f"Server busy ({self.name}), try again later", self._retry_after()) from None
+            raise
+        waited = time.perf_counter() - started
+        self.total_wait_seconds += waited
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    @asynccontextmanager
+    async def admit(self, user_id: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """Hold a slot of this class for the block.
+
+        Raises RateLimited when the user is over their rate and Saturated
+        when the class is full; both before the block runs.
+        """
+        wait = self.limiter.take(user_id, cost)
+        if wait > 0:
+            self.rate_limited += 1
+            raise RateLimited(f"Too many {self.name} requests, slow down", wait)
+        if self.concurrency <= 0:
+            self.admitted += 1
+            yield
+            return
+
+        await self._acquire()
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._service_seconds = elapsed if not self._service_seconds else (
+                0.9 * self._service_seconds + 0.1 * elapsed
+            )
+            self._release()
+
+    def stats(self) -> Dict:
+        return {
+            "concurrency": self.concurrency,
+            "max_waiting": self.max_waiting,
+            "wait_timeout_seconds": self.wait_timeout,
+            "rate_per_second": self.limiter.rate,
+            "burst": self.limiter.burst,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+            "timed_out": self.timed_out,
+            "degraded": self.degraded,
+            "average_wait_seconds": (self.total_wait_seconds / self.queued) if self.queued else 0.0,
+            "max_wait_seconds": self.max_wait_seconds,
+            "average_service_seconds": self._service_seconds,
+        }
+
+
+class InFlightLimit:
+    """Count of HTTP requests in flight in this worker, and its cap"""
+
+    def __init__(self, max_in_flight: int = 0):
+        self.max_in_flight = max_in_flight
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.rejected = 0
+
+    def stats(self) -> Dict:
+        return {
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "rejected": self.rejected,
+        }
+
+
+class AdmissionMiddleware:
+    """ASGI middleware: 503 for HTTP requests past the worker's in-flight cap.
+
+    Health checks and metrics scrapes are never turned away.
+    """
+
+    def __init__(self, app, limit: InFlightLimit, exempt_paths: Tuple[str, ...] = ("/", "/metrics")):
+        self.app = app
+        self.limit = limit
+        self.exempt_paths = exempt_paths
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limit
+        if scope["type"] != "http" or limit.max_in_flight <= 0 or scope["path"] in self.exempt_paths:
+            await self.app(scope, receive, send)
+            return
+        if limit.in_flight >= limit.max_in_flight:
+            limit.rejected += 1
+            response = JSONResponse({"detail": "Server busy, try again later"}, status_code=503, headers={"Retry-After": "1"})
+            await response(scope, receive, send)
+            return
+
+        limit.in_flight += 1
+        limit.peak_in_flight = max(limit.peak_in_flight, limit.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.in_flight -= 1
+
+
+# Global instances
+in_flight_limit = InFlightLimit(config.ADMISSION_MAX_IN_FLIGHT)
+inference_admission = WorkClass(
+    "inference",
+    concurrency=config.ADMISSION_INFERENCE_CONCURRENCY,
+    max_waiting=config.ADMISSION_INFERENCE_QUEUE,
+    wait_timeout=config.ADMISSION_INFERENCE_WAIT_MS / 1000.0,
+    rate=config.ADMISSION_INFERENCE_RATE,
+    burst=config.ADMISSION_INFERENCE_BURST,
+    max_users=config.ADMISSION_MAX_USERS
+)
+training_admission = WorkClass(
+    "training",
+    concurrency=config.ADMISSION_TRAINING_CONCURRENCY,
+    max_waiting=config.ADMISSION_TRAINING_QUEUE,
+    wait_timeout=config.ADMISSION_TRAINING_WAIT_MS / 1000.0,
+    rate=config.ADMISSION_TRAINING_RATE,
+    burst=config.ADMISSION_TRAINING_BURST,
+    max_users=config.ADMISSION_MAX_USERS
+)
+stats_admission = WorkClass(
+    "stats",
+    concurrency=config.ADMISSION_STATS_CONCURRENCY,
+    max_waiting=config.ADMISSION_STATS_QUEUE,
+    wait_timeout=config.ADMISSION_STATS_WAIT_MS / 1000.0,
+    rate=config.ADMISSION_STATS_RATE,
+    burst=config.ADMISSION_STATS_BURST,
+    max_users=config.ADMISSION_MAX_USERS
+)
+
+
+def stats() -> Dict:
+    return {
+        "http": in_flight_limit.stats(),
+        **{work.name: work.stats() for work in (inference_admission, training_admission, stats_admission)}
+    }
@@ -0,0 +1,286 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import logging
+
+import httpx
+import jwt
+from fastapi import Header, HTTPException
+
+from core import config
+from core.database import db
+from core.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Algorithms we are willing to verify locally. Anything else goes to the
+# auth server.
+SYMMETRIC_ALGORITHMS = ["HS256"]
+ASYMMETRIC_ALGORITHMS = ["RS256", "ES256"]
+
+
+class AuthenticationError(Exception):
+    """Raised when a token is definitively invalid"""
+
+
+class TokenCache:
+    """Bounded LRU cache of verified tokens mapped to user payloads.
+
+    Entries expire at the earlier of the token's own ``exp`` claim and the
+    configured TTL, so a cached token is never honoured past its lifetime.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 300.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, token: str) -> Optional[Dict]:
+        """Return the cached user for a token, or None if absent or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[token]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return user
+
+    def put(self, token: str, user: Dict, token_expires_at: Optional[float]):
+        """Cache a verified token until it expires or the TTL elapses"""
+        now = time.time()
+        expires_at = now + self.ttl
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        if expires_at <= now or self.max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[token] = (user, expires_at)
+            self._entries.move_to_end(token)
+            if len(self._entries) > self.max_size:
+                self._purge_expired(now)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _purge_expired(self, now: float):
+        expired = [token for token, (_, expires_at) in self._entries.items() if expires_at <= now]
+        for token in expired:
+            del self._entries[token]
+        self.expirations += len(expired)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class TokenVerifier:
+    """Verify Supabase access tokens locally, falling back to the auth server.
+
+    HS256 tokens are checked against the project's JWT secret and asymmetric
+    tokens against the (cached) JWKS. The remote ``/auth/v1/user`` call is only
+    made when neither is available for a given token.
+    """
+
+    def __init__(
+        self,
+        supabase_url: Optional[str],
+        api_key: Optional[str],
+        jwt_secret: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: Optional[str] = "authenticated",
+        http_client: Optional[httpx.AsyncClient] = None,
+        cache_size: int = 10000,
+        cache_ttl: float = 300.0,
+        jwks_cache_ttl: float = 600.0,
+        remote_timeout: float = 5.0
+    ):
+        self.supabase_url = supabase_url
+        self.api_key = api_key
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self._http_client = http_client
+        self.remote_timeout = remote_timeout
+        self.cache = TokenCache(max_size=cache_size, ttl=cache_ttl)
+        self.jwks_client = jwt.PyJWKClient(
+            jwks_url, cache_jwk_set=True, lifespan=jwks_cache_ttl, timeout=int(remote_timeout)
+        ) if jwks_url else None
+        self._counter_lock = threading.Lock()
+        self.local_verifications = 0
+        self.remote_verifications = 0
+        self.rejections = 0
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        return self._http_client or db.http
+
+    async def verify(self, token: str) -> Dict:
+        """Return the user payload for a valid token or raise AuthenticationError"""
+        user = self.cache.get(token)
+        if user is not None:
+            return user
+
+        try:
+            verified = await self._verify_locally(token)
+            if verified is None:
+                verified = await self._verify_remotely(token)
+        except AuthenticationError:
+            self._count("rejections")
+            raise
+
+        user, expires_at = verified
+        self.cache.put(token, user, expires_at)
+        return user
+
+    async def _verify_locally(self, token: str) -> Optional[Tuple[Dict, Optional[float]]]:
+        """Check the token signature locally. Returns None if we lack the key material."""
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise AuthenticationError(f"Malformed token: {e}")
+
+        algorithm = header.get("alg")
+        if algorithm in SYMMETRIC_ALGORITHMS and self.jwt_secret:
+            key = self.jwt_secret
+        elif algorithm in ASYMMETRIC_ALGORITHMS and self.jwks_client:
+            try:
+                # PyJWKClient fetches with urllib, so keep it off the event loop
+                signing_key = await asyncio.to_thread(self.jwks_client.get_signing_key_from_jwt, token)
+                key = signing_key.key
+            except jwt.PyJWKClientError as e:
+                logger.warning(f"JWKS lookup failed, falling back to auth server: {str(e)}")
+                return None
+        else:
+            return None
+
+        try:
+            claims = jwt.decode(
+                token,
+                key,
+                algorithms=[algorithm],
+                audience=self.audience,
+                options={"require": ["exp", "sub"], "verify_aud": self.audience is not None}
+            )
+        except jwt.InvalidTokenError as e:
+            raise AuthenticationError(f"Invalid token: {e}")
+
+        self._count("local_verifications")
+        return self._user_from_claims(claims), float(claims["exp"])
+
+    async def _verify_remotely(self, token: str) -> Tuple[Dict, Optional[float]]:
+        """Ask the auth server who the token belongs to"""
+        if not self.supabase_url:
+            raise AuthenticationError("No way to verify token")
+
+        self._count("remote_verifications")
+        try:
+            res = await self.http_client.get(
+                f"{self.supabase_url}/auth/v1/user",
+                headers={"Authorization": f"Bearer {token}", "apikey": self.api_key or ""},
+                timeout=self.remote_timeout
+            )
+        except httpx.HTTPError as e:
+            raise AuthenticationError(f"Auth server unavailable: {e}")
+        if res.status_code != 200:
+            raise AuthenticationError("Invalid token")
+
+        return res.json(), self._unverified_expiry(token)
+
+    @staticmethod
+    def _unverified_expiry(token: str) -> Optional[float]:
+        # Only used to bound how long a remotely verified token stays cached
+        try:
+            claims = jwt.decode(token, options={"verify_signature": False})
+            return float(claims["exp"]) if "exp" in claims else None
+        except (jwt.InvalidTokenError, TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _user_from_claims(claims: Dict) -> Dict:
+        """Shape JWT claims like the /auth/v1/user response"""
+        return {
+            "id": claims["sub"],
+            "aud": claims.get("aud"),
+            "role": claims.get("role"),
+            "email": claims.get("email"),
+            "phone": claims.get("phone"),
+            "app_metadata": claims.get("app_metadata", {}),
+            "user_metadata": claims.get("user_metadata", {}),
+            "is_anonymous": claims.get("is_anonymous", False),
+        }
+
+    def _count(self, counter: str):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> Dict:
+        return {
+            **self.cache.stats(),
+            "local_verifications": self.local_verifications,
+            "remote_verifications": self.remote_verifications,
+            "rejections": self.rejections,
+        }
+
+
+# Global instance
+token_verifier = TokenVerifier(
+    supabase_url=config.SUPABASE_URL,
+    api_key=config.SUPABASE_KEY,
+    jwt_secret=config.SUPABASE_JWT_SECRET,
+    jwks_url=config.SUPABASE_JWKS_URL,
+    audience=config.SUPABASE_JWT_AUDIENCE,
+    cache_size=config.AUTH_CACHE_SIZE,
+    cache_ttl=config.AUTH_CACHE_TTL,
+    jwks_cache_ttl=config.AUTH_JWKS_CACHE_TTL,
+    remote_timeout=config.AUTH_REMOTE_TIMEOUT
+)
+
+
+async def get_current_user(authorization: str = Header(...)):
+    """Get current user from Supabase JWT token"""
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Invalid authorization header")
+    try:
+        with span("auth"):
+            return await token_verifier.verify(token)
+    except AuthenticationError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+
+async def authenticate_token(token: str) -> Tuple[Dict, Optional[float]]:
+    """User and token expiry (epoch seconds) outside a request, e.g. for a WebSocket.
+
+    Raises AuthenticationError for an invalid token.
+    """
+    with span("auth"):
+        user = await token_verifier.verify(token)
+    return user, token_verifier._unverified_expiry(token)
@@ -0,0 +1,173 @@
+from dotenv import load_dotenv
+import os
+
+# Load environment variables
+load_dotenv()
+
+# Supabase configuration
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+# Auth configuration
+# HS256 tokens are verified with the project's JWT secret; asymmetric tokens
+# (RS256/ES256) are verified against the project's published JWKS.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+SUPABASE_JWKS_URL = os.getenv(
+    "SUPABASE_JWKS_URL",
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "300"))
+AUTH_JWKS_CACHE_TTL = float(os.getenv("AUTH_JWKS_CACHE_TTL", "600"))
+AUTH_REMOTE_TIMEOUT = float(os.getenv("AUTH_REMOTE_TIMEOUT", "5"))
+
+# Database connection pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "100"))
+DB_POOL_KEEPALIVE = int(os.getenv("DB_POOL_KEEPALIVE", "20"))
+DB_KEEPALIVE_EXPIRY = float(os.getenv("DB_KEEPALIVE_EXPIRY", "30"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "5"))
+
+# Journal listing
+JOURNALS_MAX_LIMIT = int(os.getenv("JOURNALS_MAX_LIMIT", "200"))
+# Rows fetched per database round trip by /journals/export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "500"))
+
+# Bulk import: rows scored and inserted per round trip, and rows per upload
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+MAX_IMPORT_ROWS = int(os.getenv("MAX_IMPORT_ROWS", "100000"))
+
+# Conditional GETs and server-side response cache for per-user reads
+USER_VERSION_DB = os.getenv("USER_VERSION_DB", "user_versions.db")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+# Sentiment inference
+# INFERENCE_WORKERS=0 runs inference on a thread instead of a process pool.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+INFERENCE_BATCH_SIZE = int(os.getenv("INFERENCE_BATCH_SIZE", "32"))
+INFERENCE_BATCH_WINDOW_MS = float(os.getenv("INFERENCE_BATCH_WINDOW_MS", "5"))
+# Chunk size and request cap for /analyze-sentiment/batch
+INFERENCE_BULK_CHUNK_SIZE = int(os.getenv("INFERENCE_BULK_CHUNK_SIZE", "1000"))
+MAX_BATCH_TEXTS = int(os.getenv("MAX_BATCH_TEXTS", "10000"))
+# "lexicon" scores polarity with the compiled TextBlob lexicon in
+# services/polarity.py; "textblob" calls TextBlob itself, for comparison.
+POLARITY_ENGINE = os.getenv("POLARITY_ENGINE", "lexicon").lower()
+
+# Sentiment result cache
+# SENTIMENT_CACHE_BYTES=0 disables the in-memory tier; setting
+# SENTIMENT_CACHE_DB shares results between workers through SQLite.
+SENTIMENT_CACHE_BYTES = int(os.getenv("SENTIMENT_CACHE_BYTES", str(32 * 1024 * 1024)))
+SENTIMENT_CACHE_DB = os.getenv("SENTIMENT_CACHE_DB", "")
+SENTIMENT_CACHE_DISK_ENTRIES = int(os.getenv("SENTIMENT_CACHE_DISK_ENTRIES", "1000000"))
+
+# Text preprocessing
+LEMMA_CACHE_SIZE = int(os.getenv("LEMMA_CACHE_SIZE", "100000"))
+# NLTK data is installed at build time; never download it on a request path
+# unless NLTK_AUTO_DOWNLOAD is set (development only).
+NLTK_AUTO_DOWNLOAD = os.getenv("NLTK_AUTO_DOWNLOAD", "false").lower() == "true"
+
+# Startup
+# Load models, NLTK data and the scikit-learn/TextBlob imports in the
+# background once the app is up, instead of on the first request.
+STARTUP_PREWARM = os.getenv("STARTUP_PREWARM", "true").lower() == "true"
+
+# Per-user model registry
+MODEL_DIR = os.getenv("MODEL_DIR", "models")
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "50"))
+MODEL_CACHE_BYTES = int(os.getenv("MODEL_CACHE_BYTES", str(512 * 1024 * 1024)))
+
+# Training engine
+# "forest" refits TF-IDF and a random forest on the whole history for every
+# /train-model. "online" trains a linear model on hashed features instead,
+# and keeps updating it as entries are created or edited; the update is
+# checkpointed to the user's bundle (and starts being served) every
+# ONLINE_CHECKPOINT_EVERY entries or ONLINE_CHECKPOINT_SECONDS, and on
+# shutdown. Each API worker keeps its own learners between checkpoints.
+TRAINING_ENGINE = os.getenv("TRAINING_ENGINE", "forest").lower()
+ONLINE_HASH_FEATURES = int(os.getenv("ONLINE_HASH_FEATURES", str(2 ** 16)))
+ONLINE_TRAINING_EPOCHS = int(os.getenv("ONLINE_TRAINING_EPOCHS", "5"))
+ONLINE_CHECKPOINT_EVERY = int(os.getenv("ONLINE_CHECKPOINT_EVERY", "20"))
+ONLINE_CHECKPOINT_SECONDS = float(os.getenv("ONLINE_CHECKPOINT_SECONDS", "60"))
+ONLINE_MAX_LEARNERS = int(os.getenv("ONLINE_MAX_LEARNERS", "100"))
+
+# Background training jobs
+# TRAINING_WORKERS=0 trains on a thread instead of a process pool.
+TRAINING_WORKERS = int(os.getenv("TRAINING_WORKERS", "1"))
+TRAINING_MAX_PENDING = int(os.getenv("TRAINING_MAX_PENDING", "100"))
+TRAINING_JOB_DB = os.getenv("TRAINING_JOB_DB", "training_jobs.db")
+
+# Incremental per-user statistics
+STATS_DB = os.getenv("STATS_DB", "user_stats.db")
+STATS_RECENT_CAPACITY = int(os.getenv("STATS_RECENT_CAPACITY", "32"))
+# "local" keeps aggregates in STATS_DB and only queries the database to build
+# them; "database" computes every read in SQL, for deployments whose workers
+# do not share a disk.
+STATS_SOURCE = os.getenv("STATS_SOURCE", "local")
+# Build aggregates with the get_journal_aggregate SQL function instead of
+# paging every entry to the API
+STATS_SQL_AGGREGATES = os.getenv("STATS_SQL_AGGREGATES", "true").lower() == "true"
+
+# Journal search
+# Per-user search indexes are stored in SEARCH_INDEX_DB, built from the
+# database on a user's first search, and the SEARCH_INDEX_CACHE_SIZE most
+# recently searched are kept in memory by each worker.
+SEARCH_INDEX_DB = os.getenv("SEARCH_INDEX_DB", "search_index.db")
+SEARCH_INDEX_CACHE_SIZE = int(os.getenv("SEARCH_INDEX_CACHE_SIZE", "20"))
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", "50"))
+
+# Live scoring
+# Drafts sent over the live WebSocket are scored after LIVE_DEBOUNCE_MS
+# without edits, and at least every LIVE_MAX_DELAY_MS while edits keep coming.
+LIVE_DEBOUNCE_MS = float(os.getenv("LIVE_DEBOUNCE_MS", "150"))
+LIVE_MAX_DELAY_MS = float(os.getenv("LIVE_MAX_DELAY_MS", "1000"))
+LIVE_MAX_DRAFT_CHARS = int(os.getenv("LIVE_MAX_DRAFT_CHARS", "100000"))
+# Cached sentences per session
+LIVE_SEGMENT_CACHE_SIZE = int(os.getenv("LIVE_SEGMENT_CACHE_SIZE", "1000"))
+LIVE_AUTH_TIMEOUT_SECONDS = float(os.getenv("LIVE_AUTH_TIMEOUT_SECONDS", "10"))
+
+# Mood analytics
+# /analytics/timeseries returns at most ANALYTICS_MAX_POINTS buckets; longer
+# series are downsampled to that budget, or to a smaller one the client asks for.
+ANALYTICS_MAX_POINTS = int(os.getenv("ANALYTICS_MAX_POINTS", "500"))
+ANALYTICS_DEFAULT_WINDOW = int(os.getenv("ANALYTICS_DEFAULT_WINDOW", "7"))
+
+# Admission control
+# Each worker answers 503 at once to HTTP requests beyond
+# ADMISSION_MAX_IN_FLIGHT in progress. Within that, each work class runs at
+# most ADMISSION_<CLASS>_CONCURRENCY requests at once per worker;
+# ADMISSION_<CLASS>_QUEUE more may wait up to ADMISSION_<CLASS>_WAIT_MS for
+# a slot, and the rest get 503. Each user may make ADMISSION_<CLASS>_RATE
+# requests per second with bursts of ADMISSION_<CLASS>_BURST before getting
+# 429. 0 disables a limit. Entry writes that inference turns away, for either
+# reason, are scored with the lexicon instead of the user's model.
+ADMISSION_MAX_IN_FLIGHT = int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "128"))
+ADMISSION_INFERENCE_CONCURRENCY = int(os.getenv("ADMISSION_INFERENCE_CONCURRENCY", "64"))
+ADMISSION_INFERENCE_QUEUE = int(os.getenv("ADMISSION_INFERENCE_QUEUE", "256"))
+ADMISSION_INFERENCE_WAIT_MS = float(os.getenv("ADMISSION_INFERENCE_WAIT_MS", "1000"))
+ADMISSION_INFERENCE_RATE = float(os.getenv("ADMISSION_INFERENCE_RATE", "10"))
+ADMISSION_INFERENCE_BURST = float(os.getenv("ADMISSION_INFERENCE_BURST", "30"))
+ADMISSION_TRAINING_CONCURRENCY = int(os.getenv("ADMISSION_TRAINING_CONCURRENCY", "8"))
+ADMISSION_TRAINING_QUEUE = int(os.getenv("ADMISSION_TRAINING_QUEUE", "32"))
+ADMISSION_TRAINING_WAIT_MS = float(os.getenv("ADMISSION_TRAINING_WAIT_MS", "1000"))
+ADMISSION_TRAINING_RATE = float(os.getenv("ADMISSION_TRAINING_RATE", "0.1"))
+ADMISSION_TRAINING_BURST = float(os.getenv("ADMISSION_TRAINING_BURST", "3"))
+ADMISSION_STATS_CONCURRENCY = int(os.getenv("ADMISSION_STATS_CONCURRENCY", "16"))
+ADMISSION_STATS_QUEUE = int(os.getenv("ADMISSION_STATS_QUEUE", "64"))
+ADMISSION_STATS_WAIT_MS = float(os.getenv("ADMISSION_STATS_WAIT_MS", "1000"))
+ADMISSION_STATS_RATE = float(os.getenv("ADMISSION_STATS_RATE", "5"))
+ADMISSION_STATS_BURST = float(os.getenv("ADMISSION_STATS_BURST", "20"))
+# Users whose rate limit state each worker keeps
+ADMISSION_MAX_USERS = int(os.getenv("ADMISSION_MAX_USERS", "10000"))
+# Retry-After sent when TRAINING_MAX_PENDING jobs are already queued
+TRAINING_RETRY_AFTER_SECONDS = float(os.getenv("TRAINING_RETRY_AFTER_SECONDS", "30"))
+
+# Metrics and request tracing
+# METRICS_SERVER_TIMING adds a Server-Timing header with per-stage durations
+# to every response; METRICS_TOKEN, when set, is required as a bearer token
+# on /metrics.
+METRICS_SERVER_TIMING = os.getenv("METRICS_SERVER_TIMING", "false").lower() == "true"
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
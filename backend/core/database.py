@@ -0,0 +1,130 @@
+from typing import Optional
+import logging
+
+import httpx
+from postgrest import AsyncPostgrestClient
+
+from core import config
+from core.metrics import span
+
+logger = logging.getLogger(__name__)
+
+
+class TimedTransport(httpx.AsyncBaseTransport):
+    """Records each Supabase call as a "db" or "auth_remote" stage.
+
+    Timed up to the response headers; streamed bodies are read by the caller.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        stage = "auth_remote" if request.url.path.startswith("/auth/") else "db"
+        with span(stage):
+            return await self._transport.handle_async_request(request)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class HttpClient(httpx.AsyncClient):
+    """httpx client that frees each response body as soon as the caller drops it.
+
+    httpx links every response and its stream in a reference cycle, so a
+    read response lives until the next garbage collection pass; paging
+    through a large table would pile up many pages before one runs.
+    """
+
+    async def send(self, request: httpx.Request, *, stream: bool = False, **kwargs) -> httpx.Response:
+        response = await super().send(request, stream=stream, **kwargs)
+        if not stream:
+            # The body is read and the connection released; break the cycle
+            response.stream = httpx.ByteStream(response.content)
+        return response
+
+
+class Database:
+    """Async PostgREST client backed by a shared keep-alive connection pool.
+
+    One pool is shared by every request on a worker, so queries reuse open
+    connections instead of paying a TCP/TLS handshake each time, and never
+    block the event loop.
+    """
+
+    def __init__(
+        self,
+        supabase_url: Optional[str],
+        api_key: Optional[str],
+        pool_size: int = 100,
+        keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        pool_timeout: float = 5.0
+    ):
+        self.supabase_url = supabase_url
+        self.api_key = api_key
+        self.limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout, pool=pool_timeout)
+        self._http: Optional[httpx.AsyncClient] = None
+        self._client: Optional[AsyncPostgrestClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        """Shared HTTP client, also used for auth server calls"""
+        if self._http is None:
+            self._http = HttpClient(
+                transport=TimedTransport(httpx.AsyncHTTPTransport(limits=self.limits)),
+                timeout=self.timeout,
+                headers={"apikey": self.api_key or ""},
+                follow_redirects=True
+            )
+        return self._http
+
+    @property
+    def client(self) -> AsyncPostgrestClient:
+        if self._client is None:
+            self._client = AsyncPostgrestClient(
+                f"{self.supabase_url}/rest/v1",
+                headers={
+                    "apikey": self.api_key or "",
+                    "Authorization": f"Bearer {self.api_key}",
+                },
+                http_client=self.http
+            )
+        return self._client
+
+    def table(self, name: str):
+        return self.client.table(name)
+
+    def rpc(self, func: str, params: dict):
+        return self.client.rpc(func, params)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._client = None
+        logger.info("Database connection pool closed")
+
+
+# Global instance
+db = Database(
+    supabase_url=config.SUPABASE_URL,
+    api_key=config.SUPABASE_KEY,
+    pool_size=config.DB_POOL_SIZE,
+    keepalive=config.DB_POOL_KEEPALIVE,
+    keepalive_expiry=config.DB_KEEPALIVE_EXPIRY,
+    timeout=config.DB_TIMEOUT,
+    connect_timeout=config.DB_CONNECT_TIMEOUT,
+    pool_timeout=config.DB_POOL_TIMEOUT
+)
+
+
+def get_db() -> Database:
+    return db
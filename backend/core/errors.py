@@ -0,0 +1,43 @@
+"""Map unexpected exceptions in route handlers to meaningful HTTP errors"""
+import logging
+
+import httpx
+from fastapi import HTTPException
+from postgrest.exceptions import APIError
+
+from core.metrics import ERRORS
+
+logger = logging.getLogger(__name__)
+
+
+def http_error(e: Exception) -> HTTPException:
+    """HTTPException for an error a handler did not expect.
+
+    Database and network failures keep their cause (502/504, or 400/409 for
+    rejected data) so clients can tell them from bugs; anything else is
+    logged with its traceback and returned as a plain 500 without internals.
+    """
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, APIError):
+        code = str(e.code or "")
+        if code.startswith("22"):
+            ERRORS.inc("db_invalid_input")
+            return HTTPException(status_code=400, detail=e.message or "Invalid input")
+        if code.startswith("23"):
+            ERRORS.inc("db_conflict")
+            return HTTPException(status_code=409, detail=e.message or "Conflicts with existing data")
+        ERRORS.inc("db_error")
+        logger.error(f"Database error {code}: {e.message}")
+        return HTTPException(status_code=502, detail="Database request failed")
+    if isinstance(e, httpx.TimeoutException):
+        ERRORS.inc("db_timeout")
+        logger.error(f"Database timeout: {type(e).__name__}")
+        return HTTPException(status_code=504, detail="Database timed out")
+    if isinstance(e, httpx.HTTPError):
+        ERRORS.inc("db_unavailable")
+        logger.error(f"Database unreachable: {str(e)}")
+        return HTTPException(status_code=502, detail="Database unavailable")
+    ERRORS.inc("internal")
+    logger.exception(f"Unhandled {type(e).__name__}: {str(e)}")
+    return HTTPException(status_code=500, detail="Internal server error")
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from core import config
+from core.sqlite import connect
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_versions (
+    user_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class UserVersions:
+    """Per-user data version counters in a SQLite file shared by every worker.
+
+    Every write to a user's journals bumps their counter, so anything derived
+    from their data is current exactly when it was built at the current
+    version. The file's random epoch goes into every ETag, so a deleted or
+    replaced file can never make an old ETag look current again. ``get``
+    and ``bump`` block on the file, so async code calls them in a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with connect(self.path) as conn:
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex,))
+            self.epoch = conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()["value"]
+
+    def get(self, user_id: str) -> int:
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT version FROM user_versions WHERE user_id = ?", (user_id,)).fetchone()
+        return row["version"] if row else 0
+
+    def bump(self, user_id: str) -> int:
+        with connect(self.path) as conn:
+            return conn.execute(
+                "INSERT INTO user_versions (user_id, version) VALUES (?, 1) "
+                "ON CONFLICT(user_id) DO UPDATE SET version = version + 1 RETURNING version",
+                (user_id,)
+            ).fetchone()["version"]
+
+
+class ResponseCache:
+    """Rendered response bodies keyed by (user, endpoint, params, version).
+
+    Old versions are never served, only evicted: by TTL, or oldest first
+    once the total body size passes ``max_bytes``.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_bytes: int = 16 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[bytes, Dict[str, str], float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= now:
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, key: tuple, body: bytes, headers: Dict[str, str]):
+        if self.ttl <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = (body, headers, time.time() + self.ttl)
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _discard(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[0])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+
+# Global instances
+user_versions = UserVersions(config.USER_VERSION_DB)
+response_cache = ResponseCache(ttl=config.RESPONSE_CACHE_TTL, max_bytes=config.RESPONSE_CACHE_BYTES)
+
+
+def _etag(user_id: str, endpoint: str, params: tuple, version: int) -> str:
+    digest = hashlib.blake2b(
+        repr((user_versions.epoch, user_id, endpoint, params, version)).encode("utf-8"), digest_size=12
+    ).hexdigest()
+    return f'"{digest}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+async def conditional_json(
+    request: Request,
+    user_id: str,
+    endpoint: str,
+    build: Callable[[], Awaitable[Tuple[Any, Dict[str, str]]]],
+    **encode_options
+) -> Response:
+    """Serve a per-user read endpoint with an ETag and a server-side cache.
+
+    ``build`` returns the response content and any extra headers. The
+    version is read before building, so a write racing with the build
+    can only leave an entry under a version that is already stale.
+    """
+    version = await asyncio.to_thread(user_versions.get, user_id)
+    params = tuple(sorted(request.query_params.multi_items()))
+    etag = _etag(user_id, endpoint, params, version)
+    validators = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+    if _matches(request.headers.get("if-none-match"), etag):
+        response_cache.not_modified += 1
+        return Response(status_code=304, headers=validators)
+
+    key = (user_id, endpoint, params, version)
+    cached = response_cache.get(key)
+    if cached is not None:
+        body, headers = cached
+        return Response(content=body, media_type="application/json", headers={**headers, **validators})
+
+    content, headers = await build()
+    body = JSONResponse(jsonable_encoder(content, **encode_options)).body
+    response_cache.put(key, body, headers)
+    return Response(content=body, media_type="application/json", headers={**headers, **validators})
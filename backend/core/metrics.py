@@ -0,0 +1,253 @@
+"""In-process metrics, request tracing and the Prometheus text exposition.
+
+Counters and histograms are plain in-memory structures, one set per
+worker process, rendered on demand by ``render()``. Stage timings are
+recorded with ``span()``; inside a request they also accumulate on the
+request's ``RequestTrace`` so the middleware can report a per-stage
+breakdown.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = "sentiment_journal"
+_INVALID_NAME = re.compile(r"[^a-zA-Z0-9_:]")
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts, +Inf count, sum)
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, (counts, total, value_sum) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {total}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {value_sum}")
+                lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {total}")
+        return lines
+
+
+class RequestTrace:
+    """Seconds spent per stage while handling one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total: float) -> str:
+        parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        parts.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(parts)
+
+
+_current_trace: contextvars.ContextVar[Optional[RequestTrace]] = contextvars.ContextVar("request_trace", default=None)
+
+REQUESTS = Counter(f"{NAMESPACE}_http_requests_total", "HTTP requests handled", ("method", "route", "status"))
+REQUEST_SECONDS = Histogram(f"{NAMESPACE}_http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+STAGE_SECONDS = Histogram(f"{NAMESPACE}_stage_duration_seconds", "Time spent per processing stage", ("stage",))
+ERRORS = Counter(f"{NAMESPACE}_errors_total", "Errors returned to clients", ("kind",))
+SLOW_REQUESTS = Counter(f"{NAMESPACE}_slow_requests_total", "Requests slower than SLOW_REQUEST_SECONDS", ("route",))
+
+_collectors: Dict[str, Callable[[], Dict]] = {}
+
+
+def register_collector(prefix: str, collect: Callable[[], Dict]):
+    """Export the numeric fields of a component's ``stats()`` dict as gauges"""
+    _collectors[prefix] = collect
+
+
+def record_stage(stage: str, seconds: float):
+    STAGE_SECONDS.observe(seconds, stage)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+def record_stages(stages: Dict[str, float]):
+    for stage, seconds in stages.items():
+        record_stage(stage, seconds)
+
+
+def observe_stages(stages: Dict[str, float]):
+    """Histograms only, for work shared by several requests"""
+    for stage, seconds in stages.items():
+        STAGE_SECONDS.observe(seconds, stage)
+
+
+def trace_stages(stages: Dict[str, float]):
+    """Current request's breakdown only; the histograms are fed elsewhere"""
+    trace = _current_trace.get()
+    if trace is not None:
+        for stage, seconds in stages.items():
+            trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Time a block as one stage; works around awaits as well as plain code"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], stage: str):
+    """Add a block's duration to a plain dict of stage timings.
+
+    For code that may run in a worker process, where the request trace is
+    out of reach; the caller records the dict with ``record_stages()``.
+    """
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def _metric_name(name: str) -> str:
+    return _INVALID_NAME.sub("_", name)
+
+
+def _flatten(prefix: str, stats: Dict, lines: List[str]):
+    for key, value in stats.items():
+        name = _metric_name(f"{prefix}_{key}")
+        if isinstance(value, dict):
+            _flatten(name, value, lines)
+        elif isinstance(value, bool):
+            lines.append(f"{name} {int(value)}")
+        elif isinstance(value, (int, float)):
+            lines.append(f"{name} {value}")
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in (REQUESTS, REQUEST_SECONDS, STAGE_SECONDS, ERRORS, SLOW_REQUESTS):
+        lines.extend(metric.render())
+    for prefix, collect in _collectors.items():
+        gauges: List[str] = []
+        try:
+            _flatten(f"{NAMESPACE}_{prefix}", collect() or {}, gauges)
+        except Exception as e:
+            logger.warning(f"Metrics collector {prefix} failed: {str(e)}")
+            continue
+        for gauge in gauges:
+            lines.append(f"# TYPE {gauge.split(' ', 1)[0]} gauge")
+            lines.append(gauge)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware: request counters and latency, Server-Timing and slow-request logging"""
+
+    def __init__(self, app, server_timing: bool = False, slow_request_seconds: float = 1.0):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_request_seconds = slow_request_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = RequestTrace()
+        token = _current_trace.set(trace)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing:
+                    total = time.perf_counter() - trace.started
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", trace.server_timing(total).encode("latin-1")))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_trace.reset(token)
+            elapsed = time.perf_counter() - trace.started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUESTS.inc(scope["method"], route, str(status))
+            REQUEST_SECONDS.observe(elapsed, scope["method"], route)
+            if elapsed >= self.slow_request_seconds:
+                SLOW_REQUESTS.inc(route)
+                breakdown = ", ".join(f"{stage}={seconds * 1000:.1f}ms" for stage, seconds in trace.stages.items())
+                logger.warning(
+                    f"Slow request {scope['method']} {scope['path']} -> {status} "
+                    f"in {elapsed * 1000:.1f}ms ({breakdown or 'no stages recorded'})"
+                )
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+import sqlite3
+
+
+@contextmanager
+def connect(path: str, immediate: bool = False):
+    """Open a WAL-mode connection, commit on success and always close it.
+
+    ``immediate`` takes the write lock up front, for read-modify-write
+    transactions shared between worker processes.
+    """
+    conn = sqlite3.connect(path, timeout=10, isolation_level=None if immediate else "DEFERRED")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    try:
+        if immediate:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        else:
+            with conn:
+                yield conn
+    finally:
+        conn.close()
@@ -16,11 +16,27 @@ CREATE TABLE IF NOT EXISTS journals (
 );
 
 -- Create indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_journals_user_id ON journals(user_id);
-CREATE INDEX IF NOT EXISTS idx_journals_created_at ON journals(created_at DESC);
+-- Every per-user read filters on user_id and orders newest first, so one
+-- composite index serves both the filter and the sort (and keyset paging)
+DROP INDEX IF EXISTS idx_journals_user_id;
+DROP INDEX IF EXISTS idx_journals_created_at;
+CREATE INDEX IF NOT EXISTS idx_journals_user_created ON journals(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_journals_sentiment ON journals(sentiment);
 CREATE INDEX IF NOT EXISTS idx_journals_mood_category ON journals(mood_category);
 
+-- Computed columns for list views; select them instead of content to avoid
+-- shipping whole entries. Keep the preview length in sync with
+-- PREVIEW_LENGTH in services/journal_queries.py
+CREATE OR REPLACE FUNCTION content_preview(journals)
+RETURNS TEXT AS $$
+    SELECT left($1.content, 280);
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION content_length(journals)
+RETURNS INTEGER AS $$
+    SELECT char_length($1.content);
+$$ LANGUAGE sql STABLE;
+
 -- Enable Row Level Security
 ALTER TABLE journals ENABLE ROW LEVEL SECURITY;
 
@@ -97,11 +113,13 @@ CREATE TRIGGER on_auth_user_created
     FOR EACH ROW EXECUTE FUNCTION public.handle_new_user();
 
 -- Create view for journal statistics
-CREATE OR REPLACE VIEW journal_stats AS
+CREATE OR REPLACE VIEW journal_stats
+WITH (security_invoker = true) AS
 SELECT 
     user_id,
     COUNT(*) as total_entries,
     AVG(sentiment) as average_sentiment,
+    STDDEV_POP(sentiment) as sentiment_std,
     COUNT(CASE WHEN mood_category = 'positive' THEN 1 END) as positive_entries,
     COUNT(CASE WHEN mood_category = 'negative' THEN 1 END) as negative_entries,
     COUNT(CASE WHEN mood_category = 'neutral' THEN 1 END) as neutral_entries,
@@ -113,45 +131,113 @@ GROUP BY user_id;
 -- Grant access to the view
 GRANT SELECT ON journal_stats TO authenticated;
 
--- Create function to get sentiment insights
-CREATE OR REPLACE FUNCTION get_sentiment_insights(user_uuid UUID)
+-- Create function to aggregate one user's entries entirely in SQL.
+-- Returns the running-aggregate state used by the API (count, mean, M2,
+-- label counts and the newest entries) plus the derived trend, so only a
+-- few hundred bytes leave the database regardless of history size.
+CREATE OR REPLACE FUNCTION get_journal_aggregate(user_uuid UUID, recent_limit INTEGER DEFAULT 32)
 RETURNS JSON AS $$
 DECLARE
     result JSON;
 BEGIN
+    IF auth.uid() IS DISTINCT FROM user_uuid AND auth.role() IS DISTINCT FROM 'service_role' THEN
+        RAISE EXCEPTION 'not allowed' USING ERRCODE = '42501';
+    END IF;
+
+    WITH recent AS (
+        SELECT id, sentiment, created_at,
+               ROW_NUMBER() OVER (ORDER BY created_at DESC, id DESC) AS position
+        FROM journals
+        WHERE user_id = user_uuid
+        ORDER BY created_at DESC, id DESC
+        LIMIT GREATEST(recent_limit, 14)
+    ),
+    totals AS (
+        SELECT
+            COUNT(*) AS total_entries,
+            COALESCE(AVG(sentiment), 0) AS average_sentiment,
+            COALESCE(VAR_POP(sentiment) * COUNT(*), 0) AS sentiment_m2,
+            COALESCE(STDDEV_POP(sentiment), 0) AS sentiment_std,
+            COUNT(CASE WHEN sentiment > 0.1 THEN 1 END) AS polarity_positive,
+            COUNT(CASE WHEN sentiment < -0.1 THEN 1 END) AS polarity_negative,
+            COUNT(CASE WHEN sentiment BETWEEN -0.1 AND 0.1 THEN 1 END) AS polarity_neutral
+        FROM journals
+        WHERE user_id = user_uuid
+    ),
+    trend AS (
+        SELECT
+            AVG(sentiment) FILTER (WHERE position <= 7) AS recent_average,
+            CASE WHEN (SELECT total_entries FROM totals) >= 14
+                 THEN AVG(sentiment) FILTER (WHERE position BETWEEN 8 AND 14) END AS older_average
+        FROM recent
+    )
     SELECT json_build_object(
-        'total_entries', COUNT(*),
-        'average_sentiment', AVG(sentiment),
-        'sentiment_std', STDDEV(sentiment),
-        'positive_entries', COUNT(CASE WHEN mood_category = 'positive' THEN 1 END),
-        'negative_entries', COUNT(CASE WHEN mood_category = 'negative' THEN 1 END),
-        'neutral_entries', COUNT(CASE WHEN mood_category = 'neutral' THEN 1 END),
-        'recent_entries', (
-            SELECT json_agg(
-                json_build_object(
-                    'id', id,
-                    'content', content,
-                    'sentiment', sentiment,
-                    'mood_category', mood_category,
-                    'created_at', created_at
-                )
-            )
+        'total_entries', t.total_entries,
+        'average_sentiment', t.average_sentiment,
+        'sentiment_m2', t.sentiment_m2,
+        'sentiment_std', t.sentiment_std,
+        'mood_counts', (
+            SELECT COALESCE(json_object_agg(mood_category, n), '{}'::json)
             FROM (
-                SELECT id, content, sentiment, mood_category, created_at
+                SELECT mood_category, COUNT(*) AS n
                 FROM journals
                 WHERE user_id = user_uuid
-                ORDER BY created_at DESC
-                LIMIT 7
-            ) recent
+                GROUP BY mood_category
+            ) moods
+        ),
+        'polarity_counts', json_strip_nulls(json_build_object(
+            'positive', NULLIF(t.polarity_positive, 0),
+            'negative', NULLIF(t.polarity_negative, 0),
+            'neutral', NULLIF(t.polarity_neutral, 0)
+        )),
+        'recent_average', tr.recent_average,
+        'trend', CASE
+            WHEN tr.recent_average > COALESCE(tr.older_average, tr.recent_average) + 0.1 THEN 'improving'
+            WHEN tr.recent_average < COALESCE(tr.older_average, tr.recent_average) - 0.1 THEN 'declining'
+            ELSE 'stable'
+        END,
+        'mood_stability', CASE WHEN t.sentiment_std < 0.3 THEN 'stable' ELSE 'variable' END,
+        'last_entry_date', (SELECT MAX(created_at) FROM recent),
+        'recent_entries', (
+            SELECT COALESCE(json_agg(json_build_object(
+                'id', id, 'sentiment', sentiment, 'created_at', created_at
+            ) ORDER BY position), '[]'::json)
+            FROM recent
         )
     ) INTO result
-    FROM journals
-    WHERE user_id = user_uuid;
-    
-    RETURN COALESCE(result, '{}'::json);
+    FROM totals t, trend tr;
+
+    RETURN result;
 END;
-$$ LANGUAGE plpgsql SECURITY DEFINER;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public;
+
+GRANT EXECUTE ON FUNCTION get_journal_aggregate(UUID, INTEGER) TO authenticated;
+
+-- Create function to get sentiment insights
+-- Same shape as the /insights response; the trend compares the newest 7
+-- entries with the 7 before them
+CREATE OR REPLACE FUNCTION get_sentiment_insights(user_uuid UUID)
+RETURNS JSON AS $$
+DECLARE
+    aggregate JSON;
+BEGIN
+    aggregate := get_journal_aggregate(user_uuid, 14);
+    IF (aggregate->>'total_entries')::INTEGER = 0 THEN
+        RETURN json_build_object('status', 'no_data', 'message', 'No journal entries found');
+    END IF;
+
+    RETURN json_build_object(
+        'status', 'success',
+        'total_entries', aggregate->'total_entries',
+        'average_sentiment', aggregate->'average_sentiment',
+        'sentiment_std', aggregate->'sentiment_std',
+        'sentiment_distribution', aggregate->'polarity_counts',
+        'recent_average', aggregate->'recent_average',
+        'trend', aggregate->'trend',
+        'mood_stability', aggregate->'mood_stability'
+    );
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public;
 
 -- Grant execute permission to authenticated users
 GRANT EXECUTE ON FUNCTION get_sentiment_insights(UUID) TO authenticated;
-
@@ -15,6 +15,32 @@ class JournalEntryResponse(BaseModel):
     mood_category: str
     created_at: datetime
     
+class JournalEntrySummary(BaseModel):
+    """List item; only the requested fields are set"""
+    id: int
+    created_at: datetime
+    user_id: Optional[str] = None
+    content: Optional[str] = None
+    content_truncated: Optional[bool] = None
+    title: Optional[str] = None
+    sentiment: Optional[float] = None
+    mood_category: Optional[str] = None
+
+class JournalSearchResult(JournalEntrySummary):
+    """Search hit; ``score`` is the cosine similarity to the query or entry"""
+    score: float
+
+class ImportRowResult(BaseModel):
+    row: int
+    status: str
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+class JournalImportResponse(BaseModel):
+    imported: int
+    failed: int
+    results: List[ImportRowResult]
+
 class JournalEntryUpdate(BaseModel):
     content: Optional[str] = None
     title: Optional[str] = None
@@ -27,13 +53,29 @@ class SentimentAnalysisResponse(BaseModel):
     textblob_sentiment: Optional[float] = None
     textblob_label: Optional[str] = None
 
-class ModelTrainingResponse(BaseModel):
+class BatchSentimentRequest(BaseModel):
+    texts: List[str]
+
+class BatchSentimentResponse(BaseModel):
+    results: List[SentimentAnalysisResponse]
+
+class TrainingJobResponse(BaseModel):
+    job_id: str
     status: str
+    stage: Optional[str] = None
+    progress: float = 0.0
+    joined: bool = False
     accuracy: Optional[float] = None
     training_samples: Optional[int] = None
     test_samples: Optional[int] = None
     classification_report: Optional[Dict[str, Any]] = None
     message: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    queued_seconds: Optional[float] = None
+    fetch_seconds: Optional[float] = None
+    train_seconds: Optional[float] = None
 
 class SentimentInsightsResponse(BaseModel):
     status: str
@@ -56,3 +98,19 @@ class UserStatsResponse(BaseModel):
     mood_stability: str
     last_entry_date: Optional[datetime] = None
 
+
+class TimeseriesBucket(BaseModel):
+    start: datetime
+    count: int
+    mean: float
+    min: float
+    max: float
+    labels: Dict[str, int]
+    rolling_mean: float
+
+class TimeseriesResponse(BaseModel):
+    bucket: str
+    window: int
+    total_entries: int
+    downsampled: bool
+    buckets: List[TimeseriesBucket]
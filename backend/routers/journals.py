@@ -0,0 +1,408 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+
+from models import (
+    JournalEntryCreate, JournalEntryResponse, JournalEntrySummary, JournalEntryUpdate, JournalImportResponse,
+    JournalSearchResult,
+    SentimentAnalysisResponse, BatchSentimentRequest, BatchSentimentResponse,
+    TrainingJobResponse
+)
+from services.training_jobs import training_queue, TrainingQueueFull
+from services.stats_store import stats_store
+from services.journal_queries import (
+    JOURNAL_FIELDS, InvalidQuery, fetch_page, parse_fields, select_columns, shape_row
+)
+from services.journal_export import EXPORT_FORMATS, export_entries
+from services.journal_import import IMPORT_FORMATS, import_entries, parse_upload
+from services.inference import inference_engine
+from services.sentiment import sentiment_analyzer
+from services.online_training import online_trainer
+from services.search_index import search_index
+from core.admission import AdmissionRejected, Saturated, inference_admission, training_admission
+from core.auth import get_current_user
+from core.errors import http_error
+from core.http_cache import conditional_json, user_versions
+from core.config import (
+    EXPORT_CHUNK_SIZE, IMPORT_CHUNK_SIZE, JOURNALS_MAX_LIMIT, MAX_BATCH_TEXTS, MAX_IMPORT_ROWS,
+    SEARCH_MAX_RESULTS, TRAINING_RETRY_AFTER_SECONDS
+)
+from core.database import Database, get_db
+
+router = APIRouter()
+
+async def _score_entry(content: str, user_id: str) -> Dict:
+    """Sentiment for an entry being saved; with the lexicon only when inference turns it away.
+
+    Both rejections degrade, rate limits included: losing the write is
+    worse than a lexicon label, and the lexicon costs the workers nothing.
+    """
+    try:
+        async with inference_admission.admit(user_id):
+            return await inference_engine.predict(content, user_id)
+    except AdmissionRejected:
+        inference_admission.degraded += 1
+        return (await asyncio.to_thread(sentiment_analyzer.predict_polarity, [content]))[0]
+
+@router.post("/journal", response_model=JournalEntryResponse)
+async def create_journal(
+    entry: JournalEntryCreate,
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Create a new journal entry with sentiment analysis"""
+    try:
+        # Analyze sentiment
+        sentiment_result = await _score_entry(entry.content, user["id"])
+        
+        # Create journal entry
+        journal_data = {
+            "user_id": user["id"],
+            "content": entry.content,
+            "title": entry.title,
+            "sentiment": sentiment_result["sentiment"],
+            "mood_category": sentiment_result["label"]
+        }
+        
+        result = await db.table("journals").insert(journal_data).execute()
+        
+        if result.data:
+            await asyncio.to_thread(stats_store.record_create, user["id"], result.data[0])
+            online_trainer.submit(user["id"], result.data)
+            await asyncio.to_thread(search_index.record_upsert, user["id"], result.data[0])
+            await asyncio.to_thread(user_versions.bump, user["id"])
+            return JournalEntryResponse(**result.data[0])
+        else:
+            raise HTTPException(status_code=500, detail="Failed to create journal entry")
+            
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/journals", response_model=List[JournalEntrySummary], response_model_exclude_unset=True)
+async def get_journals(
+    request: Request,
+    limit: int = Query(50, ge=1, le=JOURNALS_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    content_length: Optional[int] = Query(None, ge=0),
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Get user's journal entries, newest first.
+
+    Pass the X-Next-Cursor response header back as ``cursor`` for the next
+    page. ``fields`` picks columns (id and created_at are always included)
+    and ``content_length`` truncates content server-side.
+    """
+    try:
+        columns = select_columns(parse_fields(fields), content_length)
+
+        async def build():
+            rows, next_cursor = await fetch_page(db, user["id"], columns, limit, cursor=cursor, offset=offset)
+            entries = [JournalEntrySummary(**shape_row(row, content_length)) for row in rows]
+            return entries, ({"X-Next-Cursor": next_cursor} if next_cursor else {})
+
+        return await conditional_json(request, user["id"], "journals", build, exclude_unset=True)
+        
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/journals/export")
+async def export_journals(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|markdown)$"),
+    gzip: bool = False,
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Download all of the user's entries as NDJSON, CSV or Markdown, streamed"""
+    try:
+        stream = await export_entries(db, user["id"], export_format, chunk_size=EXPORT_CHUNK_SIZE, gzip=gzip)
+    except Exception as e:
+        raise http_error(e)
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"journals.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", f"{filename}.gz"
+    return StreamingResponse(
+        stream,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+async def _search_results(db, user_id: str, hits, content_length: Optional[int]) -> List[JournalSearchResult]:
+    """Fetch the hit entries in one query and return them in hit order"""
+    if not hits:
+        return []
+    result = await db.table("journals")\
+        .select(select_columns(list(JOURNAL_FIELDS), content_length))\
+        .eq("user_id", user_id)\
+        .in_("id", [entry_id for entry_id, _ in hits])\
+        .execute()
+    rows = {row["id"]: row for row in result.data}
+    return [
+        JournalSearchResult(**shape_row(rows[entry_id], content_length), score=score)
+        for entry_id, score in hits if entry_id in rows
+    ]
+
+@router.get("/journals/search", response_model=List[JournalSearchResult], response_model_exclude_unset=True)
+async def search_journals(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=1000),
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_RESULTS),
+    content_length: Optional[int] = Query(None, ge=0),
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Entries containing every word of ``q``, best TF-IDF match first.
+
+    Words are matched after the same normalization as sentiment analysis,
+    so stop words are ignored and plurals match their singular.
+    """
+    try:
+        async def build():
+            hits = await search_index.search(user["id"], q, limit, db)
+            return await _search_results(db, user["id"], hits, content_length), {}
+
+        return await conditional_json(request, user["id"], "journals/search", build, exclude_unset=True)
+    except Exception as e:
+        raise http_error(e)
+
+@router.post("/journals/import", response_model=JournalImportResponse)
+async def import_journals(
+    file: UploadFile = File(...),
+    import_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|csv)$"),
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Import many entries from an NDJSON or CSV upload.
+
+    Each record needs ``content`` and may set ``title`` and ``created_at``.
+    The format defaults to the file extension.
+    """
+    if import_format is None:
+        extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+        import_format = "csv" if extension == "csv" else "ndjson" if extension in ("ndjson", "jsonl") else None
+    if import_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Specify format=ndjson or format=csv")
+
+    try:
+        report = await import_entries(
+            db, user["id"], parse_upload(file.file, import_format),
+            chunk_size=IMPORT_CHUNK_SIZE, max_rows=MAX_IMPORT_ROWS
+        )
+        if report["imported"]:
+            # Cheaper to rebuild the aggregate in SQL than to apply every row
+            await asyncio.to_thread(stats_store.drop, user["id"])
+            await asyncio.to_thread(search_index.invalidate, user["id"])
+            await asyncio.to_thread(user_versions.bump, user["id"])
+        return JournalImportResponse(**report)
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/journal/{journal_id}", response_model=JournalEntryResponse)
+async def get_journal(
+    journal_id: int,
+    request: Request,
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Get a specific journal entry"""
+    try:
+        async def build():
+            result = await db.table("journals")\
+                .select("*")\
+                .eq("id", journal_id)\
+                .eq("user_id", user["id"])\
+                .execute()
+
+            if not result.data:
+                raise HTTPException(status_code=404, detail="Journal entry not found")
+
+            return JournalEntryResponse(**result.data[0]), {}
+
+        return await conditional_json(request, user["id"], f"journal/{journal_id}", build)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/journal/{journal_id}/similar", response_model=List[JournalSearchResult], response_model_exclude_unset=True)
+async def similar_journals(
+    journal_id: int,
+    request: Request,
+    limit: int = Query(10, ge=1, le=SEARCH_MAX_RESULTS),
+    content_length: Optional[int] = Query(None, ge=0),
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """The user's other entries most similar to this one, by TF-IDF cosine"""
+    try:
+        async def build():
+            hits = await search_index.similar(user["id"], journal_id, limit, db)
+            if hits is None:
+                raise HTTPException(status_code=404, detail="Journal entry not found")
+            return await _search_results(db, user["id"], hits, content_length), {}
+
+        return await conditional_json(request, user["id"], f"journal/{journal_id}/similar", build, exclude_unset=True)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise http_error(e)
+
+@router.put("/journal/{journal_id}", response_model=JournalEntryResponse)
+async def update_journal(
+    journal_id: int, 
+    entry_update: JournalEntryUpdate, 
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Update a journal entry"""
+    try:
+        # Get existing entry
+        existing = await db.table("journals")\
+            .select("*")\
+            .eq("id", journal_id)\
+            .eq("user_id", user["id"])\
+            .execute()
+        
+        if not existing.data:
+            raise HTTPException(status_code=404, detail="Journal entry not found")
+        
+        # Prepare update data
+        update_data = {}
+        if entry_update.content is not None and entry_update.content != existing.data[0]["content"]:
+            update_data["content"] = entry_update.content
+            # Re-analyze sentiment if content changed
+            sentiment_result = await _score_entry(entry_update.content, user["id"])
+            update_data["sentiment"] = sentiment_result["sentiment"]
+            update_data["mood_category"] = sentiment_result["label"]
+        
+        if entry_update.title is not None:
+            update_data["title"] = entry_update.title
+
+        if not update_data:
+            # Nothing changed; PostgREST would return no rows for an empty PATCH
+            return JournalEntryResponse(**existing.data[0])
+
+        # Update entry
+        result = await db.table("journals")\
+            .update(update_data)\
+            .eq("id", journal_id)\
+            .eq("user_id", user["id"])\
+            .execute()
+        
+        if result.data:
+            await asyncio.to_thread(stats_store.record_update, user["id"], existing.data[0], result.data[0])
+            if "content" in update_data:
+                online_trainer.submit(user["id"], result.data)
+                await asyncio.to_thread(search_index.record_upsert, user["id"], result.data[0])
+            await asyncio.to_thread(user_versions.bump, user["id"])
+            return JournalEntryResponse(**result.data[0])
+        else:
+            raise HTTPException(status_code=500, detail="Failed to update journal entry")
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise http_error(e)
+
+@router.delete("/journal/{journal_id}")
+async def delete_journal(
+    journal_id: int,
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Delete a journal entry"""
+    try:
+        result = await db.table("journals")\
+            .delete()\
+            .eq("id", journal_id)\
+            .eq("user_id", user["id"])\
+            .execute()
+        
+        if result.data:
+            for deleted in result.data:
+                await asyncio.to_thread(stats_store.record_delete, user["id"], deleted)
+                await asyncio.to_thread(search_index.record_delete, user["id"], deleted["id"])
+            await asyncio.to_thread(user_versions.bump, user["id"])
+            return {"message": "Journal entry deleted successfully"}
+        else:
+            raise HTTPException(status_code=404, detail="Journal entry not found")
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise http_error(e)
+
+@router.post("/analyze-sentiment", response_model=SentimentAnalysisResponse)
+async def analyze_sentiment(text: str, user=Depends(get_current_user)):
+    """Analyze sentiment of text without saving"""
+    try:
+        async with inference_admission.admit(user["id"]):
+            result = await inference_engine.predict(text, user["id"])
+        return SentimentAnalysisResponse(**result)
+    except Exception as e:
+        raise http_error(e)
+
+@router.post("/analyze-sentiment/batch", response_model=BatchSentimentResponse)
+async def analyze_sentiment_batch(request: BatchSentimentRequest, user=Depends(get_current_user)):
+    """Analyze sentiment of many texts in one call, results in input order"""
+    if len(request.texts) > MAX_BATCH_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_TEXTS} texts per batch")
+    try:
+        async with inference_admission.admit(user["id"]):
+            results = await inference_engine.predict_many(request.texts, user["id"])
+        return BatchSentimentResponse(results=[SentimentAnalysisResponse(**result) for result in results])
+    except Exception as e:
+        raise http_error(e)
+
+def _job_response(job: Dict) -> TrainingJobResponse:
+    def timestamp(value: Optional[float]) -> Optional[datetime]:
+        return datetime.fromtimestamp(value, tz=timezone.utc) if value is not None else None
+
+    return TrainingJobResponse(
+        job_id=job["id"],
+        status=job["status"],
+        stage=job["stage"],
+        progress=job["progress"],
+        joined=job.get("joined", False),
+        accuracy=job["accuracy"],
+        training_samples=job["training_samples"],
+        test_samples=job["test_samples"],
+        classification_report=job["classification_report"],
+        message=job["message"],
+        created_at=timestamp(job["created_at"]),
+        started_at=timestamp(job["started_at"]),
+        finished_at=timestamp(job["finished_at"]),
+        queued_seconds=(job["started_at"] - job["created_at"]) if job["started_at"] else None,
+        fetch_seconds=job["fetch_seconds"],
+        train_seconds=job["train_seconds"]
+    )
+
+@router.post("/train-model", response_model=TrainingJobResponse, status_code=202)
+async def train_model(user=Depends(get_current_user), db: Database = Depends(get_db)):
+    """Queue training of the user's own model on their journal entries"""
+    try:
+        async with training_admission.admit(user["id"]):
+            job = await training_queue.submit(user["id"], db)
+        return _job_response(job)
+    except TrainingQueueFull as e:
+        raise Saturated(str(e), TRAINING_RETRY_AFTER_SECONDS)
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/train-model/{job_id}", response_model=TrainingJobResponse)
+async def get_training_job(job_id: str, user=Depends(get_current_user)):
+    """Get progress and results of a training job"""
+    job = training_queue.get(job_id)
+    if job is None or job["user_id"] != user["id"]:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return _job_response(job)
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import time
+from typing import Dict, Optional, Tuple
+import logging
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+
+from services.live_scoring import DraftError, DraftSession, live_scoring
+from core.auth import AuthenticationError, authenticate_token
+from core.config import LIVE_AUTH_TIMEOUT_SECONDS, LIVE_DEBOUNCE_MS, LIVE_MAX_DELAY_MS
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _authenticate(websocket: WebSocket) -> Optional[Tuple[Dict, Optional[float]]]:
+    """(user, token expiry) from the Authorization header or a first "auth" message"""
+    scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        # Browsers cannot set headers on a WebSocket, so they send the token first
+        try:
+            message = json.loads(await asyncio.wait_for(websocket.receive_text(), LIVE_AUTH_TIMEOUT_SECONDS))
+        except WebSocketDisconnect:
+            return None
+        except (asyncio.TimeoutError, ValueError):
+            message = None
+        if not isinstance(message, dict) or message.get("type") != "auth" or not isinstance(message.get("token"), str):
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Authentication required")
+            return None
+        token = message["token"]
+    try:
+        return await authenticate_token(token)
+    except AuthenticationError:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
+        return None
+
+
+async def _score_when_idle(websocket: WebSocket, session: DraftSession, edited: asyncio.Event):
+    """Score the draft once edits pause for LIVE_DEBOUNCE_MS, or LIVE_MAX_DELAY_MS after the first"""
+    loop = asyncio.get_running_loop()
+    while True:
+        await edited.wait()
+        deadline = loop.time() + LIVE_MAX_DELAY_MS / 1000.0
+        while True:
+            edited.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(edited.wait(), min(LIVE_DEBOUNCE_MS / 1000.0, remaining))
+            except asyncio.TimeoutError:
+                break
+        if session.version == session.scored_version:
+            continue
+        try:
+            result = await live_scoring.score(session)
+        except Exception as e:
+            logger.error(f"Live scoring for user {session.user_id} failed: {str(e)}")
+            await websocket.send_json({"type": "error", "detail": "Scoring failed"})
+            continue
+        await websocket.send_json({"type": "score", **result})
+
+
+@router.websocket("/analyze-sentiment/live")
+async def live_sentiment(websocket: WebSocket):
+    """Score a draft while it is being written.
+
+    Authenticate with an Authorization header or, from a browser, a first
+    message {"type": "auth", "token": ...}; the token is verified once and
+    the connection closes when it expires. Then send {"type": "replace",
+    "text": ...} or {"type": "edit", "start": i, "end": j, "text": ...},
+    which replaces draft[i:j] (in code points). Once edits pause, the server
+    sends {"type": "score", "version": n, "label": ..., "confidence": ...}
+    for the draft after the first n edits.
+    """
+    await websocket.accept()
+    authenticated = await _authenticate(websocket)
+    if authenticated is None:
+        return
+    user, expires_at = authenticated
+
+    session = live_scoring.open(user["id"])
+    edited = asyncio.Event()
+    scorer = asyncio.create_task(_score_when_idle(websocket, session, edited))
+    try:
+        while True:
+            timeout = (expires_at - time.time()) if expires_at is not None else None
+            if timeout is not None and timeout <= 0:
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Token expired")
+                return
+            try:
+                raw = await asyncio.wait_for(websocket.receive_text(), timeout)
+            except asyncio.TimeoutError:
+                continue
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                message = None
+            try:
+                live_scoring.apply(session, message)
+            except DraftError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            edited.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_scoring.close(session)
+        scorer.cancel()
+        # wait() rather than gather(), which would re-raise the scorer's own
+        # cancellation; a send that failed on disconnect is not worth logging
+        await asyncio.wait([scorer])
+        if not scorer.cancelled():
+            scorer.exception()
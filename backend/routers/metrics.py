@@ -0,0 +1,45 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core import admission, metrics
+from core.auth import token_verifier
+from core.config import METRICS_TOKEN
+from core.http_cache import response_cache
+from services.inference import inference_engine
+from services.live_scoring import live_scoring
+from services.online_training import online_trainer
+from services.search_index import search_index
+from services.training_jobs import training_queue
+
+router = APIRouter()
+
+
+def _inference_stats():
+    stats = inference_engine.stats()
+    # One series per distinct batch size is too many gauges to be useful
+    stats.pop("batch_size_counts", None)
+    return stats
+
+
+metrics.register_collector("admission", admission.stats)
+metrics.register_collector("auth", token_verifier.stats)
+metrics.register_collector("inference", _inference_stats)
+metrics.register_collector("live", live_scoring.stats)
+metrics.register_collector("models", inference_engine.model_stats)
+metrics.register_collector("online_training", online_trainer.stats)
+metrics.register_collector("response_cache", response_cache.stats)
+metrics.register_collector("search", search_index.stats)
+metrics.register_collector("training", training_queue.stats)
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition of this worker's metrics"""
+    if METRICS_TOKEN:
+        _, _, token = (authorization or "").partition(" ")
+        if not hmac.compare_digest(token.encode(), METRICS_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
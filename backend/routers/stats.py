@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+
+from models import SentimentInsightsResponse, TimeseriesResponse, UserStatsResponse
+from services.analytics import fetch_series, timeseries
+from services.stats_store import load_user_stats
+from core.admission import stats_admission
+from core.auth import get_current_user
+from core.config import ANALYTICS_DEFAULT_WINDOW, ANALYTICS_MAX_POINTS
+from core.errors import http_error
+from core.http_cache import conditional_json
+from core.database import Database, get_db
+
+router = APIRouter()
+
+@router.get("/insights", response_model=SentimentInsightsResponse)
+async def get_insights(request: Request, user=Depends(get_current_user), db: Database = Depends(get_db)):
+    """Get sentiment insights from user's journal entries"""
+    try:
+        async def build():
+            # Served from the user's running aggregate, not a scan of every entry
+            async with stats_admission.admit(user["id"]):
+                aggregate = await load_user_stats(user["id"], db)
+            return SentimentInsightsResponse(**aggregate.to_insights()), {}
+
+        return await conditional_json(request, user["id"], "insights", build)
+        
+    except Exception as e:
+        raise http_error(e)
+
+@router.get("/stats", response_model=UserStatsResponse)
+async def get_user_stats(request: Request, user=Depends(get_current_user), db: Database = Depends(get_db)):
+    """Get user statistics"""
+    try:
+        async def build():
+            async with stats_admission.admit(user["id"]):
+                aggregate = await load_user_stats(user["id"], db)
+            return UserStatsResponse(**aggregate.to_stats()), {}
+
+        return await conditional_json(request, user["id"], "stats", build)
+        
+    except Exception as e:
+        raise http_error(e)
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+@router.get("/analytics/timeseries", response_model=TimeseriesResponse)
+async def get_timeseries(
+    request: Request,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    bucket: str = Query("day", pattern="^(day|week|month)$"),
+    window: int = Query(ANALYTICS_DEFAULT_WINDOW, ge=1, le=366),
+    points: int = Query(ANALYTICS_MAX_POINTS, ge=3, le=ANALYTICS_MAX_POINTS),
+    user=Depends(get_current_user),
+    db: Database = Depends(get_db)
+):
+    """Mood over time in UTC day, week or month buckets, for charts.
+
+    ``from`` is inclusive and ``to`` exclusive; times without a zone are UTC.
+    ``window`` is the rolling mean width in buckets. Series longer than
+    ``points`` buckets are downsampled with LTTB.
+    """
+    try:
+        start, end = _utc(start), _utc(end)
+        if start is not None and end is not None and start >= end:
+            raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+
+        async def build():
+            async with stats_admission.admit(user["id"]):
+                series = await fetch_series(db, user["id"], start, end)
+                buckets, downsampled = timeseries(series, bucket, window, points)
+            return TimeseriesResponse(
+                bucket=bucket,
+                window=window,
+                total_entries=len(series),
+                downsampled=downsampled,
+                buckets=buckets
+            ), {}
+
+        return await conditional_json(request, user["id"], "analytics_timeseries", build)
+
+    except Exception as e:
+        raise http_error(e)
@@ -0,0 +1,203 @@
+"""Mood over time: per-bucket statistics for charts.
+
+Entries are read without their content (id, created_at, sentiment,
+mood_category), held as NumPy arrays, and grouped in one vectorized pass.
+Buckets are calendar days, ISO weeks (starting Monday) or months, in UTC.
+Rolling means are entry-weighted over the last ``window`` calendar buckets,
+empty ones included. Long series can be cut down to a point budget with
+Largest-Triangle-Three-Buckets, which keeps the buckets that shape the
+curve (peaks, dips) instead of every n-th one.
+"""
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from services.journal_queries import fetch_page
+from services.sentiment import LABELS
+
+if TYPE_CHECKING:
+    import numpy as np
+
+BUCKETS = ("day", "week", "month")
+# id and created_at are the keyset columns fetch_page pages on
+COLUMNS = "id, created_at, sentiment, mood_category"
+FETCH_CHUNK_SIZE = 1000
+
+_LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+_UNKNOWN_LABEL = len(LABELS)
+# 1970-01-01 was a Thursday; ISO weeks start on Monday
+_EPOCH_WEEKDAY = 3
+
+
+class Series:
+    """A user's entries in time order, as columns"""
+
+    def __init__(self, times: "np.ndarray", sentiments: "np.ndarray", labels: "np.ndarray"):
+        self.times = times
+        self.sentiments = sentiments
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "Series":
+        import numpy as np
+        times = _parse_times([row["created_at"] for row in rows])
+        sentiments = np.fromiter((row["sentiment"] or 0.0 for row in rows), dtype=np.float64, count=len(rows))
+        labels = np.fromiter(
+            (_LABEL_CODES.get(row["mood_category"], _UNKNOWN_LABEL) for row in rows), dtype=np.int8, count=len(rows)
+        )
+        order = np.argsort(times, kind="stable")
+        return cls(times[order], sentiments[order], labels[order])
+
+
+def _parse_times(values: List[str]) -> "np.ndarray":
+    """ISO timestamps to UTC datetime64[us]; PostgREST returns them in UTC already"""
+    import numpy as np
+    stripped = []
+    for value in values:
+        if value.endswith("Z"):
+            stripped.append(value[:-1])
+        elif value.endswith("+00:00"):
+            stripped.append(value[:-6])
+        else:
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            stripped.append(parsed.isoformat())
+    return np.array(stripped, dtype="datetime64[us]")
+
+
+def bucket_starts(times: "np.ndarray", bucket: str) -> "np.ndarray":
+    """Start of the bucket each timestamp falls in, as datetime64[D] or [M]"""
+    import numpy as np
+    if bucket == "day":
+        return times.astype("datetime64[D]")
+    if bucket == "week":
+        days = times.astype("datetime64[D]").astype(np.int64)
+        return (days - (days + _EPOCH_WEEKDAY) % 7).astype("datetime64[D]")
+    if bucket == "month":
+        return times.astype("datetime64[M]")
+    raise ValueError(f"Unknown bucket {bucket!r}, expected one of {', '.join(BUCKETS)}")
+
+
+def _calendar_index(starts: "np.ndarray", bucket: str) -> "np.ndarray":
+    """Position of each bucket start on a gapless calendar of buckets"""
+    import numpy as np
+    ordinals = starts.astype(np.int64)
+    if bucket == "week":
+        ordinals = ordinals // 7
+    return ordinals - ordinals[0]
+
+
+def lttb(x: "np.ndarray", y: "np.ndarray", threshold: int) -> "np.ndarray":
+    """Indices of the ``threshold`` points Largest-Triangle-Three-Buckets keeps.
+
+    The first and last points are always kept; each bucket in between keeps
+    the point forming the largest triangle with the previously kept point
+    and the average of the next bucket.
+    """
+    import numpy as np
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries over points 1..count-2, plus the last point as a bucket
+    edges = np.empty(threshold, dtype=np.int64)
+    edges[:-1] = (np.arange(threshold - 1) * (count - 2) / (threshold - 2)).astype(np.int64) + 1
+    edges[-2:] = count - 1, count
+    sizes = np.diff(edges)
+    average_x = (np.add.reduceat(x, edges[:-1]) / sizes).tolist()
+    average_y = (np.add.reduceat(y, edges[:-1]) / sizes).tolist()
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+        px, py = x[previous], y[previous]
+        next_x, next_y = average_x[i + 1], average_y[i + 1]
+        areas = np.abs((px - next_x) * (y[start:end] - py) - (px - x[start:end]) * (next_y - py))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+
+def timeseries(series: Series, bucket: str = "day", window: int = 7,
+               points: Optional[int] = None) -> Tuple[List[Dict], bool]:
+    """Per-bucket statistics, oldest first, and whether they were downsampled"""
+    import numpy as np
+    if not len(series):
+        return [], False
+    starts = bucket_starts(series.times, bucket)
+    # Times are sorted, so each bucket is one run of equal starts
+    boundaries = np.flatnonzero(starts[1:] != starts[:-1]) + 1
+    first = np.concatenate(([0], boundaries))
+    unique_starts = starts[first]
+    counts = np.diff(np.concatenate((first, [len(starts)])))
+    group = np.repeat(np.arange(len(first)), counts)
+
+    sentiments = series.sentiments
+    sums = np.add.reduceat(sentiments, first)
+    means = sums / counts
+    minimums = np.minimum.reduceat(sentiments, first)
+    maximums = np.maximum.reduceat(sentiments, first)
+    label_counts = np.bincount(
+        group * (_UNKNOWN_LABEL + 1) + series.labels, minlength=len(first) * (_UNKNOWN_LABEL + 1)
+    ).reshape(len(first), _UNKNOWN_LABEL + 1)
+
+    # Rolling means over a gapless calendar, so empty buckets count as time
+    calendar = _calendar_index(unique_starts, bucket)
+    span = int(calendar[-1]) + 1
+    calendar_sums = np.zeros(span)
+    calendar_counts = np.zeros(span)
+    calendar_sums[calendar] = sums
+    calendar_counts[calendar] = counts
+    cumulative_sums = np.concatenate(([0.0], np.cumsum(calendar_sums)))
+    cumulative_counts = np.concatenate(([0.0], np.cumsum(calendar_counts)))
+    lower = np.maximum(calendar + 1 - window, 0)
+    rolling = (cumulative_sums[calendar + 1] - cumulative_sums[lower]) / (
+        cumulative_counts[calendar + 1] - cumulative_counts[lower]
+    )
+
+    keep = np.arange(len(first))
+    downsampled = points is not None and len(first) > points
+    if downsampled:
+        keep = lttb(unique_starts.astype("datetime64[D]").astype(np.int64), means, points)
+
+    keep = keep.tolist()
+    starts_kept = unique_starts[keep].astype("datetime64[D]").astype(datetime).tolist()
+    columns = zip(
+        starts_kept, counts[keep].tolist(), means[keep].tolist(), minimums[keep].tolist(),
+        maximums[keep].tolist(), label_counts[keep].tolist(), rolling[keep].tolist()
+    )
+    midnight = datetime.min.time()
+    return [
+        {
+            "start": datetime.combine(start, midnight, tzinfo=timezone.utc),
+            "count": count,
+            "mean": mean,
+            "min": minimum,
+            "max": maximum,
+            "labels": dict(zip(LABELS, labels)),
+            "rolling_mean": rolling_mean,
+        }
+        for start, count, mean, minimum, maximum, labels, rolling_mean in columns
+    ], downsampled
+
+
+async def fetch_series(db, user_id: str, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> Series:
+    """The user's entries in [start, end), without content, in keyset pages"""
+    rows: List[Dict] = []
+    cursor = None
+    while True:
+        page, cursor = await fetch_page(
+            db, user_id, COLUMNS, FETCH_CHUNK_SIZE, cursor=cursor,
+            start=start.isoformat() if start is not None else None,
+            end=end.isoformat() if end is not None else None
+        )
+        rows.extend(page)
+        if cursor is None:
+            # Pages come newest first; from_rows sorts by time
+            return Series.from_rows(rows)
@@ -0,0 +1,348 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from core import config
+from core.metrics import observe_stages, record_stages, span, trace_stages
+from services.sentiment_cache import SentimentCache, sentiment_cache
+
+logger = logging.getLogger(__name__)
+
+def _registry_stats() -> Dict:
+    """This worker's model registry stats, tagged with its pid"""
+    from services.model_registry import model_registry
+    return {**model_registry.stats(), "pid": os.getpid()}
+
+
+def predict_batch(items: List[Tuple[Optional[str], str]],
+                  prepared: List[Tuple[Optional[str], str, float]] = ()) -> Tuple[List[Dict], Dict[str, float], Dict]:
+    """Score (user_id, text) pairs with one vectorizer/model pass per model.
+
+    Runs in a pool worker, each of which keeps its own model registry and
+    reloads models whose files changed on disk. ``prepared`` holds (user_id,
+    preprocessed text, polarity) triples, scored after ``items``. Returns
+    the results in that order, the seconds spent per stage and the worker's
+    registry stats, since the registry in the API process never serves.
+    """
+    from services.model_registry import model_registry
+    timings: Dict[str, float] = {}
+    results = model_registry.predict_batch(items, timings)
+    if prepared:
+        results += model_registry.predict_prepared(prepared, timings)
+    return results, timings, _registry_stats()
+
+
+def _warm_up() -> Dict:
+    from services.model_registry import model_registry
+    try:
+        model_registry.warm_up()
+    except Exception as e:
+        # Keep the worker: requests fall back or fail with the same error
+        logger.error(f"Inference warm-up failed: {str(e)}")
+    return _registry_stats()
+
+
+class InferenceEngine:
+    """Micro-batching front end for sentiment inference.
+
+    Requests that arrive within ``batch_window_ms`` of each other are coalesced
+    into a single batch (up to ``max_batch_size``) and scored in a worker
+    process, so CPU-bound inference never runs on the event loop.
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_batch_size: int = 32,
+        batch_window_ms: float = 5.0,
+        bulk_chunk_size: int = 1000,
+        cache: Optional[SentimentCache] = None
+    ):
+        self.workers = workers
+        self.max_batch_size = max(1, max_batch_size)
+        self.bulk_chunk_size = max(1, bulk_chunk_size)
+        self.batch_window = batch_window_ms / 1000.0
+        self.cache = cache
+        self._executor: Optional[Executor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._in_flight = set()
+        # Latest model registry stats from each worker, by pid
+        self._worker_models: Dict[int, Dict] = {}
+
+        # Metrics
+        self.requests = 0
+        self.predictions = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.largest_batch = 0
+        self.last_batch_size = 0
+        self.batch_sizes: Dict[int, int] = {}
+        self.total_batch_seconds = 0.0
+
+    def _create_executor(self) -> Executor:
+        if self.workers <= 0:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_up
+        )
+
+    async def start(self):
+        if self._batcher is not None:
+            return
+        self._executor = self._create_executor()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(max(1, self.workers))
+        self._batcher = asyncio.create_task(self._run())
+        logger.info(
+            f"Inference engine started (workers={self.workers}, "
+            f"batch_size={self.max_batch_size}, window={self.batch_window * 1000:.1f}ms)"
+        )
+
+    async def stop(self):
+        if self._batcher is None:
+            return
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+        # Nothing will ever take what is still queued
+        stopped = RuntimeError("Inference engine stopped")
+        while not self._queue.empty():
+            self._fail([self._queue.get_nowait()], stopped)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._worker_models.clear()
+        self._batcher = None
+        self._executor = None
+        self._queue = None
+
+    async def warm_up(self):
+        """Warm every worker now rather than on the first requests"""
+        if self._batcher is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        # Concurrent submissions make the pool spawn all of its workers
+        reports = await asyncio.gather(*[
+            loop.run_in_executor(self._executor, _warm_up) for _ in range(max(1, self.workers))
+        ])
+        for report in reports:
+            self._record_models(report)
+
+    def _cache_lookup(self, texts: List[str], user_id: Optional[str]) -> Tuple[List[bytes], List[Optional[Dict]]]:
+        """Cache keys and cached results; stats model files and may read SQLite, so runs on a thread"""
+        from services.model_registry import model_registry
+        version = model_registry.version_token(user_id)
+        keys = [self.cache.key(version, text) for text in texts]
+        return keys, self.cache.get_many(keys, self._seconds_per_prediction)
+
+    @property
+    def _seconds_per_prediction(self) -> float:
+        return self.total_batch_seconds / self.predictions if self.predictions else 0.0
+
+    async def predict(self, text: str, user_id: Optional[str] = None) -> Dict:
+        """Queue a text for scoring with the user's model and wait for its result"""
+        return (await self.predict_many([text], user_id, batched=True))[0]
+
+    async def predict_many(self, texts: List[str], user_id: Optional[str] = None,
+                           batched: bool = False) -> List[Dict]:
+        """Score texts with the user's model, serving repeats from the result cache.
+
+        Misses go through the micro-batch queue when ``batched``, otherwise
+        straight to the workers in bulk-sized chunks.
+        """
+        if self._batcher is None:
+            await self.start()
+        self.requests += len(texts)
+        keys: Optional[List[bytes]] = None
+        results: List[Optional[Dict]] = [None] * len(texts)
+        if self.cache is not None and self.cache.enabled and texts:
+            keys, results = await asyncio.to_thread(self._cache_lookup, texts, user_id)
+        # Score each distinct text once; repeats within the call share its result
+        pending: Dict[object, List[int]] = {}
+        for index, result in enumerate(results):
+            if result is None:
+                pending.setdefault(keys[index] if keys else index, []).append(index)
+        if not pending:
+            return results
+
+        items = [(user_id, texts[indices[0]]) for indices in pending.values()]
+        with span("inference"):
+            if batched:
+                scored = await asyncio.gather(*[self._enqueue(item) for item in items])
+            else:
+                chunks = [items[i:i + self.bulk_chunk_size] for i in range(0, len(items), self.bulk_chunk_size)]
+                chunk_results = await asyncio.gather(*[self._run_chunk(chunk) for chunk in chunks])
+                scored = [result for chunk in chunk_results for result in chunk]
+
+        for indices, result in zip(pending.values(), scored):
+            for index in indices:
+                results[index] = dict(result) if index != indices[0] else result
+        if keys:
+            await asyncio.to_thread(
+                self.cache.put_many, [(key, results[indices[0]]) for key, indices in pending.items()]
+            )
+        return results
+
+    async def predict_prepared(self, processed: str, polarity: float, user_id: Optional[str] = None) -> Dict:
+        """Score a text the caller already preprocessed and scored for polarity.
+
+        Goes through the micro-batch queue like ``predict`` but skips the
+        result cache, since callers (live drafts) rarely repeat a text.
+        """
+        if self._batcher is None:
+            await self.start()
+        self.requests += 1
+        with span("inference"):
+            return await self._enqueue((user_id, processed, polarity), prepared=True)
+
+    async def _enqueue(self, item: tuple, prepared: bool = False) -> Dict:
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, prepared, future))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        result, timings = await future
+        # The batch's stage histograms were recorded once by _dispatch
+        trace_stages(timings)
+        return result
+
+    async def _run_chunk(self, items: List[Tuple[Optional[str], str]]) -> List[Dict]:
+        async with self._slots:
+            started = time.perf_counter()
+            executor = self._executor
+            loop = asyncio.get_running_loop()
+            try:
+                results, timings, models = await loop.run_in_executor(executor, predict_batch, items)
+            except BrokenProcessPool:
+                self.failed_batches += 1
+                self._restart_pool(executor)
+                raise
+        self._record_batch(len(items), time.perf_counter() - started)
+        self._record_models(models)
+        record_stages(timings)
+        return results
+
+    async def _collect(self, batch: List[Tuple[tuple, bool, asyncio.Future]]):
+        """Fill ``batch`` in place, so a cancelled batcher still knows what it held"""
+        batch.append(await self._queue.get())
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        batch = []
+        try:
+            while True:
+                await self._collect(batch)
+                await self._slots.acquire()
+                task = asyncio.create_task(self._dispatch(batch))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+                batch = []
+        finally:
+            # Collected but never dispatched
+            self._fail(batch, RuntimeError("Inference engine stopped"))
+
+    @staticmethod
+    def _fail(batch: List[Tuple[tuple, bool, asyncio.Future]], error: BaseException):
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def _restart_pool(self, executor: Executor):
+        """Replace a broken pool, unless another batch that saw it break already did"""
+        if self._executor is not executor:
+            return
+        logger.error("Inference worker died, restarting pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+        self._worker_models.clear()
+        self._executor = self._create_executor()
+
+    async def _dispatch(self, batch: List[Tuple[tuple, bool, asyncio.Future]]):
+        # Raw texts first, then prepared ones, matching predict_batch's result order
+        batch = [entry for entry in batch if not entry[1]] + [entry for entry in batch if entry[1]]
+        items = [item for item, prepared, _ in batch if not prepared]
+        prepared_items = [item for item, prepared, _ in batch if prepared]
+        started = time.perf_counter()
+        executor = self._executor
+        try:
+            loop = asyncio.get_running_loop()
+            results, timings, models = await loop.run_in_executor(executor, predict_batch, items, prepared_items)
+        except Exception as e:
+            self.failed_batches += 1
+            if isinstance(e, BrokenProcessPool):
+                self._restart_pool(executor)
+            self._fail(batch, e)
+            return
+        finally:
+            self._slots.release()
+
+        self._record_batch(len(batch), time.perf_counter() - started)
+        self._record_models(models)
+        observe_stages(timings)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, timings))
+
+    def _record_batch(self, size: int, seconds: float):
+        self.batches += 1
+        self.predictions += size
+        self.last_batch_size = size
+        self.largest_batch = max(self.largest_batch, size)
+        self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+        self.total_batch_seconds += seconds
+
+    def _record_models(self, report: Dict):
+        report = dict(report)
+        self._worker_models[report.pop("pid")] = report
+
+    def model_stats(self) -> Dict:
+        """Model registry stats summed over the workers that have reported since the pool started"""
+        from services.model_registry import combine_stats
+        return combine_stats(list(self._worker_models.values()))
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_batch_size": self.max_batch_size,
+            "batch_window_ms": self.batch_window * 1000,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "in_flight_batches": len(self._in_flight),
+            "requests": self.requests,
+            "predictions": self.predictions,
+            "batches": self.batches,
+            "failed_batches": self.failed_batches,
+            "average_batch_size": (self.predictions / self.batches) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "last_batch_size": self.last_batch_size,
+            "batch_size_counts": dict(sorted(self.batch_sizes.items())),
+            "average_batch_seconds": (self.total_batch_seconds / self.batches) if self.batches else 0.0,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
+
+# Global instance
+inference_engine = InferenceEngine(
+    workers=config.INFERENCE_WORKERS,
+    max_batch_size=config.INFERENCE_BATCH_SIZE,
+    batch_window_ms=config.INFERENCE_BATCH_WINDOW_MS,
+    bulk_chunk_size=config.INFERENCE_BULK_CHUNK_SIZE,
+    cache=sentiment_cache
+)
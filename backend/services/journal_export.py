@@ -0,0 +1,80 @@
+import csv
+import io
+import json
+import zlib
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+from services.journal_queries import fetch_page
+
+EXPORT_COLUMNS = ("id", "title", "content", "sentiment", "mood_category", "created_at")
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "markdown": ("text/markdown; charset=utf-8", "md"),
+}
+
+
+def _ndjson(rows: List[Dict], first: bool) -> str:
+    return "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+def _csv(rows: List[Dict], first: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if first:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows([[row.get(column) for column in EXPORT_COLUMNS] for row in rows])
+    return buffer.getvalue()
+
+
+def _markdown(rows: List[Dict], first: bool) -> str:
+    parts = ["# Journal export\n\n"] if first else []
+    for row in rows:
+        heading = row.get("title") or row["created_at"][:10]
+        parts.append(
+            f"## {heading}\n\n"
+            f"*{row['created_at']} · {row['mood_category']} ({row['sentiment']:+.2f})*\n\n"
+            f"{row['content']}\n\n---\n\n"
+        )
+    return "".join(parts)
+
+
+ENCODERS = {"ndjson": _ndjson, "csv": _csv, "markdown": _markdown}
+
+
+async def _pages(db, user_id: str, chunk_size: int,
+                 first: Tuple[List[Dict], Optional[str]]) -> AsyncIterator[List[Dict]]:
+    rows, cursor = first
+    yield rows
+    while cursor:
+        rows, cursor = await fetch_page(db, user_id, ",".join(EXPORT_COLUMNS), chunk_size, cursor=cursor)
+        yield rows
+
+
+async def export_entries(db, user_id: str, export_format: str, chunk_size: int = 500,
+                         gzip: bool = False) -> AsyncIterator[bytes]:
+    """Stream a user's entries, newest first, one keyset page at a time.
+
+    The first page is fetched before this returns, so a database error
+    surfaces as a normal error response instead of a truncated download.
+    Only one page is ever held in memory.
+    """
+    encode = ENCODERS[export_format]
+    first = await fetch_page(db, user_id, ",".join(EXPORT_COLUMNS), chunk_size)
+    compressor = zlib.compressobj(wbits=31) if gzip else None
+
+    async def stream():
+        is_first = True
+        async for rows in _pages(db, user_id, chunk_size, first):
+            data = encode(rows, is_first).encode("utf-8")
+            is_first = False
+            if compressor is not None:
+                data = compressor.compress(data)
+            if data:
+                yield data
+        if compressor is not None:
+            yield compressor.flush()
+
+    return stream()
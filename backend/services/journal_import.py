@@ -0,0 +1,179 @@
+import asyncio
+import codecs
+import csv
+import json
+from datetime import datetime
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+import logging
+
+from core.admission import AdmissionRejected, inference_admission
+from services.inference import inference_engine
+
+logger = logging.getLogger(__name__)
+
+IMPORT_FORMATS = ("ndjson", "csv")
+TITLE_MAX_LENGTH = 255
+
+
+def _text_lines(stream: BinaryIO) -> Iterator[str]:
+    """Decode an uploaded file line by line without reading it all into memory"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for chunk in iter(lambda: stream.read(64 * 1024), b""):
+        # Split on newlines only; JSON strings may legally contain U+2028 and friends
+        *lines, pending = (pending + decoder.decode(chunk)).split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _validate(record) -> Dict:
+    if not isinstance(record, dict):
+        raise ValueError("Expected an object")
+    content = record.get("content")
+    if not isinstance(content, str) or not content.strip():
+        raise ValueError("Missing content")
+    entry = {"content": content}
+
+    title = record.get("title")
+    if title not in (None, ""):
+        if not isinstance(title, str) or len(title) > TITLE_MAX_LENGTH:
+            raise ValueError(f"title must be a string of at most {TITLE_MAX_LENGTH} characters")
+        entry["title"] = title
+
+    created_at = record.get("created_at")
+    if created_at not in (None, ""):
+        try:
+            entry["created_at"] = datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).isoformat()
+        except ValueError:
+            raise ValueError(f"Invalid created_at: {created_at}")
+    return entry
+
+
+def parse_upload(stream: BinaryIO, import_format: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yield ``(row, entry, error)`` per record; ``row`` counts records from 1"""
+    lines = _text_lines(stream)
+    if import_format == "csv":
+        records = csv.DictReader(lines)
+    else:
+        records = (json.loads(line) for line in lines if line.strip())
+
+    row = 0
+    while True:
+        row += 1
+        try:
+            record = next(records)
+        except StopIteration:
+            return
+        except (ValueError, csv.Error) as e:
+            # A malformed NDJSON line ends that generator; CSV errors are fatal too
+            yield row, None, f"Could not parse record: {e}"
+            if import_format == "csv":
+                return
+            records = (json.loads(line) for line in lines if line.strip())
+            continue
+        try:
+            entry, error = _validate(record), None
+        except ValueError as e:
+            entry, error = None, str(e)
+        yield row, entry, error
+
+
+async def _read_off_loop(records: Iterator[Tuple[int, Optional[Dict], Optional[str]]],
+                         batch_size: int) -> AsyncIterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """Yield parsed records, reading and parsing them on a thread a batch at a time"""
+    while True:
+        batch = await asyncio.to_thread(lambda: list(islice(records, batch_size)))
+        if not batch:
+            return
+        for record in batch:
+            yield record
+
+
+def _failed(user_id: str, chunk: List[Tuple[int, Dict]], e: Exception) -> List[Dict]:
+    logger.error(f"Import chunk for {user_id} failed: {str(e)}")
+    return [{"row": row, "status": "error", "error": str(e)} for row, _ in chunk]
+
+
+async def _import_chunk(db, user_id: str, chunk: List[Tuple[int, Dict]], cost: float) -> List[Dict]:
+    """Score a chunk in one vectorized pass and write it with one multi-row insert.
+
+    Each chunk is admitted on its own, so a long import gives up its
+    inference slot between chunks. Rejections propagate to the caller.
+    """
+    async with inference_admission.admit(user_id, cost):
+        try:
+            predictions = await inference_engine.predict_many([entry["content"] for _, entry in chunk], user_id)
+        except Exception as e:
+            return _failed(user_id, chunk, e)
+    try:
+        rows = [
+            {
+                **entry,
+                "user_id": user_id,
+                "sentiment": prediction["sentiment"],
+                "mood_category": prediction["label"]
+            }
+            for (_, entry), prediction in zip(chunk, predictions)
+        ]
+        # Rows without created_at get the column default instead of NULL
+        result = await db.table("journals").insert(rows, default_to_null=False).execute()
+    except Exception as e:
+        return _failed(user_id, chunk, e)
+
+    return [
+        {"row": row, "status": "imported", "id": inserted["id"]}
+        for (row, _), inserted in zip(chunk, result.data)
+    ]
+
+
+async def import_entries(db, user_id: str, records: Iterator[Tuple[int, Optional[Dict], Optional[str]]],
+                         chunk_size: int = 500, max_rows: int = 100000) -> Dict:
+    """Import parsed records chunk by chunk and report the outcome of every row.
+
+    ``records`` may block (it usually reads the upload), so it is consumed
+    on a thread. Only the first chunk spends a rate-limit token, and a
+    rejection there fails the whole import. Reading stops at ``max_rows``,
+    or when a later chunk is turned away; the first row past the limit,
+    or every row of the rejected chunk, is reported as an error so the
+    caller knows where to resume.
+    """
+    results: List[Dict] = []
+    chunk: List[Tuple[int, Dict]] = []
+    cost = 1.0
+
+    async def flush(chunk: List[Tuple[int, Dict]]) -> bool:
+        """Import a chunk; False if it was turned away after the first"""
+        nonlocal cost
+        try:
+            results.extend(await _import_chunk(db, user_id, chunk, cost))
+        except AdmissionRejected as e:
+            if cost:
+                raise
+            results.extend({"row": row, "status": "error", "error": e.detail} for row, _ in chunk)
+            return False
+        cost = 0.0
+        return True
+
+    async for row, entry, error in _read_off_loop(records, chunk_size):
+        if row > max_rows:
+            results.append({"row": row, "status": "error", "error": f"Import limit of {max_rows} rows reached"})
+            break
+        if error is not None:
+            results.append({"row": row, "status": "error", "error": error})
+            continue
+        chunk.append((row, entry))
+        if len(chunk) >= chunk_size:
+            admitted = await flush(chunk)
+            chunk = []
+            if not admitted:
+                break
+    if chunk:
+        await flush(chunk)
+
+    results.sort(key=lambda result: result["row"])
+    imported = sum(1 for result in results if result["status"] == "imported")
+    return {"imported": imported, "failed": len(results) - imported, "results": results}
@@ -0,0 +1,110 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+# Columns a client may ask for with ``fields=``
+JOURNAL_FIELDS = ("id", "user_id", "title", "content", "sentiment", "mood_category", "created_at")
+# Keyset columns; always selected so the next cursor can be built
+KEY_FIELDS = ("id", "created_at")
+# Computed columns defined in database_schema.sql; PREVIEW_LENGTH must match content_preview()
+PREVIEW_LENGTH = 280
+PREVIEW_COLUMNS = ("content_preview", "content_length")
+
+
+class InvalidQuery(ValueError):
+    """Raised for a malformed cursor or an unknown field"""
+
+
+def encode_cursor(row: Dict) -> str:
+    """Opaque cursor pointing just past ``row`` in (created_at, id) descending order"""
+    raw = json.dumps([row["created_at"], row["id"]], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, entry_id = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError) as e:
+        raise InvalidQuery(f"Invalid cursor: {e}")
+    # Both values end up inside a PostgREST filter, so accept only a timestamp and an id
+    if not isinstance(created_at, str) or type(entry_id) is not int:
+        raise InvalidQuery("Invalid cursor")
+    try:
+        datetime.fromisoformat(created_at)
+    except ValueError:
+        raise InvalidQuery("Invalid cursor")
+    return created_at, entry_id
+
+
+def parse_fields(fields: Optional[str]) -> List[str]:
+    """Validate a comma separated ``fields=`` value. Key fields are always included."""
+    if not fields:
+        return list(JOURNAL_FIELDS)
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in JOURNAL_FIELDS]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+    return [f for f in JOURNAL_FIELDS if f in requested or f in KEY_FIELDS]
+
+
+def select_columns(fields: List[str], content_length: Optional[int]) -> str:
+    """PostgREST select list; a short content limit reads the preview column instead"""
+    columns = list(fields)
+    if "content" in columns and content_length is not None and content_length <= PREVIEW_LENGTH:
+        columns[columns.index("content")] = "content_preview"
+        columns.append("content_length")
+    elif "content" in columns and content_length is not None:
+        columns.append("content_length")
+    return ",".join(columns)
+
+
+def shape_row(row: Dict, content_length: Optional[int]) -> Dict:
+    """Map preview columns back onto ``content`` and truncate it"""
+    row = dict(row)
+    if "content_preview" in row:
+        row["content"] = row.pop("content_preview")
+    full_length = row.pop("content_length", None)
+    if content_length is not None and row.get("content") is not None:
+        row["content"] = row["content"][:content_length]
+        row["content_truncated"] = (full_length if full_length is not None else len(row["content"])) > content_length
+    return row
+
+
+def keyset_query(query, cursor: Optional[str]):
+    """Restrict a newest-first query to rows strictly after ``cursor``"""
+    if cursor:
+        created_at, entry_id = decode_cursor(cursor)
+        query = query.or_(
+            f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{entry_id})'
+        )
+    return query.order("created_at", desc=True).order("id", desc=True)
+
+
+async def fetch_page(db, user_id: str, columns: str, limit: int, cursor: Optional[str] = None,
+                     offset: int = 0, start: Optional[str] = None,
+                     end: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """One newest-first page of the user's entries and the cursor for the next one.
+
+    Seeks with ``(created_at, id) < cursor`` on the (user_id, created_at, id)
+    index, so every page costs the same however deep it is. ``offset`` is
+    only honoured without a cursor, for old clients. ``start`` and ``end``
+    limit created_at to [start, end).
+    """
+    query = db.table("journals").select(columns).eq("user_id", user_id)
+    if start is not None:
+        query = query.gte("created_at", start)
+    if end is not None:
+        query = query.lt("created_at", end)
+    query = keyset_query(query, cursor)
+    # One extra row tells us whether there is a next page
+    if offset and not cursor:
+        query = query.range(offset, offset + limit)
+    else:
+        query = query.limit(limit + 1)
+    result = await query.execute()
+    rows = result.data[:limit]
+    next_cursor = encode_cursor(rows[-1]) if len(result.data) > limit else None
+    return rows, next_cursor
@@ -0,0 +1,226 @@
+"""Live "score as you type" sessions for the editor.
+
+A draft is split into segments at sentence ends and paragraph breaks, and
+each segment's preprocessed text and polarity token features are cached
+per session. An edit only reprocesses the segments it touched; the draft
+is then scored with one polarity assessment over the concatenated features
+and one model pass over the joined preprocessed text.
+
+Both stages work token by token and segments are split at whitespace, so
+the result equals ``POST /analyze-sentiment`` on the whole draft. The one
+cross-token rule, pattern's emoticon rewrite, is kept intact by never
+splitting inside an emoticon: after "o." ("o.O") or before a character
+that cannot start a word.
+"""
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from core import config
+from core.metrics import record_stage
+from services.inference import InferenceEngine, inference_engine
+from services.polarity import Features, polarity_scorer
+from services.sentiment import SentimentAnalyzer, polarity_many, sentiment_analyzer
+
+logger = logging.getLogger(__name__)
+
+# Sentence ends followed by a word, and paragraph breaks (pattern's "\n\n")
+SEGMENT_BOUNDARY = re.compile(r"[.!?]\s+(?=[\w\"'“‘])|\r?\n(?:\r?\n)+")
+
+
+class DraftError(ValueError):
+    """Raised for a message that cannot be applied to the draft"""
+
+
+def split_segments(text: str) -> List[str]:
+    """Sentences and paragraphs of a draft, without surrounding whitespace"""
+    segments = []
+    start = 0
+    for match in SEGMENT_BOUNDARY.finditer(text):
+        end = match.start()
+        if text[end] in ".!?":
+            if text[end] == "." and text[end - 1:end] == "o":
+                # "o. O" would be split from an "o.O" emoticon
+                continue
+            end += 1
+        segment = text[start:end].strip()
+        if segment:
+            segments.append(segment)
+        start = match.end()
+    segment = text[start:].strip()
+    if segment:
+        segments.append(segment)
+    return segments
+
+
+class DraftSession:
+    """One editor's draft, the edits applied to it and its segment cache"""
+
+    def __init__(self, user_id: str, max_chars: int = 100000, cache_size: int = 1000):
+        self.user_id = user_id
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self.text = ""
+        # Edits applied so far, and the edit count the last score covered
+        self.version = 0
+        self.scored_version = 0
+        self._segments: "OrderedDict[str, Tuple[str, Optional[Features]]]" = OrderedDict()
+
+    def apply(self, message: Dict):
+        """Apply a ``replace`` or ``edit`` message from the client"""
+        if not isinstance(message, dict):
+            raise DraftError("Messages must be JSON objects")
+        kind, text = message.get("type"), message.get("text")
+        if not isinstance(text, str):
+            raise DraftError("'text' must be a string")
+        if kind == "replace":
+            draft = text
+        elif kind == "edit":
+            start, end = message.get("start"), message.get("end")
+            if not (isinstance(start, int) and isinstance(end, int) and 0 <= start <= end <= len(self.text)):
+                raise DraftError(f"'start' and 'end' must satisfy 0 <= start <= end <= {len(self.text)}")
+            draft = self.text[:start] + text + self.text[end:]
+        else:
+            raise DraftError("Unknown message type, expected 'replace' or 'edit'")
+        if len(draft) > self.max_chars:
+            raise DraftError(f"Drafts are limited to {self.max_chars} characters")
+        self.text = draft
+        self.version += 1
+
+    def prepare(self, text: str, analyzer: SentimentAnalyzer) -> Tuple[str, float, int, int]:
+        """(preprocessed text, polarity, segments, segments recomputed) for a draft.
+
+        Not thread-safe; a session prepares one draft at a time.
+        """
+        lexicon = config.POLARITY_ENGINE != "textblob"
+        segments = split_segments(text)
+        processed: List[str] = []
+        flags: List[int] = []
+        polarity: List[float] = []
+        intensity: List[float] = []
+        recomputed = 0
+        for segment in segments:
+            cached = self._segments.get(segment)
+            if cached is None:
+                cached = (analyzer.preprocess_text(segment), polarity_scorer.features(segment) if lexicon else None)
+                self._segments[segment] = cached
+                recomputed += 1
+            else:
+                self._segments.move_to_end(segment)
+            if cached[0]:
+                processed.append(cached[0])
+            if lexicon:
+                flags.extend(cached[1][0])
+                polarity.extend(cached[1][1])
+                intensity.extend(cached[1][2])
+        # Segments of the current draft are the most recently used, so they stay
+        while len(self._segments) > max(self.cache_size, len(segments)):
+            self._segments.popitem(last=False)
+
+        score = polarity_scorer.assess(flags, polarity, intensity) if lexicon else polarity_many([text])[0]
+        return " ".join(processed), score, len(segments), recomputed
+
+
+class LiveScoring:
+    """Scores live drafts and keeps their metrics.
+
+    Segment work runs on a thread, so a long first draft never blocks the
+    event loop; model passes go through the inference engine's micro-batch
+    queue, where updates from concurrent sessions share batches.
+    """
+
+    def __init__(
+        self,
+        engine: InferenceEngine,
+        analyzer: SentimentAnalyzer,
+        max_chars: int = 100000,
+        cache_size: int = 1000
+    ):
+        self.engine = engine
+        self.analyzer = analyzer
+        self.max_chars = max_chars
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.active_sessions = 0
+        self.sessions = 0
+        self.edits = 0
+        self.rejected_edits = 0
+        self.updates = 0
+        self.failed_updates = 0
+        self.segments = 0
+        self.segments_recomputed = 0
+        self.total_update_seconds = 0.0
+        self.max_update_seconds = 0.0
+
+    def open(self, user_id: str) -> DraftSession:
+        with self._lock:
+            self.active_sessions += 1
+            self.sessions += 1
+        return DraftSession(user_id, max_chars=self.max_chars, cache_size=self.cache_size)
+
+    def close(self, session: DraftSession):
+        with self._lock:
+            self.active_sessions -= 1
+
+    def apply(self, session: DraftSession, message: Dict):
+        """Apply a client message, counting it; raises DraftError"""
+        try:
+            session.apply(message)
+        except DraftError:
+            self.rejected_edits += 1
+            raise
+        self.edits += 1
+
+    async def score(self, session: DraftSession) -> Dict:
+        """Score the draft as of its latest edit"""
+        started = time.perf_counter()
+        version, text = session.version, session.text
+        try:
+            processed, polarity, segments, recomputed = await asyncio.to_thread(
+                session.prepare, text, self.analyzer
+            )
+            record_stage("live_prepare", time.perf_counter() - started)
+            result = await self.engine.predict_prepared(processed, polarity, session.user_id)
+        except Exception:
+            self.failed_updates += 1
+            raise
+        session.scored_version = version
+
+        elapsed = time.perf_counter() - started
+        record_stage("live_update", elapsed)
+        with self._lock:
+            self.updates += 1
+            self.segments += segments
+            self.segments_recomputed += recomputed
+            self.total_update_seconds += elapsed
+            self.max_update_seconds = max(self.max_update_seconds, elapsed)
+        return {**result, "version": version, "segments": segments, "segments_recomputed": recomputed}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "active_sessions": self.active_sessions,
+                "sessions": self.sessions,
+                "edits": self.edits,
+                "rejected_edits": self.rejected_edits,
+                "updates": self.updates,
+                "failed_updates": self.failed_updates,
+                "segment_reuse_rate": (1 - self.segments_recomputed / self.segments) if self.segments else 0.0,
+                "average_update_seconds": (self.total_update_seconds / self.updates) if self.updates else 0.0,
+                "max_update_seconds": self.max_update_seconds,
+            }
+
+
+# Global instance
+live_scoring = LiveScoring(
+    engine=inference_engine,
+    analyzer=sentiment_analyzer,
+    max_chars=config.LIVE_MAX_DRAFT_CHARS,
+    cache_size=config.LIVE_SEGMENT_CACHE_SIZE
+)
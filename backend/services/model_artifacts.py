@@ -0,0 +1,386 @@
+"""Single-file, memory-mappable model bundles.
+
+Layout::
+
+    MAGIC (4 bytes) | header length (uint64, little endian) | JSON header | padding
+    | array 0 | padding | array 1 | ...
+
+Array offsets in the header are relative to the data section, which starts at
+the first 64-byte boundary after the header. Every array is 64-byte aligned,
+so loading maps the file read-only and wraps each array as a zero-copy
+``np.ndarray`` view. Pages are shared via the OS page cache between every
+uvicorn worker that loads the same bundle.
+Bundles are written to a temporary file and renamed into place, so readers
+only ever see a complete old or a complete new bundle.
+
+A bundle holds either a TF-IDF vectorizer and random forest, or the
+parameters of a HashingVectorizer and the weights of a linear model (the
+online training engine's checkpoints).
+"""
+import json
+import mmap
+import os
+import struct
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+MAGIC = b"SJMB"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_LENGTH = struct.Struct("<Q")
+
+# TfidfVectorizer parameters that affect transform() and are JSON-safe
+VECTORIZER_PARAMS = (
+    "analyzer", "binary", "decode_error", "encoding", "lowercase", "ngram_range",
+    "norm", "smooth_idf", "stop_words", "strip_accents", "sublinear_tf",
+    "token_pattern", "use_idf",
+)
+# The same for HashingVectorizer, which has no fitted state at all
+HASHING_PARAMS = (
+    "alternate_sign", "analyzer", "binary", "decode_error", "encoding", "lowercase",
+    "n_features", "ngram_range", "norm", "stop_words", "strip_accents", "token_pattern",
+)
+
+
+class ArtifactError(Exception):
+    """Raised when a bundle is missing, corrupt or of an unsupported version"""
+
+
+class CompactForest:
+    """Read-only random forest evaluated from flat node arrays.
+
+    Node arrays for all trees are concatenated and child indices are global.
+    Leaves point to themselves and hold normalized class probabilities, so
+    ``predict_proba`` walks every tree for every sample at once with NumPy.
+    """
+
+    def __init__(self, classes: "np.ndarray", roots: "np.ndarray", children_left: "np.ndarray",
+                 children_right: "np.ndarray", feature: "np.ndarray", threshold: "np.ndarray",
+                 value: "np.ndarray", max_depth: int):
+        import numpy as np
+        self.classes_ = classes
+        self.roots = roots
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.value = value
+        self.max_depth = max_depth
+        self.n_estimators = len(roots)
+        # Only densify the columns some split actually tests
+        internal = children_left != np.arange(len(children_left))
+        self.used_features = np.unique(feature[internal]) if internal.any() else np.zeros(1, dtype=feature.dtype)
+        self.local_feature = np.searchsorted(self.used_features, feature).astype(np.int32)
+        self.local_feature[~internal] = 0
+
+    @classmethod
+    def from_sklearn(cls, forest) -> "CompactForest":
+        import numpy as np
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            own = np.arange(tree.node_count) + offset
+            lefts.append(np.where(is_leaf, own, tree.children_left + offset))
+            rights.append(np.where(is_leaf, own, tree.children_right + offset))
+            # Leaves get feature 0 so lookups stay in bounds; they are never compared
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            value = tree.value[:, 0, :]
+            totals = value.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            values.append(value / totals)
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+        return cls(
+            classes=np.asarray(forest.classes_),
+            roots=np.asarray(roots, dtype=np.int64),
+            children_left=np.concatenate(lefts).astype(np.int32),
+            children_right=np.concatenate(rights).astype(np.int32),
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            value=np.concatenate(values).astype(np.float64),
+            max_depth=max_depth
+        )
+
+    def predict_proba(self, X) -> "np.ndarray":
+        import numpy as np
+        # Trees compare float32 feature values, exactly as sklearn does
+        if hasattr(X, "tocsc"):
+            X = X.tocsc()[:, self.used_features].toarray()
+        else:
+            X = np.asarray(X)[:, self.used_features]
+        X = X.astype(np.float32, copy=False)
+        n_samples = X.shape[0]
+
+        # One (sample, tree) walker per cell; only walkers not yet at a leaf move
+        nodes = np.tile(self.roots, n_samples)
+        rows = np.repeat(np.arange(n_samples), self.n_estimators)
+        active = np.flatnonzero(self.children_left[nodes] != nodes)
+        while active.size:
+            current = nodes[active]
+            values = X[rows[active], self.local_feature[current]]
+            following = np.where(
+                values <= self.threshold[current],
+                self.children_left[current],
+                self.children_right[current]
+            )
+            nodes[active] = following
+            active = active[self.children_left[following] != following]
+
+        return self.value[nodes].reshape(n_samples, self.n_estimators, -1).mean(axis=1)
+
+    def predict(self, X) -> "np.ndarray":
+        import numpy as np
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompactLinear:
+    """Read-only one-vs-rest linear classifier, as trained by SGDClassifier.
+
+    ``predict_proba`` matches SGDClassifier's log-loss probabilities: a
+    sigmoid per class, normalized across classes.
+    """
+
+    def __init__(self, classes: "np.ndarray", coef: "np.ndarray", intercept: "np.ndarray", t: float = 1.0):
+        self.classes_ = classes
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.t_ = t
+
+    @classmethod
+    def from_sklearn(cls, model) -> "CompactLinear":
+        import numpy as np
+        return cls(np.asarray(model.classes_), model.coef_, model.intercept_, float(getattr(model, "t_", 1.0)))
+
+    def restore(self, model):
+        """Copy this state into an unfitted SGDClassifier so partial_fit can continue"""
+        import numpy as np
+        model.classes_ = np.asarray(self.classes_)
+        model.coef_ = np.array(self.coef_, dtype=np.float64, order="C")
+        model.intercept_ = np.array(self.intercept_, dtype=np.float64)
+        model.t_ = self.t_
+        model.n_features_in_ = self.coef_.shape[1]
+        return model
+
+    def decision_function(self, X) -> "np.ndarray":
+        import numpy as np
+        return np.asarray(X @ self.coef_.T) + self.intercept_
+
+    def predict_proba(self, X) -> "np.ndarray":
+        import numpy as np
+        scores = self.decision_function(X)
+        probabilities = 1.0 / (1.0 + np.exp(-scores))
+        return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> "np.ndarray":
+        import numpy as np
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+
+def _is_hashing(vectorizer) -> bool:
+    return not hasattr(vectorizer, "idf_")
+
+
+def _vectorizer_params(vectorizer) -> Dict:
+    import numpy as np
+    params = vectorizer.get_params()
+    for name in ("tokenizer", "preprocessor", "vocabulary"):
+        if params.get(name) is not None:
+            raise ArtifactError(f"Cannot bundle a vectorizer with a custom {name}")
+    names = HASHING_PARAMS if _is_hashing(vectorizer) else VECTORIZER_PARAMS
+    selected = {name: params[name] for name in names}
+    selected["ngram_range"] = list(selected["ngram_range"])
+    selected["dtype"] = np.dtype(params["dtype"]).name
+    return selected
+
+
+def _build_vectorizer(params: Dict, terms: List[str], idf: "np.ndarray") -> "TfidfVectorizer":
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    params = dict(params)
+    params["ngram_range"] = tuple(params["ngram_range"])
+    params["dtype"] = np.dtype(params["dtype"]).type
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)}, **params)
+    vectorizer.idf_ = idf
+    return vectorizer
+
+
+def _build_hashing_vectorizer(params: Dict) -> "HashingVectorizer":
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    params = dict(params)
+    params["ngram_range"] = tuple(params["ngram_range"])
+    params["dtype"] = np.dtype(params["dtype"]).type
+    return HashingVectorizer(**params)
+
+
+def _align(position: int) -> int:
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _data_start(header_length: int) -> int:
+    return _align(len(MAGIC) + _LENGTH.size + header_length)
+
+
+def _model_arrays(vectorizer, model) -> "Tuple[Dict[str, np.ndarray], Dict]":
+    """Arrays and header fields for a TF-IDF forest or a hashed-feature linear model"""
+    import numpy as np
+    if hasattr(model, "coef_"):
+        if not _is_hashing(vectorizer):
+            raise ArtifactError("Linear models are only bundled with a HashingVectorizer")
+        linear = model if isinstance(model, CompactLinear) else CompactLinear.from_sklearn(model)
+        arrays = {
+            "coef": np.asarray(linear.coef_, dtype=np.float64),
+            "intercept": np.asarray(linear.intercept_, dtype=np.float64),
+        }
+        fields = {
+            "model_type": "linear",
+            "vectorizer_type": "hashing",
+            "t": linear.t_,
+            "classes": [str(c) for c in linear.classes_],
+        }
+        return arrays, fields
+
+    forest = model if isinstance(model, CompactForest) else CompactForest.from_sklearn(model)
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+    vocabulary = "\n".join(terms).encode("utf-8")
+
+    arrays = {
+        "idf": np.asarray(vectorizer.idf_, dtype=np.float64),
+        "vocabulary": np.frombuffer(vocabulary, dtype=np.uint8),
+        "roots": forest.roots,
+        "children_left": forest.children_left,
+        "children_right": forest.children_right,
+        "feature": forest.feature,
+        "threshold": forest.threshold,
+        "value": forest.value,
+    }
+    fields = {
+        "model_type": "random_forest",
+        "vectorizer_type": "tfidf",
+        "max_depth": int(forest.max_depth),
+        "classes": [str(c) for c in forest.classes_],
+    }
+    return arrays, fields
+
+
+def save_bundle(path: str, vectorizer, model, metadata: Optional[Dict] = None) -> str:
+    """Atomically write a fitted vectorizer and model as one bundle. Returns its version.
+
+    ``metadata`` is stored as-is in the JSON header.
+    """
+    import numpy as np
+    arrays, fields = _model_arrays(vectorizer, model)
+
+    version = uuid.uuid4().hex
+    header = {
+        "format_version": FORMAT_VERSION,
+        "model_version": version,
+        "created_at": time.time(),
+        **fields,
+        "vectorizer": _vectorizer_params(vectorizer),
+        "metadata": metadata or {},
+        "arrays": {},
+    }
+
+    # Offsets are relative to the data section, which starts at the first
+    # aligned position after the header
+    relative = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": relative}
+        relative = _align(relative + array.nbytes)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = _data_start(len(header_bytes))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_LENGTH.pack(len(header_bytes)))
+            f.write(header_bytes)
+            for name, array in arrays.items():
+                f.seek(data_start + header["arrays"][name]["offset"])
+                f.write(array.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return version
+
+
+def load_bundle(path: str) -> Tuple[object, object, Dict]:
+    """Map a bundle read-only and rebuild the vectorizer and model around it.
+
+    Returns a TfidfVectorizer and CompactForest, or a HashingVectorizer and
+    CompactLinear, depending on the bundle's model type.
+    """
+    import numpy as np
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot open model bundle {path}: {e}")
+
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise ArtifactError(f"{path} is not a model bundle")
+    (header_length,) = _LENGTH.unpack_from(buffer, len(MAGIC))
+    header_start = len(MAGIC) + _LENGTH.size
+    header = json.loads(bytes(buffer[header_start:header_start + header_length]))
+    if header.get("format_version") != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported model bundle version {header.get('format_version')}")
+
+    data_start = _data_start(header_length)
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        count = int(np.prod(spec["shape"]))
+        arrays[name] = np.frombuffer(
+            buffer, dtype=dtype, count=count, offset=data_start + spec["offset"]
+        ).reshape(spec["shape"])
+
+    classes = np.asarray(header["classes"])
+    if header.get("model_type", "random_forest") == "linear":
+        vectorizer = _build_hashing_vectorizer(header["vectorizer"])
+        model = CompactLinear(classes, arrays["coef"], arrays["intercept"], header.get("t", 1.0))
+        return vectorizer, model, header
+
+    terms = bytes(arrays["vocabulary"]).decode("utf-8").split("\n") if arrays["vocabulary"].size else []
+    vectorizer = _build_vectorizer(header["vectorizer"], terms, arrays["idf"])
+    forest = CompactForest(
+        classes=classes,
+        roots=arrays["roots"],
+        children_left=arrays["children_left"],
+        children_right=arrays["children_right"],
+        feature=arrays["feature"],
+        threshold=arrays["threshold"],
+        value=arrays["value"],
+        max_depth=header["max_depth"]
+    )
+    return vectorizer, forest, header
+
+
+def bundle_version(path: str) -> Optional[Tuple[int, int, int]]:
+    """Cheap change token for hot reload: (inode, mtime_ns, size), or None if absent"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
@@ -0,0 +1,255 @@
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from core import config
+from core.metrics import timed
+from services import nlp_resources
+from services.sentiment import ANALYZERS, SentimentAnalyzer, lemmatize, sentiment_analyzer
+
+logger = logging.getLogger(__name__)
+
+
+class _ResidentModel:
+    __slots__ = ("analyzer", "version", "size_bytes")
+
+    def __init__(self, analyzer: SentimentAnalyzer, version: tuple, size_bytes: int):
+        self.analyzer = analyzer
+        self.version = version
+        self.size_bytes = size_bytes
+
+
+class ModelRegistry:
+    """Per-user sentiment models stored on disk and loaded on demand.
+
+    Each user who trains gets their own model directory under ``model_dir``.
+    Only the most recently used models stay in memory, bounded both by count
+    and by their on-disk size. Users without a model are served by the global
+    baseline analyzer, which is never evicted. ``engine`` picks the analyzer
+    class used for training; bundles of either engine load regardless.
+    """
+
+    def __init__(
+        self,
+        model_dir: str,
+        baseline: SentimentAnalyzer,
+        max_models: int = 50,
+        max_bytes: int = 512 * 1024 * 1024,
+        engine: str = "forest"
+    ):
+        if engine not in ANALYZERS:
+            raise ValueError(f"Unknown training engine {engine!r}, expected one of {', '.join(ANALYZERS)}")
+        self.model_dir = model_dir
+        self.engine = engine
+        self.baseline = baseline
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self._resident: "OrderedDict[str, _ResidentModel]" = OrderedDict()
+        self._resident_bytes = 0
+        self._baseline_version: Optional[tuple] = None
+        self._lock = threading.RLock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.baseline_fallbacks = 0
+        self.loads = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.total_load_seconds = 0.0
+        self.max_load_seconds = 0.0
+
+    def user_dir(self, user_id: str) -> str:
+        return os.path.join(self.model_dir, re.sub(r'[^A-Za-z0-9_-]', '_', user_id))
+
+    def new_analyzer(self, user_id: str) -> SentimentAnalyzer:
+        """Create an untrained analyzer whose artifacts live in the user's directory"""
+        directory = self.user_dir(user_id)
+        return ANALYZERS[self.engine](
+            bundle_path=os.path.join(directory, "sentiment_model.bundle"),
+            model_path=os.path.join(directory, "sentiment_model.pkl"),
+            vectorizer_path=os.path.join(directory, "vectorizer.pkl")
+        )
+
+    def get(self, user_id: Optional[str] = None) -> SentimentAnalyzer:
+        """Return the user's model, loading it lazily, or the baseline if they have none"""
+        if user_id is None:
+            return self.get_baseline()
+
+        with self._lock:
+            analyzer = self._resident.get(user_id)
+            candidate = analyzer.analyzer if analyzer else self.new_analyzer(user_id)
+            info = candidate.artifact_info()
+
+            if info is None:
+                # No model on disk (or it was removed): fall back to the baseline
+                if analyzer is not None:
+                    self._drop(user_id)
+                self.baseline_fallbacks += 1
+                return self.get_baseline()
+
+            version, size_bytes = info
+            if analyzer is not None and analyzer.version == version:
+                self._resident.move_to_end(user_id)
+                self.hits += 1
+                return analyzer.analyzer
+
+            self.misses += 1
+            if analyzer is not None:
+                self.reloads += 1
+                self._drop(user_id)
+            if not self._load(candidate):
+                return self.get_baseline()
+            self._admit(user_id, _ResidentModel(candidate, version, size_bytes))
+            return candidate
+
+    def version_token(self, user_id: Optional[str] = None) -> str:
+        """Identify the model that would score this user's text, without loading it.
+
+        Changes whenever that model is retrained or replaced on disk.
+        """
+        if user_id is not None:
+            info = self.new_analyzer(user_id).artifact_info()
+            if info is not None:
+                return f"{self.user_dir(user_id)}:{info[0]}"
+        info = self.baseline.artifact_info()
+        return f"baseline:{info[0]}" if info is not None else "textblob"
+
+    def get_baseline(self) -> SentimentAnalyzer:
+        """Return the global baseline, reloading it if its files changed"""
+        info = self.baseline.artifact_info()
+        if info is not None and info[0] != self._baseline_version:
+            with self._lock:
+                if info[0] != self._baseline_version and self._load(self.baseline):
+                    self._baseline_version = info[0]
+        return self.baseline
+
+    def warm_up(self):
+        """Load NLTK data, the baseline and the scoring libraries ahead of the first request"""
+        started = time.perf_counter()
+        nlp_resources.ensure_resources()
+        lemmatize("warming")
+        self.get_baseline().predict_batch(["Warming up the sentiment model."])
+        logger.info(f"Sentiment models warmed up in {time.perf_counter() - started:.2f}s")
+
+    def _load(self, analyzer: SentimentAnalyzer) -> bool:
+        started = time.perf_counter()
+        loaded = analyzer.load_model()
+        elapsed = time.perf_counter() - started
+        if loaded:
+            self.loads += 1
+            self.total_load_seconds += elapsed
+            self.max_load_seconds = max(self.max_load_seconds, elapsed)
+        return loaded
+
+    def _admit(self, user_id: str, resident: _ResidentModel):
+        self._resident[user_id] = resident
+        self._resident_bytes += resident.size_bytes
+        # Always keep the model we just loaded, even if it alone exceeds the budget
+        while len(self._resident) > 1 and (
+            len(self._resident) > self.max_models or self._resident_bytes > self.max_bytes
+        ):
+            evicted_id = next(iter(self._resident))
+            self._drop(evicted_id)
+            self.evictions += 1
+
+    def _drop(self, user_id: str):
+        resident = self._resident.pop(user_id, None)
+        if resident is not None:
+            self._resident_bytes -= resident.size_bytes
+
+    def train(self, user_id: str, journal_entries: List[Dict]) -> Dict:
+        """Train and persist a model for one user, leaving other users' models untouched"""
+        analyzer = self.new_analyzer(user_id)
+        os.makedirs(self.user_dir(user_id), exist_ok=True)
+        result = analyzer.train_model(journal_entries)
+        if result.get("status") == "success":
+            # The next prediction maps the new bundle instead of keeping the
+            # full in-memory forest that was just trained
+            with self._lock:
+                self._drop(user_id)
+        return result
+
+    def predict_batch(self, items: List[Tuple[Optional[str], str]],
+                      timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Score (user_id, text) pairs, one vectorized pass per model, in input order"""
+        return self._per_model(items, timings, lambda analyzer, group: analyzer.predict_batch(
+            [text for _, text in group], timings
+        ))
+
+    def predict_prepared(self, items: List[Tuple[Optional[str], str, float]],
+                         timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Score (user_id, preprocessed text, polarity) triples, as ``predict_batch`` does"""
+        return self._per_model(items, timings, lambda analyzer, group: analyzer.predict_prepared(
+            [processed for _, processed, _ in group], [polarity for _, _, polarity in group], timings
+        ))
+
+    def _per_model(self, items: List[tuple], timings: Optional[Dict[str, float]],
+                   score: Callable[[SentimentAnalyzer, List[tuple]], List[Dict]]) -> List[Dict]:
+        groups: Dict[Optional[str], List[int]] = {}
+        for index, item in enumerate(items):
+            groups.setdefault(item[0], []).append(index)
+
+        results: List[Optional[Dict]] = [None] * len(items)
+        for user_id, indices in groups.items():
+            with timed(timings, "model_load"):
+                analyzer = self.get(user_id)
+            for index, result in zip(indices, score(analyzer, [items[i] for i in indices])):
+                results[index] = result
+        return results
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "resident_models": len(self._resident),
+                "resident_bytes": self._resident_bytes,
+                "max_models": self.max_models,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "baseline_fallbacks": self.baseline_fallbacks,
+                "loads": self.loads,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "total_load_seconds": self.total_load_seconds,
+                "average_load_seconds": (self.total_load_seconds / self.loads) if self.loads else 0.0,
+                "max_load_seconds": self.max_load_seconds,
+                "baseline_trained": self.baseline.is_trained,
+                "engine": self.engine,
+            }
+
+
+# Counters that add up across the registries of several inference workers
+SUMMED_STATS = (
+    "resident_models", "resident_bytes", "hits", "misses", "baseline_fallbacks",
+    "loads", "reloads", "evictions", "total_load_seconds",
+)
+
+
+def combine_stats(reports: List[Dict]) -> Dict:
+    """One view of several workers' ``ModelRegistry.stats``"""
+    combined = {name: sum(report[name] for report in reports) for name in SUMMED_STATS}
+    combined["average_load_seconds"] = (
+        combined["total_load_seconds"] / combined["loads"] if combined["loads"] else 0.0
+    )
+    combined["max_load_seconds"] = max((report["max_load_seconds"] for report in reports), default=0.0)
+    combined["baseline_trained"] = bool(reports) and all(report["baseline_trained"] for report in reports)
+    if reports:
+        for name in ("max_models", "max_bytes", "engine"):
+            combined[name] = reports[0][name]
+    combined["workers"] = len(reports)
+    return combined
+
+
+# Global instance
+model_registry = ModelRegistry(
+    model_dir=config.MODEL_DIR,
+    baseline=sentiment_analyzer,
+    max_models=config.MODEL_CACHE_SIZE,
+    max_bytes=config.MODEL_CACHE_BYTES,
+    engine=config.TRAINING_ENGINE
+)
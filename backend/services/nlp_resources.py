@@ -0,0 +1,99 @@
+"""NLTK data used by text preprocessing, loaded on first use.
+
+Nothing here touches the network unless asked to: install the corpora at
+build time with ``python -m services.nlp_resources --download``, or set
+NLTK_AUTO_DOWNLOAD=true to fetch them lazily during development. Run the
+module without arguments to check an image; it exits 1 if data is missing.
+"""
+import argparse
+import sys
+import threading
+from functools import lru_cache
+from typing import FrozenSet, List, Optional
+import logging
+
+from core import config
+
+logger = logging.getLogger(__name__)
+
+# Download name -> nltk.data path
+NLTK_RESOURCES = {
+    "stopwords": "corpora/stopwords",
+    "wordnet": "corpora/wordnet",
+}
+
+_lock = threading.Lock()
+_checked = False
+
+
+class MissingNLPResource(LookupError):
+    """Raised when NLTK data is not installed and downloading is disabled"""
+
+
+def missing_resources() -> List[str]:
+    import nltk.data
+    missing = []
+    for name, path in NLTK_RESOURCES.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(name)
+    return missing
+
+
+def download_resources() -> List[str]:
+    """Download whatever is missing; returns what is still missing afterwards"""
+    import nltk
+    for name in missing_resources():
+        logger.info(f"Downloading NLTK resource {name}")
+        nltk.download(name, quiet=True)
+    return missing_resources()
+
+
+def ensure_resources(download: Optional[bool] = None):
+    """Fail fast with instructions if NLTK data is missing; checked once per process"""
+    global _checked
+    if _checked:
+        return
+    if download is None:
+        download = config.NLTK_AUTO_DOWNLOAD
+    with _lock:
+        if _checked:
+            return
+        missing = download_resources() if download else missing_resources()
+        if missing:
+            raise MissingNLPResource(
+                f"NLTK data not installed: {', '.join(missing)}. "
+                f"Run 'python -m services.nlp_resources --download' when building the image "
+                f"or set NLTK_AUTO_DOWNLOAD=true"
+            )
+        _checked = True
+
+
+@lru_cache(maxsize=1)
+def stop_words() -> FrozenSet[str]:
+    ensure_resources()
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words('english'))
+
+
+@lru_cache(maxsize=1)
+def lemmatizer():
+    ensure_resources()
+    from nltk.stem import WordNetLemmatizer
+    return WordNetLemmatizer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or install the NLTK data the API needs")
+    parser.add_argument("--download", action="store_true", help="Download missing resources")
+    args = parser.parse_args()
+    missing = download_resources() if args.download else missing_resources()
+    if missing:
+        print(f"Missing NLTK resources: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+    print("NLTK resources installed: " + ", ".join(NLTK_RESOURCES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+from core import config
+from services.model_registry import ModelRegistry, model_registry
+from services.sentiment import MIN_TRAINING_ENTRIES, OnlineSentimentAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+class _Learner:
+    __slots__ = ("analyzer", "version", "checkpointed_at")
+
+    def __init__(self, analyzer: OnlineSentimentAnalyzer, version: Optional[tuple]):
+        self.analyzer = analyzer
+        # Bundle version this learner was loaded from or last saved as
+        self.version = version
+        self.checkpointed_at = time.monotonic()
+
+
+class OnlineTrainer:
+    """Keeps per-user online models learning from entries as they are written.
+
+    Updates run on one background thread, so requests never wait for them
+    and a user's updates apply in order. The most recently updated learners
+    stay in memory; each is checkpointed to the user's model bundle after
+    ``checkpoint_every`` new samples or ``checkpoint_seconds``, when it is
+    evicted, and on shutdown, which is also when the registry starts serving
+    the update. A user needs MIN_TRAINING_ENTRIES samples before the first
+    checkpoint. A user whose bundle came from the forest engine is skipped
+    until /train-model replaces it with an online model, since a checkpoint
+    would overwrite the forest with a model of only the entries seen since.
+    Disabled unless the registry uses the online engine.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        checkpoint_every: int = 20,
+        checkpoint_seconds: float = 60.0,
+        max_learners: int = 100
+    ):
+        self.registry = registry
+        self.enabled = registry.engine == "online"
+        self.checkpoint_every = checkpoint_every
+        self.checkpoint_seconds = checkpoint_seconds
+        self.max_learners = max_learners
+        self._learners: "OrderedDict[str, _Learner]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks = set()
+
+        # Metrics
+        self.updates = 0
+        self.samples = 0
+        self.skipped = 0
+        self.checkpoints = 0
+        self.reloads = 0
+        self.evictions = 0
+        self.failures = 0
+        self.total_update_seconds = 0.0
+        self.max_update_seconds = 0.0
+
+    def submit(self, user_id: str, entries: List[Dict]):
+        """Learn from created or edited entries in the background"""
+        if not self.enabled:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="online-training")
+        task = asyncio.create_task(self._run(user_id, entries))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, user_id: str, entries: List[Dict]):
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self.update, user_id, entries)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Online update for user {user_id} failed: {str(e)}")
+
+    def update(self, user_id: str, entries: List[Dict]) -> int:
+        """Apply entries to the user's learner now; returns how many were learned"""
+        with self._lock:
+            learner = self._learner(user_id)
+            started = time.perf_counter()
+            if learner.analyzer.foreign_model:
+                self.skipped += 1
+                return 0
+            learned = learner.analyzer.partial_update(entries)
+            elapsed = time.perf_counter() - started
+            self.updates += 1
+            self.samples += learned
+            self.total_update_seconds += elapsed
+            self.max_update_seconds = max(self.max_update_seconds, elapsed)
+
+            analyzer = learner.analyzer
+            if analyzer.pending_samples and (
+                analyzer.pending_samples >= self.checkpoint_every
+                or learner.version is None
+                or time.monotonic() - learner.checkpointed_at >= self.checkpoint_seconds
+            ):
+                self._checkpoint(learner)
+            return learned
+
+    def _learner(self, user_id: str) -> _Learner:
+        learner = self._learners.get(user_id)
+        if learner is not None:
+            version = self._disk_version(learner.analyzer)
+            if version == learner.version or learner.analyzer.pending_samples:
+                # Unsaved updates win over a checkpoint written elsewhere
+                self._learners.move_to_end(user_id)
+                return learner
+            # Retrained, or checkpointed by another worker: continue from disk
+            self.reloads += 1
+            del self._learners[user_id]
+
+        analyzer = self.registry.new_analyzer(user_id)
+        analyzer.load_model()
+        learner = _Learner(analyzer, self._disk_version(analyzer))
+        self._learners[user_id] = learner
+        while len(self._learners) > self.max_learners:
+            _, evicted = self._learners.popitem(last=False)
+            self._checkpoint(evicted)
+            self.evictions += 1
+        return learner
+
+    @staticmethod
+    def _disk_version(analyzer: OnlineSentimentAnalyzer) -> Optional[tuple]:
+        info = analyzer.artifact_info()
+        return info[0] if info is not None else None
+
+    def _checkpoint(self, learner: _Learner):
+        analyzer = learner.analyzer
+        if not analyzer.pending_samples or analyzer.samples_seen < MIN_TRAINING_ENTRIES:
+            return
+        if analyzer.save_model():
+            learner.version = self._disk_version(analyzer)
+            learner.checkpointed_at = time.monotonic()
+            self.checkpoints += 1
+
+    def forget(self, user_id: str):
+        """Drop the user's learner without saving it, e.g. after a full retrain"""
+        with self._lock:
+            self._learners.pop(user_id, None)
+
+    def flush(self):
+        """Checkpoint every learner with unsaved updates"""
+        with self._lock:
+            for learner in self._learners.values():
+                self._checkpoint(learner)
+
+    async def stop(self):
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self.flush)
+            self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            pending = sum(learner.analyzer.pending_samples for learner in self._learners.values())
+            return {
+                "enabled": self.enabled,
+                "learners": len(self._learners),
+                "pending_samples": pending,
+                "updates": self.updates,
+                "samples": self.samples,
+                "skipped": self.skipped,
+                "checkpoints": self.checkpoints,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "failures": self.failures,
+                "average_update_seconds": (self.total_update_seconds / self.updates) if self.updates else 0.0,
+                "max_update_seconds": self.max_update_seconds,
+            }
+
+
+# Global instance
+online_trainer = OnlineTrainer(
+    registry=model_registry,
+    checkpoint_every=config.ONLINE_CHECKPOINT_EVERY,
+    checkpoint_seconds=config.ONLINE_CHECKPOINT_SECONDS,
+    max_learners=config.ONLINE_MAX_LEARNERS
+)
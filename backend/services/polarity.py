@@ -0,0 +1,408 @@
+"""Lexicon polarity scoring, compatible with ``TextBlob(text).sentiment.polarity``.
+
+TextBlob's default PatternAnalyzer tokenizes each text in pure Python and
+looks every token up in a lazily loaded dict of dicts. Here the same
+lexicon (TextBlob's ``en-sentiment.xml``, with the adjective -> "-ly"
+adverb expansion TextBlob applies when loading it) is compiled once into
+NumPy tables, and tokens are mapped to rows through a single dict.
+
+A batch is scored in three steps:
+
+1. Each text is tokenized the way pattern's ``find_tokens`` does it.
+2. Token features are gathered from the tables for the whole batch at once.
+3. Texts whose tokens only carry plain polarity (no intensifiers,
+   negations, "!" boosts or emoticons) are averaged with ``np.bincount``.
+   The rest replay pattern's assessment rules over the gathered arrays.
+
+Scores match TextBlob 0.19 within ``TOLERANCE`` on the golden corpus in
+``benchmarks/golden_polarity.jsonl``, and are normally bit-for-bit equal.
+Run ``python -m benchmarks.run polarity`` to check parity and compare
+throughput.
+"""
+import importlib.util
+import os
+import re
+import threading
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+from xml.etree import ElementTree
+import logging
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Largest allowed |lexicon - TextBlob| on the golden corpus
+TOLERANCE = 1e-9
+
+# pattern.text constants (textblob/_text.py)
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+ABBREVIATIONS = frozenset((
+    "a.", "adj.", "adv.", "al.", "a.m.", "c.", "cf.", "comp.", "conf.", "def.",
+    "ed.", "e.g.", "esp.", "etc.", "ex.", "f.", "fig.", "gen.", "id.", "i.e.",
+    "int.", "l.", "m.", "Med.", "Mil.", "Mr.", "n.", "n.q.", "orig.", "pl.",
+    "pred.", "pres.", "p.m.", "ref.", "v.", "vs.", "w/",
+))
+EMOTICONS = (  # (polarity, forms), in pattern's lookup order
+    (+1.00, ("<3", "♥")),
+    (+1.00, (">:D", ":-D", ":D", "=-D", "=D", "X-D", "x-D", "XD", "xD", "8-D")),
+    (+0.75, (">:P", ":-P", ":P", ":-p", ":p", ":-b", ":b", ":c)", ":o)", ":^)")),
+    (+0.50, (">:)", ":-)", ":)", "=)", "=]", ":]", ":}", ":>", ":3", "8)", "8-)")),
+    (+0.25, (">;]", ";-)", ";)", ";-]", ";]", ";D", ";^)", "*-)", "*)")),
+    (+0.05, (">:o", ":-O", ":O", ":o", ":-o", "o_O", "o.O", "°O°", "°o°")),
+    (-0.25, (">:/", ":-/", ":/", ":\\", ">:\\", ":-.", ":-s", ":s", ":S", ":-S", ">.>")),
+    (-0.75, (">:[", ":-(", ":(", "=(", ":-[", ":[", ":{", ":-<", ":c", ":-c", "=/")),
+    (-1.00, (":'(", ":'''(", ";'(")),
+)
+NEGATIONS = frozenset(("no", "not", "n't", "never"))
+
+_LEADING = frozenset(PUNCTUATION.replace(".", ""))
+_TRAILING = frozenset(PUNCTUATION)
+_ABBR1 = re.compile(r"^[A-Za-z]\.$")
+_ABBR2 = re.compile(r"^([A-Za-z]\.)+$")
+_ABBR3 = re.compile("^[A-Z][" + "|".join("bcdfghjklmnpqrstvwxz") + "]+.$")
+_SARCASM = re.compile(r"\( ?\! ?\)")
+_EMOTICON_FORMS = re.compile(r"(%s)($|\s)" % "|".join(
+    r" ?".join(re.escape(char) for char in form) for _, forms in EMOTICONS for form in forms
+))
+# Emoticon and sarcasm rewrites only apply to texts with one of these
+# characters, or with an "X D" that the rewrite would merge
+_EMOTICON_CHARS = frozenset(
+    char for _, forms in EMOTICONS for form in forms for char in form if not char.isalnum()
+) | {"("}
+_SPACED_XD = re.compile(r"[Xx] D")
+# pattern marks paragraph breaks with this token, which stops emoticon
+# rewrites from spanning paragraphs, then drops it
+EOS = "END-OF-SENTENCE"
+_PARAGRAPH = re.compile(r"\n{2,}")
+
+# Per-token (flags, polarity, intensity) lists
+Features = Tuple[List[int], List[float], List[float]]
+
+# Smaller batches are cheaper scored one text at a time
+VECTORIZE_MIN_TEXTS = 8
+
+# Token feature flags
+KNOWN = 1        # in the lexicon
+MODIFIER = 2     # known word that can intensify the next one (has an adverb sense)
+LY = 4           # ends with "ly": a modifier that can carry a following negation
+NEGATION = 8
+RESET_NEGATION = 16  # unknown word long enough to end a pending negation
+RESET_MODIFIER = 32  # unknown word long enough to end a pending modifier
+BANG = 64
+IRONY = 128
+EMOTICON = 256
+# Any of these means the text needs the sequential rules
+_SPECIAL = MODIFIER | NEGATION | BANG | IRONY | EMOTICON
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens, as pattern's sentiment() sees them"""
+    # Contractions and quotes (pattern inserts a space before each
+    # replacement, then spaces out every apostrophe)
+    if "'" in text:
+        text = text.replace("n't", " n't").replace("'", " ' ")
+    if "“" in text or "”" in text or "‘" in text or "’" in text:
+        text = text.replace("“", " “ ").replace("”", " ” ")
+        text = text.replace("‘", " ‘ ").replace("’", " ’ ")
+    if '"' in text:
+        text = text.replace('"', ' " ')
+    has_eos = False
+    if "\n" in text:
+        text = text.replace("\r\n", "\n")
+        if "\n\n" in text:
+            text = _PARAGRAPH.sub(f" {EOS} ", text)
+            has_eos = True
+
+    tokens = []
+    append = tokens.append
+    for token in text.split():
+        if token[0] not in _LEADING and token[-1] not in _TRAILING:
+            append(token)
+            continue
+        tail = []
+        while token and token[0] in _LEADING:
+            append(token[0])
+            token = token[1:]
+        while token and token[-1] in _TRAILING:
+            if token[-1] in _LEADING:
+                tail.append(token[-1])
+                token = token[:-1]
+            if token.endswith("..."):
+                tail.append("...")
+                token = token[:-3].rstrip(".")
+            if token.endswith("."):
+                # Cheap screen first: every abbreviation rule needs one of these
+                if (len(token) == 2 or token[0].isupper() or "." in token[:-1]
+                        or token in ABBREVIATIONS) and (
+                        token in ABBREVIATIONS or _ABBR1.match(token) or _ABBR2.match(token)
+                        or _ABBR3.match(token)):
+                    break
+                tail.append(".")
+                token = token[:-1]
+        if token:
+            append(token)
+        tokens.extend(reversed(tail))
+
+    joined = " ".join(tokens)
+    if not _EMOTICON_CHARS.isdisjoint(joined) or _SPACED_XD.search(joined):
+        joined = _SARCASM.sub("(!)", joined)
+        joined = _EMOTICON_FORMS.sub(lambda m: m.group(1).replace(" ", "") + m.group(2), joined)
+    if has_eos or EOS in joined:
+        return [token.lower() for token in joined.split() if token != EOS]
+    return joined.lower().split()
+
+
+def _average(values: Sequence[float]) -> float:
+    return sum(values) / float(len(values) or 1)
+
+
+def lexicon_path() -> str:
+    """TextBlob's sentiment lexicon, located without importing TextBlob (which imports NLTK)"""
+    spec = importlib.util.find_spec("textblob")
+    if spec is None or not spec.submodule_search_locations:
+        raise FileNotFoundError("textblob is not installed")
+    return os.path.join(list(spec.submodule_search_locations)[0], "en", "en-sentiment.xml")
+
+
+def load_lexicon(path: str) -> Dict[str, Tuple[float, float, bool]]:
+    """word -> (polarity, intensity, has an adverb sense), as TextBlob's loader builds it"""
+    senses: Dict[str, Dict[Optional[str], List[Tuple[float, float, float]]]] = {}
+    for element in ElementTree.parse(path).getroot().findall("word"):
+        word = element.attrib.get("form")
+        if word:
+            senses.setdefault(word, {}).setdefault(element.attrib.get("pos"), []).append((
+                float(element.attrib.get("polarity", 0.0)),
+                float(element.attrib.get("subjectivity", 0.0)),
+                float(element.attrib.get("intensity", 1.0)),
+            ))
+    # Average every sense per part of speech, then across parts of speech
+    words: Dict[str, Dict[Optional[str], List[float]]] = {}
+    for word, by_pos in senses.items():
+        averaged = {pos: [_average(values) for values in zip(*psi)] for pos, psi in by_pos.items()}
+        averaged[None] = [_average(values) for values in zip(*averaged.values())]
+        words[word] = averaged
+    # Adjectives also score as adverbs ("terrible" -> "terribly")
+    for word, by_pos in list(words.items()):
+        if "JJ" in by_pos:
+            if word.endswith("y"):
+                word = word[:-1] + "i"
+            if word.endswith("le"):
+                word = word[:-2]
+            scores = tuple(by_pos["JJ"])
+            entry = words.setdefault(word + "ly", {})
+            entry["RB"] = entry[None] = scores
+    return {word: (by_pos[None][0], by_pos[None][2], "RB" in by_pos) for word, by_pos in words.items()}
+
+
+class LexiconScorer:
+    """Vectorized, TextBlob-compatible polarity. Safe to share between threads."""
+
+    def __init__(self, path: Optional[str] = None, max_cached_tokens: int = 200000):
+        self.path = path
+        self.max_cached_tokens = max_cached_tokens
+        self._lock = threading.Lock()
+        self._rows: Optional[Dict[str, int]] = None
+
+    def _compile(self):
+        import numpy as np
+        lexicon = load_lexicon(self.path or lexicon_path())
+        self._rows = {}
+        polarity, intensity, flags = [], [], []
+        for word, (p, i, adverb) in lexicon.items():
+            self._rows[word] = len(polarity)
+            polarity.append(p)
+            intensity.append(i)
+            flags.append(
+                KNOWN | (MODIFIER if adverb else 0) | (LY if word.endswith("ly") else 0)
+                | (NEGATION if word in NEGATIONS else 0)
+            )
+        self._known_rows = len(polarity)
+        self._feature_rows: Dict[Tuple[float, int], int] = {}
+        self._cached_tokens = 0
+        self._polarity = np.array(polarity, dtype=np.float64)
+        self._intensity = np.array(intensity, dtype=np.float64)
+        self._flags = np.array(flags, dtype=np.int32)
+        # (polarity, intensity, flags) per row, for texts too small to vectorize
+        self._features = list(zip(polarity, intensity, flags))
+        self._emoticons: Dict[str, float] = {}
+        for p, forms in EMOTICONS:
+            for form in forms:
+                self._emoticons.setdefault(form.lower(), p)
+        logger.info(f"Polarity lexicon compiled: {self._known_rows} words")
+
+    def _ensure_compiled(self):
+        if self._rows is None:
+            with self._lock:
+                if self._rows is None:
+                    self._compile()
+
+    def _unknown_features(self, token: str) -> Tuple[float, int]:
+        flags = 0
+        if token in NEGATIONS:
+            flags |= NEGATION
+        if len(token.strip("'")) > 1:
+            flags |= RESET_NEGATION
+        if len(token) > 2:
+            flags |= RESET_MODIFIER
+        if token == "!":
+            flags |= BANG
+        if token == "(!)":
+            flags |= IRONY
+        polarity = 0.0
+        # str membership, not set membership: pattern skips any substring of PUNCTUATION
+        if not token.isalpha() and len(token) <= 5 and token not in PUNCTUATION:
+            if token in self._emoticons:
+                flags |= EMOTICON
+                polarity = self._emoticons[token]
+        return polarity, flags
+
+    def _unknown_row(self, token: str) -> int:
+        """Row for a token outside the lexicon.
+
+        Unknown tokens only differ by a handful of features, so they share
+        one row per distinct feature combination; the token -> row mapping
+        is cached up to ``max_cached_tokens`` tokens.
+        """
+        import numpy as np
+        features = self._unknown_features(token)
+        row = self._feature_rows.get(features)
+        if row is None:
+            with self._lock:
+                row = self._feature_rows.get(features)
+                if row is None:
+                    row = len(self._polarity)
+                    # Extend every table before publishing the row
+                    self._features.append((features[0], 1.0, features[1]))
+                    self._polarity = np.append(self._polarity, features[0])
+                    self._intensity = np.append(self._intensity, 1.0)
+                    self._flags = np.append(self._flags, np.int32(features[1]))
+                    self._feature_rows[features] = row
+        if self._cached_tokens < self.max_cached_tokens:
+            self._cached_tokens += 1
+            self._rows[token] = row
+        return row
+
+    def _lookup(self, texts: Sequence[str]) -> "Tuple[np.ndarray, np.ndarray]":
+        """(row per token, token count per text) for the whole batch"""
+        import numpy as np
+        rows_get = self._rows.get
+        rows: List[Optional[int]] = []
+        counts = np.empty(len(texts), dtype=np.int64)
+        for index, text in enumerate(texts):
+            tokens = tokenize(text)
+            counts[index] = len(tokens)
+            mapped = list(map(rows_get, tokens))
+            if None in mapped:
+                mapped = [row if row is not None else self._unknown_row(token) for token, row in zip(tokens, mapped)]
+            rows.extend(mapped)
+        return np.array(rows, dtype=np.int64), counts
+
+    def polarity_many(self, texts: Sequence[str]) -> "np.ndarray":
+        """Polarity in [-1, 1] for each text, in input order"""
+        import numpy as np
+        self._ensure_compiled()
+        if len(texts) < VECTORIZE_MIN_TEXTS:
+            return np.array([self.polarity(text) for text in texts], dtype=np.float64)
+        rows, counts = self._lookup(texts)
+        flags = self._flags[rows]
+        polarity = self._polarity[rows]
+        owner = np.repeat(np.arange(len(texts)), counts)
+
+        # Plain texts: every known word is one assessment, averaged
+        special = np.bincount(owner, weights=(flags & _SPECIAL) != 0, minlength=len(texts)) > 0
+        known = (flags & KNOWN) != 0
+        assessed = np.bincount(owner[known], minlength=len(texts))
+        totals = np.bincount(owner[known], weights=polarity[known], minlength=len(texts))
+        scores = np.divide(totals, assessed, out=np.zeros(len(texts)), where=assessed > 0)
+
+        if special.any():
+            intensity = self._intensity[rows]
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            for index in np.flatnonzero(special):
+                start, end = starts[index], starts[index] + counts[index]
+                scores[index] = _assess(
+                    flags[start:end].tolist(), polarity[start:end].tolist(), intensity[start:end].tolist()
+                )
+        return scores
+
+    def polarity(self, text: str) -> float:
+        """One text, without NumPy's per-call overhead"""
+        return _assess(*self.features(text))
+
+    def features(self, text: str) -> Features:
+        """(flags, polarity, intensity) per token.
+
+        Features of texts split at whitespace (outside emoticons) concatenate
+        to the features of the whole text, so callers can cache them per
+        sentence and ``assess`` the concatenation.
+        """
+        self._ensure_compiled()
+        rows_get = self._rows.get
+        features = self._features
+        flags, polarity, intensity = [], [], []
+        for token in tokenize(text):
+            row = rows_get(token)
+            p, i, flag = features[row if row is not None else self._unknown_row(token)]
+            flags.append(flag)
+            polarity.append(p)
+            intensity.append(i)
+        return flags, polarity, intensity
+
+    @staticmethod
+    def assess(flags: List[int], polarity: List[float], intensity: List[float]) -> float:
+        """Polarity of a text from its ``features``"""
+        return _assess(flags, polarity, intensity)
+
+
+def _assess(flags: List[int], polarity: List[float], intensity: List[float]) -> float:
+    """pattern's Sentiment.assessments() over gathered token features.
+
+    Assessments are [polarity, intensity, negated]. A known word starts a
+    new assessment unless the previous word was a modifier, which it then
+    scales ("really good"). A negation flips the next known word's
+    assessment to -0.5x ("not good"), and "!" boosts the last one by 1.25.
+    """
+    assessments: List[list] = []
+    modifier: Optional[int] = None  # flags of the pending modifier
+    negated = False
+    for flag, p, i in zip(flags, polarity, intensity):
+        if flag & KNOWN:
+            if modifier is None:
+                assessments.append([p, i, False])
+            else:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(p * last[1], +1.0))
+                last[1] = i
+            if negated:
+                last = assessments[-1]
+                last[1] = 1.0 / last[1]
+                last[2] = True
+            modifier = flag if flag & MODIFIER else None
+            negated = bool(flag & NEGATION)
+        else:
+            if flag & NEGATION:
+                negated = True
+            elif negated and flag & RESET_NEGATION:
+                negated = False
+            if negated and modifier is not None and modifier & LY:
+                # "really not good"
+                assessments[-1][2] = True
+                negated = False
+            elif modifier is not None and flag & RESET_MODIFIER:
+                modifier = None
+            if flag & BANG and assessments:
+                last = assessments[-1]
+                last[0] = max(-1.0, min(last[0] * 1.25, +1.0))
+            if flag & IRONY:
+                assessments.append([0.0, 1.0, False])
+            if flag & EMOTICON:
+                assessments.append([p, 1.0, False])
+    total = 0
+    for p, _, negated_assessment in assessments:
+        total += 1 * (p * -0.5 if negated_assessment else p)
+    return total / float(len(assessments) or 1)
+
+
+# Global instance
+polarity_scorer = LexiconScorer()
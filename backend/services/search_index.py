@@ -0,0 +1,520 @@
+"""Per-user keyword and similar-entry search over journal entries.
+
+Entries go through the same preprocessing as the sentiment vectorizer
+(lowercased, letters only, stop words removed, lemmatized) and are weighted
+the way TfidfVectorizer weights them: raw counts times smoothed IDF, L2
+normalized. Each user's index keeps
+
+* a compacted segment: a CSR matrix of entry vectors, and the same matrix
+  in CSC form, whose columns are the inverted index (one posting list per
+  term);
+* the entries written since it was compacted, scored separately, plus a
+  mask of compacted rows deleted or replaced since.
+
+Keyword search reads only the posting lists of the query terms. Similar
+entries are a cosine top-k against the whole index. IDF is snapshotted when
+the segment is compacted, which happens once enough writes pile up.
+
+Preprocessed entries are stored in SEARCH_INDEX_DB, a SQLite file shared by
+every worker, with a per-user sequence number so a worker's in-memory index
+catches up on other workers' writes before each query. A user's index is
+built from the database on their first search; until then their writes are
+not recorded, as with the statistics store.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+import logging
+
+from core import config
+from core.sqlite import connect
+from services.journal_queries import fetch_page
+from services.sentiment import SentimentAnalyzer, sentiment_analyzer
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_users (
+    user_id TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    -- NULL while the index is being built
+    built_at REAL
+);
+CREATE TABLE IF NOT EXISTS search_entries (
+    user_id TEXT NOT NULL,
+    entry_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    -- Preprocessed content; NULL once the entry is deleted
+    terms TEXT,
+    PRIMARY KEY (user_id, entry_id)
+);
+CREATE INDEX IF NOT EXISTS idx_search_entries_seq ON search_entries(user_id, seq);
+"""
+
+FETCH_CHUNK_SIZE = 1000
+# Recompact once this many writes, or this share of the segment, are pending
+COMPACT_MIN_WRITES = 256
+COMPACT_WRITE_RATIO = 0.05
+
+Hits = List[Tuple[int, float]]
+
+
+def _top_k(ids: "np.ndarray", scores: "np.ndarray", k: int) -> Hits:
+    """Best ``k`` positive scores, ties broken by newest (highest) id"""
+    import numpy as np
+    keep = scores > 0
+    ids, scores = ids[keep], scores[keep]
+    if len(scores) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        ids, scores = ids[best], scores[best]
+    order = np.lexsort((-ids, -scores))
+    return [(int(ids[i]), float(scores[i])) for i in order]
+
+
+class UserIndex:
+    """One user's entries as TF-IDF vectors, searchable by keyword or by example"""
+
+    def __init__(self, built_at: float):
+        import numpy as np
+        self.built_at = built_at
+        # Last change from the store applied to this index
+        self.seq = 0
+        self.vocabulary: Dict[str, int] = {}
+        self._df: List[int] = []
+        # Entry id -> (term ids, counts): what every segment is built from
+        self._docs: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+        # Compacted segment
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._rows: Dict[int, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._matrix = None
+        self._postings = None
+        self._idf = np.zeros(0)
+        self._unseen_idf = 1.0
+
+        # Written since the last compaction, in the order written
+        self._recent: Dict[int, None] = {}
+        self._recent_segment = None
+        self.compactions = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def __contains__(self, entry_id: int) -> bool:
+        return entry_id in self._docs
+
+    def upsert(self, entry_id: int, terms: str):
+        import numpy as np
+        self.delete(entry_id)
+        counts = Counter(terms.split())
+        vocabulary, df = self.vocabulary, self._df
+        term_ids = np.empty(len(counts), dtype=np.int32)
+        for position, term in enumerate(counts):
+            term_id = vocabulary.get(term)
+            if term_id is None:
+                term_id = vocabulary[term] = len(df)
+                df.append(0)
+            df[term_id] += 1
+            term_ids[position] = term_id
+        self._docs[entry_id] = (term_ids, np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+        self._recent[entry_id] = None
+        self._recent_segment = None
+
+    def delete(self, entry_id: int):
+        doc = self._docs.pop(entry_id, None)
+        if doc is None:
+            return
+        df = self._df
+        for term_id in doc[0].tolist():
+            df[term_id] -= 1
+        row = self._rows.pop(entry_id, None)
+        if row is not None:
+            self._live[row] = False
+        if entry_id in self._recent:
+            del self._recent[entry_id]
+            self._recent_segment = None
+
+    def _needs_compaction(self) -> bool:
+        writes = len(self._recent) + len(self._ids) - len(self._rows)
+        return writes >= max(COMPACT_MIN_WRITES, COMPACT_WRITE_RATIO * len(self._ids))
+
+    def compact(self):
+        """Rebuild the segment from every entry with fresh IDF"""
+        import numpy as np
+        from scipy import sparse
+        count = len(self._docs)
+        df = np.asarray(self._df, dtype=np.float64)
+        self._idf = np.log((1 + count) / (1 + df)) + 1.0
+        self._unseen_idf = math.log(1 + count) + 1.0
+
+        ids = np.fromiter(self._docs.keys(), dtype=np.int64, count=count)
+        self._matrix = self._segment(list(self._docs.values()), len(df), sparse)
+        self._postings = self._matrix.tocsc()
+        self._ids = ids
+        self._rows = {int(entry_id): row for row, entry_id in enumerate(ids.tolist())}
+        self._live = np.ones(count, dtype=bool)
+        self._recent = {}
+        self._recent_segment = None
+        self.compactions += 1
+
+    def _weights(self, term_ids: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+        known = term_ids < len(self._idf)
+        idf = np.full(len(term_ids), self._unseen_idf)
+        idf[known] = self._idf[term_ids[known]]
+        return idf
+
+    def _segment(self, docs: "Sequence[Tuple[np.ndarray, np.ndarray]]", columns: int, sparse):
+        """Normalized TF-IDF rows for ``docs`` under the current IDF snapshot"""
+        import numpy as np
+        lengths = np.fromiter((len(doc[0]) for doc in docs), dtype=np.int64, count=len(docs))
+        if lengths.sum():
+            indices = np.concatenate([doc[0] for doc in docs])
+            data = np.concatenate([doc[1] for doc in docs]) * self._weights(indices)
+        else:
+            indices, data = np.zeros(0, dtype=np.int32), np.zeros(0)
+        owners = np.repeat(np.arange(len(docs)), lengths)
+        norms = np.sqrt(np.bincount(owners, weights=data * data, minlength=len(docs)))
+        norms[norms == 0] = 1.0
+        data /= norms[owners]
+        indptr = np.concatenate(([0], np.cumsum(lengths)))
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(docs), columns))
+
+    def _recent_rows(self):
+        """(ids, CSR matrix) of entries written since the last compaction"""
+        import numpy as np
+        if self._recent_segment is None:
+            from scipy import sparse
+            ids = np.fromiter(self._recent.keys(), dtype=np.int64, count=len(self._recent))
+            docs = [self._docs[int(entry_id)] for entry_id in ids.tolist()]
+            self._recent_segment = ids, self._segment(docs, len(self._df), sparse)
+        return self._recent_segment
+
+    def _prepare(self):
+        if self._matrix is None or self._needs_compaction():
+            self.compact()
+
+    def _query(self, terms: Sequence[str]) -> "Optional[Tuple[np.ndarray, np.ndarray]]":
+        import numpy as np
+        counts = Counter(terms)
+        term_ids = [self.vocabulary.get(term) for term in counts]
+        if not term_ids or None in term_ids:
+            return None
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(counts)) * self._weights(term_ids)
+        return term_ids, weights / np.sqrt(weights @ weights)
+
+    def search(self, terms: Sequence[str], k: int) -> Hits:
+        """Entries containing every term, ranked by cosine similarity to the query"""
+        import numpy as np
+        self._prepare()
+        query = self._query(terms)
+        if query is None:
+            return []
+        term_ids, weights = query
+        required = len(term_ids)
+
+        ids, scores = [], []
+        compacted = term_ids < self._postings.shape[1]
+        if compacted.all():
+            columns = self._postings[:, term_ids]
+            matched = (columns.getnnz(axis=1) == required) & self._live
+            rows = np.flatnonzero(matched)
+            ids.append(self._ids[rows])
+            scores.append((columns @ weights)[rows])
+        if self._recent:
+            recent_ids, matrix = self._recent_rows()
+            columns = matrix[:, term_ids]
+            rows = np.flatnonzero(columns.getnnz(axis=1) == required)
+            ids.append(recent_ids[rows])
+            scores.append((columns @ weights)[rows])
+        if not ids:
+            return []
+        return _top_k(np.concatenate(ids), np.concatenate(scores), k)
+
+    def similar(self, entry_id: int, k: int) -> Optional[Hits]:
+        """Entries most similar to ``entry_id`` by cosine, or None if it is not indexed"""
+        import numpy as np
+        doc = self._docs.get(entry_id)
+        if doc is None:
+            return None
+        self._prepare()
+        term_ids, counts = doc
+        if not len(term_ids):
+            return []
+        weights = counts * self._weights(term_ids)
+        weights /= np.sqrt(weights @ weights)
+
+        ids, scores = [self._ids], []
+        compacted = term_ids < self._matrix.shape[1]
+        main_ids, main_weights = term_ids[compacted], weights[compacted]
+        df = np.asarray(self._df)
+        if df[main_ids].sum() * 4 < self._matrix.nnz:
+            # Few postings to read: go through the inverted index
+            main_scores = self._postings[:, main_ids] @ main_weights
+        else:
+            query = np.zeros(self._matrix.shape[1])
+            query[main_ids] = main_weights
+            main_scores = self._matrix @ query
+        main_scores[~self._live] = 0.0
+        scores.append(main_scores)
+        if self._recent:
+            recent_ids, matrix = self._recent_rows()
+            query = np.zeros(matrix.shape[1])
+            query[term_ids] = weights
+            ids.append(recent_ids)
+            scores.append(matrix @ query)
+
+        ids, scores = np.concatenate(ids), np.concatenate(scores)
+        scores[ids == entry_id] = 0.0
+        return _top_k(ids, scores, k)
+
+
+class SearchIndex:
+    """Per-user search indexes: stored in SQLite, cached in memory by recency.
+
+    Preprocessing, SQLite and index work run on threads; each user's
+    index serves one thread at a time.
+    """
+
+    def __init__(self, path: str, analyzer: SentimentAnalyzer, max_users: int = 20):
+        self.path = path
+        self.analyzer = analyzer
+        self.max_users = max_users
+        self._indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+        self._builds: Dict[str, asyncio.Lock] = {}
+        # Guards _indexes and the metrics; each user's lock guards their UserIndex
+        self._lock = threading.Lock()
+        self._user_locks: Dict[str, threading.Lock] = {}
+        with connect(self.path) as conn:
+            conn.executescript(SCHEMA)
+
+        # Metrics
+        self.queries = 0
+        self.builds = 0
+        self.loads = 0
+        self.synced_changes = 0
+        self.evictions = 0
+        self.total_query_seconds = 0.0
+        self.max_query_seconds = 0.0
+        self.total_load_seconds = 0.0
+
+    def terms(self, text: str) -> str:
+        return self.analyzer.preprocess_text(text or "")
+
+    def _state(self, user_id: str):
+        with connect(self.path) as conn:
+            return conn.execute("SELECT seq, built_at FROM search_users WHERE user_id = ?", (user_id,)).fetchone()
+
+    def _record(self, user_id: str, entry_id: int, terms: Optional[str]):
+        try:
+            with connect(self.path, immediate=True) as conn:
+                row = conn.execute("SELECT seq FROM search_users WHERE user_id = ?", (user_id,)).fetchone()
+                if row is None:
+                    return
+                seq = row["seq"] + 1
+                conn.execute(
+                    "INSERT INTO search_entries (user_id, entry_id, seq, terms) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(user_id, entry_id) DO UPDATE SET seq = excluded.seq, terms = excluded.terms",
+                    (user_id, entry_id, seq, terms)
+                )
+                conn.execute("UPDATE search_users SET seq = ? WHERE user_id = ?", (seq, user_id))
+        except Exception as e:
+            # A missed write would leave the index wrong; rebuild it on next search instead
+            logger.error(f"Error updating search index for {user_id}, dropping it: {str(e)}")
+            self.invalidate(user_id)
+
+    def record_upsert(self, user_id: str, entry: Dict):
+        """Index a created or edited entry, if the user has an index.
+
+        Preprocessing is CPU work, so call this on a thread. It never raises:
+        the entry is already saved, and a failure only drops the index.
+        """
+        try:
+            if self._state(user_id) is None:
+                return
+            terms = self.terms(entry.get("content"))
+        except Exception as e:
+            logger.error(f"Error indexing entry {entry.get('id')} for {user_id}, dropping index: {str(e)}")
+            self.invalidate(user_id)
+            return
+        self._record(user_id, entry["id"], terms)
+
+    def record_delete(self, user_id: str, entry_id: int):
+        self._record(user_id, entry_id, None)
+
+    def invalidate(self, user_id: str):
+        """Like ``drop``, for after a write has been saved: logs failures instead of raising"""
+        try:
+            self.drop(user_id)
+        except Exception as e:
+            logger.error(f"Could not drop search index for {user_id}: {str(e)}")
+
+    def drop(self, user_id: str):
+        """Forget the user's index; the next search rebuilds it from the database"""
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM search_entries WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM search_users WHERE user_id = ?", (user_id,))
+        with self._lock:
+            self._indexes.pop(user_id, None)
+
+    def _begin_build(self, user_id: str):
+        with connect(self.path) as conn:
+            # Writes are recorded from here on, and win over the rows fetched afterwards
+            conn.execute("INSERT OR IGNORE INTO search_users (user_id, seq, built_at) VALUES (?, 0, NULL)", (user_id,))
+
+    def _finish_build(self, user_id: str, entries: List[Dict]) -> int:
+        rows = [(user_id, entry["id"], 0, self.terms(entry["content"])) for entry in entries]
+        with connect(self.path) as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO search_entries (user_id, entry_id, seq, terms) VALUES (?, ?, ?, ?)", rows
+            )
+            conn.execute("UPDATE search_users SET built_at = ? WHERE user_id = ?", (time.time(), user_id))
+        return len(rows)
+
+    async def _build(self, user_id: str, db):
+        started = time.perf_counter()
+        await asyncio.to_thread(self._begin_build, user_id)
+        entries = await _fetch_contents(db, user_id)
+        count = await asyncio.to_thread(self._finish_build, user_id, entries)
+        self.builds += 1
+        logger.info(f"Built search index for {user_id}: {count} entries in {time.perf_counter() - started:.2f}s")
+
+    def _load(self, user_id: str) -> UserIndex:
+        with connect(self.path) as conn:
+            state = conn.execute("SELECT seq, built_at FROM search_users WHERE user_id = ?", (user_id,)).fetchone()
+            rows = conn.execute(
+                "SELECT entry_id, terms FROM search_entries WHERE user_id = ? AND terms IS NOT NULL", (user_id,)
+            ).fetchall()
+        index = UserIndex(state["built_at"])
+        # Rows newer than seq are applied again by the next sync, which is harmless
+        index.seq = state["seq"]
+        for entry_id, terms in rows:
+            index.upsert(entry_id, terms)
+        index.compact()
+        return index
+
+    def _sync(self, user_id: str, index: UserIndex):
+        with connect(self.path) as conn:
+            rows = conn.execute(
+                "SELECT entry_id, seq, terms FROM search_entries WHERE user_id = ? AND seq > ? ORDER BY seq",
+                (user_id, index.seq)
+            ).fetchall()
+        for entry_id, seq, terms in rows:
+            if terms is None:
+                index.delete(entry_id)
+            else:
+                index.upsert(entry_id, terms)
+            index.seq = seq
+        with self._lock:
+            self.synced_changes += len(rows)
+
+    async def _built_state(self, user_id: str, db):
+        """The user's stored index state, building their index first if there is none"""
+        state = await asyncio.to_thread(self._state, user_id)
+        if state is None or state["built_at"] is None:
+            # One build per user per worker; others wait for it
+            async with self._builds.setdefault(user_id, asyncio.Lock()):
+                state = await asyncio.to_thread(self._state, user_id)
+                if state is None or state["built_at"] is None:
+                    await self._build(user_id, db)
+                    state = await asyncio.to_thread(self._state, user_id)
+        return state
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        # Never dropped, so two threads can never hold different locks for one user
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def _index(self, user_id: str, state) -> UserIndex:
+        """The user's index, loaded or brought up to date as needed; hold the user's lock"""
+        with self._lock:
+            index = self._indexes.get(user_id)
+        if index is None or index.built_at != state["built_at"]:
+            started = time.perf_counter()
+            index = self._load(user_id)
+            with self._lock:
+                self.loads += 1
+                self.total_load_seconds += time.perf_counter() - started
+                self._indexes[user_id] = index
+        if index.seq < state["seq"]:
+            self._sync(user_id, index)
+        with self._lock:
+            if user_id in self._indexes:
+                self._indexes.move_to_end(user_id)
+            while len(self._indexes) > self.max_users:
+                self._indexes.popitem(last=False)
+                self.evictions += 1
+        return index
+
+    def _timed(self, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.queries += 1
+            self.total_query_seconds += elapsed
+            self.max_query_seconds = max(self.max_query_seconds, elapsed)
+
+    def _search(self, user_id: str, state, query: str, limit: int) -> Hits:
+        terms = self.terms(query).split()
+        with self._user_lock(user_id):
+            index = self._index(user_id, state)
+            started = time.perf_counter()
+            hits = index.search(terms, limit)
+            self._timed(started)
+        return hits
+
+    def _similar(self, user_id: str, state, entry_id: int, limit: int) -> Optional[Hits]:
+        with self._user_lock(user_id):
+            index = self._index(user_id, state)
+            started = time.perf_counter()
+            hits = index.similar(entry_id, limit)
+            self._timed(started)
+        return hits
+
+    async def search(self, user_id: str, query: str, limit: int, db) -> Hits:
+        """(entry id, score) of entries containing every word of ``query``, best first"""
+        state = await self._built_state(user_id, db)
+        return await asyncio.to_thread(self._search, user_id, state, query, limit)
+
+    async def similar(self, user_id: str, entry_id: int, limit: int, db) -> Optional[Hits]:
+        """(entry id, score) of the entries most like ``entry_id``, or None if it is not indexed"""
+        state = await self._built_state(user_id, db)
+        return await asyncio.to_thread(self._similar, user_id, state, entry_id, limit)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "resident_users": len(self._indexes),
+                "resident_entries": sum(len(index) for index in self._indexes.values()),
+                "max_users": self.max_users,
+                "queries": self.queries,
+                "builds": self.builds,
+                "loads": self.loads,
+                "synced_changes": self.synced_changes,
+                "evictions": self.evictions,
+                "average_query_seconds": (self.total_query_seconds / self.queries) if self.queries else 0.0,
+                "max_query_seconds": self.max_query_seconds,
+                "average_load_seconds": (self.total_load_seconds / self.loads) if self.loads else 0.0,
+            }
+
+
+async def _fetch_contents(db, user_id: str) -> List[Dict]:
+    """Every entry's id and content, in keyset pages"""
+    entries: List[Dict] = []
+    cursor = None
+    while True:
+        rows, cursor = await fetch_page(db, user_id, "id, created_at, content", FETCH_CHUNK_SIZE, cursor=cursor)
+        entries.extend(rows)
+        if cursor is None:
+            return entries
+
+
+# Global instance
+search_index = SearchIndex(config.SEARCH_INDEX_DB, sentiment_analyzer, config.SEARCH_INDEX_CACHE_SIZE)
@@ -1,60 +1,118 @@
 import pickle
-import numpy as np
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score, classification_report
-from textblob import TextBlob
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
+from functools import lru_cache
 import re
 import os
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, FrozenSet
 import logging
 
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/stopwords')
-    nltk.data.find('corpora/wordnet')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('stopwords')
-    nltk.download('wordnet')
+from core import config
+from core.metrics import timed
+from services import nlp_resources
+from services.model_artifacts import CompactLinear, bundle_version, load_bundle, save_bundle
+from services.polarity import polarity_scorer
+
+# NumPy, scikit-learn, NLTK and (with POLARITY_ENGINE=textblob) TextBlob
+# are imported on first use, so importing this module (and booting a worker)
+# stays fast
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Everything except letters and whitespace is stripped before tokenizing
+NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z\s]')
+
+# On text that is only [a-z\s], NLTK's word_tokenize reduces to a whitespace
+# split plus these whole-word contraction splits (NLTKWordTokenizer.CONTRACTIONS2).
+# The other contraction rules all need an apostrophe, which never survives cleaning.
+TOKEN_SPLITS = {
+    "cannot": ("can", "not"),
+    "gimme": ("gim", "me"),
+    "gonna": ("gon", "na"),
+    "gotta": ("got", "ta"),
+    "lemme": ("lem", "me"),
+    "wanna": ("wan", "na"),
+}
+
+# Fewer entries than this are not enough to train (or serve) a user model
+MIN_TRAINING_ENTRIES = 10
+
+# Every label the models can predict; the online engine needs them up front
+LABELS = ("negative", "neutral", "positive")
+
+@lru_cache(maxsize=config.LEMMA_CACHE_SIZE)
+def lemmatize(token: str) -> str:
+    """Memoized WordNet lemmatization, shared by every analyzer in the process"""
+    return nlp_resources.lemmatizer().lemmatize(token)
+
+def polarity_many(texts: List[str]) -> List[float]:
+    """TextBlob-compatible polarity for each text, from the configured engine"""
+    if config.POLARITY_ENGINE == "textblob":
+        from textblob import TextBlob
+        return [TextBlob(text).sentiment.polarity for text in texts]
+    return polarity_scorer.polarity_many(texts).tolist()
+
+def _new_estimators():
+    """Untrained vectorizer and forest"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.ensemble import RandomForestClassifier
+    return (
+        TfidfVectorizer(max_features=5000, stop_words='english'),
+        RandomForestClassifier(n_estimators=100, random_state=42)
+    )
+
+def _new_online_estimators():
+    """Stateless hashing vectorizer and an untrained logistic-loss SGD classifier"""
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    return (
+        HashingVectorizer(n_features=config.ONLINE_HASH_FEATURES, alternate_sign=False, stop_words='english'),
+        SGDClassifier(loss='log_loss', alpha=1e-4, random_state=42)
+    )
+
 class SentimentAnalyzer:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
-        self.model = RandomForestClassifier(n_estimators=100, random_state=42)
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
-        self.model_path = "sentiment_model.pkl"
-        self.vectorizer_path = "vectorizer.pkl"
+    engine = "forest"
+    
+    def __init__(
+        self,
+        bundle_path: str = "sentiment_model.bundle",
+        model_path: str = "sentiment_model.pkl",
+        vectorizer_path: str = "vectorizer.pkl"
+    ):
+        # Set by train_model() or load_model()
+        self.vectorizer = None
+        self.model = None
+        self.bundle_path = bundle_path
+        # Legacy pickles, only read when no bundle exists yet
+        self.model_path = model_path
+        self.vectorizer_path = vectorizer_path
+        self.model_version: Optional[str] = None
+        self.metadata: Dict = {}
         self.is_trained = False
+    
+    @property
+    def stop_words(self) -> FrozenSet[str]:
+        return nlp_resources.stop_words()
         
     def preprocess_text(self, text: str) -> str:
         """Preprocess text for sentiment analysis"""
-        # Convert to lowercase
-        text = text.lower()
-        
-        # Remove special characters and digits
-        text = re.sub(r'[^a-zA-Z\s]', '', text)
+        # Lowercase, then remove special characters and digits
+        text = NON_ALPHA_PATTERN.sub('', text.lower())
         
-        # Tokenize
-        tokens = word_tokenize(text)
-        
-        # Remove stopwords and lemmatize
-        tokens = [self.lemmatizer.lemmatize(token) for token in tokens 
-                 if token not in self.stop_words and len(token) > 2]
+        # Tokenize, remove stopwords and lemmatize
+        stop_words = self.stop_words
+        tokens = []
+        for word in text.split():
+            for token in TOKEN_SPLITS.get(word, (word,)):
+                if len(token) > 2 and token not in stop_words:
+                    tokens.append(lemmatize(token))
         
         return ' '.join(tokens)
     
+    def preprocess_many(self, texts: Iterable[str]) -> Iterator[str]:
+        """Lazily preprocess an iterable of texts"""
+        for text in texts:
+            yield self.preprocess_text(text)
+    
     def get_sentiment_label(self, polarity: float) -> str:
         """Convert polarity score to sentiment label"""
         if polarity > 0.1:
@@ -64,29 +122,37 @@ class SentimentAnalyzer:
         else:
             return "neutral"
     
+    def training_examples(self, journal_entries: Iterable[Dict]) -> Tuple[List[str], List[str]]:
+        """Preprocessed texts and labels of the entries that have content"""
+        texts = []
+        labels = []
+        for entry in journal_entries:
+            content = entry.get('content', '')
+            sentiment = entry.get('sentiment', 0.0)
+            
+            if content:
+                texts.append(self.preprocess_text(content))
+                labels.append(self.get_sentiment_label(sentiment))
+        return texts, labels
+    
     def train_model(self, journal_entries: List[Dict]) -> Dict:
         """Train the sentiment analysis model on user's journal entries"""
         try:
-            if len(journal_entries) < 10:
+            if len(journal_entries) < MIN_TRAINING_ENTRIES:
                 return {"status": "insufficient_data", "message": "Need at least 10 journal entries to train the model"}
             
             # Prepare data
-            texts = []
-            labels = []
-            
-            for entry in journal_entries:
-                content = entry.get('content', '')
-                sentiment = entry.get('sentiment', 0.0)
-                
-                if content:
-                    processed_text = self.preprocess_text(content)
-                    texts.append(processed_text)
-                    labels.append(self.get_sentiment_label(sentiment))
-            
-            if len(texts) < 10:
+            texts, labels = self.training_examples(journal_entries)
+            
+            if len(texts) < MIN_TRAINING_ENTRIES:
                 return {"status": "insufficient_data", "message": "Need at least 10 valid journal entries"}
             
-            # Vectorize texts
+            # Vectorize texts with a fresh vectorizer and model, even if a
+            # (read-only) bundle was loaded into this analyzer before
+            import numpy as np
+            from sklearn.model_selection import train_test_split
+            from sklearn.metrics import accuracy_score, classification_report
+            self.vectorizer, self.model = self._fresh_estimators()
             X = self.vectorizer.fit_transform(texts)
             y = np.array(labels)
             
@@ -96,7 +162,7 @@ class SentimentAnalyzer:
             )
             
             # Train model
-            self.model.fit(X_train, y_train)
+            self._fit(X_train, y_train)
             
             # Evaluate model
             y_pred = self.model.predict(X_test)
@@ -109,9 +175,10 @@ class SentimentAnalyzer:
             
             return {
                 "status": "success",
+                "engine": self.engine,
                 "accuracy": accuracy,
                 "training_samples": len(texts),
-                "test_samples": len(X_test),
+                "test_samples": X_test.shape[0],
                 "classification_report": classification_report(y_test, y_pred, output_dict=True)
             }
             
@@ -119,82 +186,140 @@ class SentimentAnalyzer:
             logger.error(f"Error training model: {str(e)}")
             return {"status": "error", "message": str(e)}
     
+    def _fresh_estimators(self):
+        return _new_estimators()
+    
+    def _fit(self, X, y):
+        self.model.fit(X, y)
+    
+    def _polarity_result(self, polarity: float, method: str) -> Dict:
+        return {
+            "sentiment": polarity,
+            "label": self.get_sentiment_label(polarity),
+            "confidence": abs(polarity),
+            "method": method
+        }
+    
+    def predict_polarity(self, texts: List[str], method: str = "textblob_degraded") -> List[Dict]:
+        """Polarity-only results, without a model pass, for when inference is overloaded"""
+        return [self._polarity_result(polarity, method) for polarity in polarity_many(texts)]
+    
     def predict_sentiment(self, text: str) -> Dict:
         """Predict sentiment of a given text"""
+        return self.predict_batch([text])[0]
+    
+    def predict_batch(self, texts: List[str], timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Predict sentiment for many texts at once, returned in input order.
+
+        Seconds spent per stage are added to ``timings`` when given.
+        """
+        # Polarity is needed on every path, so it is scored once for the batch
+        with timed(timings, "polarity"):
+            polarities = polarity_many(texts)
+        
+        if not self.is_trained:
+            # Fallback to TextBlob-style polarity if model not trained
+            return [self._polarity_result(polarity, "textblob") for polarity in polarities]
+        
+        try:
+            with timed(timings, "preprocess"):
+                processed_texts = list(self.preprocess_many(texts))
+        except Exception as e:
+            logger.error(f"Error predicting sentiment: {str(e)}")
+            return [self._polarity_result(polarity, "textblob_fallback") for polarity in polarities]
+        return self.predict_prepared(processed_texts, polarities, timings)
+    
+    def predict_prepared(self, processed_texts: List[str], polarities: List[float],
+                         timings: Optional[Dict[str, float]] = None) -> List[Dict]:
+        """Like ``predict_batch``, for texts the caller already preprocessed and scored for polarity"""
+        if not self.is_trained:
+            return [self._polarity_result(polarity, "textblob") for polarity in polarities]
+        
         try:
-            if not self.is_trained:
-                # Fallback to TextBlob if model not trained
-                blob = TextBlob(text)
-                polarity = blob.sentiment.polarity
-                return {
-                    "sentiment": polarity,
-                    "label": self.get_sentiment_label(polarity),
-                    "confidence": abs(polarity),
-                    "method": "textblob"
-                }
-            
-            # Use trained model
-            processed_text = self.preprocess_text(text)
-            X = self.vectorizer.transform([processed_text])
-            
-            prediction = self.model.predict(X)[0]
-            probabilities = self.model.predict_proba(X)[0]
-            confidence = max(probabilities)
-            
-            # Also get TextBlob sentiment for comparison
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
+            # One sparse matrix and one forest pass for the whole batch;
+            # labels come from the probabilities rather than a second predict()
+            import numpy as np
+            with timed(timings, "vectorize"):
+                X = self.vectorizer.transform(processed_texts)
             
-            return {
+            with timed(timings, "predict"):
+                probabilities = self.model.predict_proba(X)
+                best = np.argmax(probabilities, axis=1)
+                predictions = self.model.classes_[best]
+                confidences = probabilities[np.arange(len(processed_texts)), best]
+        except Exception as e:
+            logger.error(f"Error predicting sentiment: {str(e)}")
+            # Fallback to TextBlob-style polarity
+            return [self._polarity_result(polarity, "textblob_fallback") for polarity in polarities]
+        
+        results = []
+        for polarity, prediction, confidence in zip(polarities, predictions, confidences):
+            # TextBlob-style sentiment is also returned for comparison
+            results.append({
                 "sentiment": polarity,
-                "label": prediction,
-                "confidence": confidence,
+                "label": str(prediction),
+                "confidence": float(confidence),
                 "method": "trained_model",
                 "textblob_sentiment": polarity,
                 "textblob_label": self.get_sentiment_label(polarity)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error predicting sentiment: {str(e)}")
-            # Fallback to TextBlob
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            return {
-                "sentiment": polarity,
-                "label": self.get_sentiment_label(polarity),
-                "confidence": abs(polarity),
-                "method": "textblob_fallback"
-            }
+            })
+        return results
+    
+    def bundle_metadata(self) -> Dict:
+        return {"engine": self.engine}
     
-    def save_model(self):
-        """Save the trained model and vectorizer"""
+    def save_model(self) -> bool:
+        """Save the trained model and vectorizer as a single bundle"""
         try:
-            with open(self.model_path, 'wb') as f:
-                pickle.dump(self.model, f)
-            with open(self.vectorizer_path, 'wb') as f:
-                pickle.dump(self.vectorizer, f)
-            logger.info("Model and vectorizer saved successfully")
+            self.model_version = save_bundle(self.bundle_path, self.vectorizer, self.model, self.bundle_metadata())
+            logger.info(f"Model bundle {self.model_version} saved successfully")
+            return True
         except Exception as e:
             logger.error(f"Error saving model: {str(e)}")
+            return False
     
     def load_model(self) -> bool:
         """Load the trained model and vectorizer"""
         try:
+            if os.path.exists(self.bundle_path):
+                self.vectorizer, self.model, header = load_bundle(self.bundle_path)
+                self.model_version = header["model_version"]
+                self.metadata = header.get("metadata", {})
+                self.is_trained = True
+                logger.info(f"Model bundle {self.model_version} loaded successfully")
+                return True
             if os.path.exists(self.model_path) and os.path.exists(self.vectorizer_path):
                 with open(self.model_path, 'rb') as f:
                     self.model = pickle.load(f)
                 with open(self.vectorizer_path, 'rb') as f:
                     self.vectorizer = pickle.load(f)
+                self.model_version = f"legacy-{os.path.getmtime(self.model_path)}"
+                self.metadata = {}
                 self.is_trained = True
-                logger.info("Model and vectorizer loaded successfully")
+                logger.info("Legacy model and vectorizer pickles loaded successfully")
                 return True
             return False
         except Exception as e:
             logger.error(f"Error loading model: {str(e)}")
             return False
     
+    def artifact_info(self) -> Optional[Tuple[tuple, int]]:
+        """(change token, size in bytes) of the saved artifacts, or None if there are none"""
+        version = bundle_version(self.bundle_path)
+        if version is not None:
+            return version, version[2]
+        try:
+            model_stat = os.stat(self.model_path)
+            vectorizer_stat = os.stat(self.vectorizer_path)
+        except OSError:
+            return None
+        return (
+            (model_stat.st_mtime_ns, vectorizer_stat.st_mtime_ns),
+            model_stat.st_size + vectorizer_stat.st_size
+        )
+    
     def get_sentiment_insights(self, journal_entries: List[Dict]) -> Dict:
-        """Generate insights from journal entries"""
+        """Generate insights from journal entries, ordered newest first"""
         try:
             if not journal_entries:
                 return {"status": "no_data", "message": "No journal entries found"}
@@ -203,6 +328,7 @@ class SentimentAnalyzer:
             labels = [self.get_sentiment_label(sentiment) for sentiment in sentiments]
             
             # Calculate statistics
+            import numpy as np
             avg_sentiment = np.mean(sentiments)
             sentiment_std = np.std(sentiments)
             
@@ -211,9 +337,9 @@ class SentimentAnalyzer:
             for label in labels:
                 sentiment_counts[label] = sentiment_counts.get(label, 0) + 1
             
-            # Find trends (last 7 entries vs previous)
-            recent_entries = journal_entries[-7:] if len(journal_entries) >= 7 else journal_entries
-            older_entries = journal_entries[:-7] if len(journal_entries) >= 14 else []
+            # Find trends (last 7 entries vs previous 7)
+            recent_entries = journal_entries[:7] if len(journal_entries) >= 7 else journal_entries
+            older_entries = journal_entries[7:14] if len(journal_entries) >= 14 else []
             
             recent_avg = np.mean([entry.get('sentiment', 0) for entry in recent_entries])
             older_avg = np.mean([entry.get('sentiment', 0) for entry in older_entries]) if older_entries else recent_avg
@@ -235,6 +361,95 @@ class SentimentAnalyzer:
             logger.error(f"Error generating insights: {str(e)}")
             return {"status": "error", "message": str(e)}
 
+class OnlineSentimentAnalyzer(SentimentAnalyzer):
+    """Linear model over hashed features, updated in place as entries arrive.
+    
+    The hashing vectorizer has no vocabulary to fit, so ``partial_update``
+    learns from new or edited entries without revisiting the rest of the
+    history. ``train_model`` still builds a model from the full history, with
+    the same split and report as the forest. Saved bundles are checkpoints
+    that ``load_model`` resumes from. A forest bundle is never continued or
+    replaced by updates; ``train_model`` has to replace it first.
+    """
+    engine = "online"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.samples_seen = 0
+        # Learned since the last checkpoint
+        self.pending_samples = 0
+        self._learner = None
+        # The loaded bundle holds a model this engine cannot update
+        self.foreign_model = False
+    
+    def _fresh_estimators(self):
+        vectorizer, self._learner = _new_online_estimators()
+        self.samples_seen = 0
+        self.foreign_model = False
+        return vectorizer, self._learner
+    
+    def _fit(self, X, y):
+        import numpy as np
+        rng = np.random.RandomState(42)
+        for _ in range(config.ONLINE_TRAINING_EPOCHS):
+            order = rng.permutation(X.shape[0])
+            self.model.partial_fit(X[order], y[order], classes=LABELS)
+        self.samples_seen = X.shape[0]
+    
+    def _resume(self):
+        """The mutable learner, continuing from the loaded checkpoint if there is one"""
+        if self._learner is None:
+            vectorizer, learner = _new_online_estimators()
+            if isinstance(self.model, CompactLinear):
+                self.model.restore(learner)
+            else:
+                # Nothing to continue from
+                self.vectorizer = vectorizer
+                self.samples_seen = 0
+            self._learner = self.model = learner
+        return self._learner
+    
+    def partial_update(self, journal_entries: Iterable[Dict]) -> int:
+        """Learn from new or edited entries; returns how many were learned.
+
+        Learns nothing while a forest bundle is loaded, so that a checkpoint
+        of a few entries never replaces a model fitted on the full history.
+        """
+        if self.foreign_model:
+            return 0
+        texts, labels = self.training_examples(journal_entries)
+        if not texts:
+            return 0
+        learner = self._resume()
+        learner.partial_fit(self.vectorizer.transform(texts), labels, classes=LABELS)
+        self.samples_seen += len(texts)
+        self.pending_samples += len(texts)
+        self.is_trained = self.samples_seen >= MIN_TRAINING_ENTRIES
+        return len(texts)
+    
+    def bundle_metadata(self) -> Dict:
+        return {**super().bundle_metadata(), "samples_seen": self.samples_seen}
+    
+    def save_model(self) -> bool:
+        saved = super().save_model()
+        if saved:
+            self.pending_samples = 0
+        return saved
+    
+    def load_model(self) -> bool:
+        loaded = super().load_model()
+        self._learner = None
+        self.pending_samples = 0
+        self.samples_seen = int(self.metadata.get("samples_seen", 0)) if loaded else 0
+        self.foreign_model = loaded and not isinstance(self.model, CompactLinear)
+        return loaded
+
+# Training engines, selected per deployment with TRAINING_ENGINE
+ANALYZERS = {
+    "forest": SentimentAnalyzer,
+    "online": OnlineSentimentAnalyzer,
+}
+
 # Global instance
 sentiment_analyzer = SentimentAnalyzer()
 
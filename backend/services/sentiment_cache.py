@@ -0,0 +1,200 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from core import config
+from core.sqlite import connect
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry overhead of the key, OrderedDict node and result dict
+ENTRY_OVERHEAD_BYTES = 400
+# Prune the disk tier back under its cap after this many inserts
+DISK_PRUNE_INTERVAL = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sentiment_cache (
+    key BLOB PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sentiment_cache_created ON sentiment_cache (created_at);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace differences never change a score"""
+    return " ".join(text.split())
+
+
+class SentimentCache:
+    """Bounded cache of sentiment results keyed by model version and text.
+
+    Keys are a hash of the active model's change token and the normalized
+    text, so retraining or reloading a model makes its old results
+    unreachable; they simply age out of the LRU. An optional SQLite tier
+    lets every uvicorn worker reuse each other's results; with it,
+    ``get_many`` and ``put_many`` block, so async code calls them on a thread.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 1000000):
+        self.max_bytes = max_bytes
+        self.disk_path = disk_path or None
+        self.disk_max_entries = disk_max_entries
+        self._entries: "OrderedDict[bytes, Tuple[Dict, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._disk_inserts = 0
+        if self.disk_path:
+            with connect(self.disk_path) as conn:
+                conn.executescript(SCHEMA)
+
+        # Metrics
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_errors = 0
+        self.saved_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or bool(self.disk_path)
+
+    @staticmethod
+    def key(version: str, text: str) -> bytes:
+        return hashlib.blake2b(
+            f"{version}\0{normalize_text(text)}".encode("utf-8"), digest_size=16
+        ).digest()
+
+    def get_many(self, keys: List[bytes], cost_seconds: float = 0.0) -> List[Optional[Dict]]:
+        """Look keys up in memory, then on disk. ``cost_seconds`` is what one miss would cost."""
+        results: List[Optional[Dict]] = [None] * len(keys)
+        missing = []
+        with self._lock:
+            for index, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is None:
+                    missing.append(index)
+                    continue
+                self._entries.move_to_end(key)
+                results[index] = dict(entry[0])
+                self.hits += 1
+
+        if missing and self.disk_path:
+            found = self._disk_get([keys[i] for i in missing])
+            still_missing = []
+            for index in missing:
+                result = found.get(keys[index])
+                if result is None:
+                    still_missing.append(index)
+                    continue
+                self._remember(keys[index], result)
+                results[index] = dict(result)
+            with self._lock:
+                self.disk_hits += len(missing) - len(still_missing)
+            missing = still_missing
+
+        with self._lock:
+            self.misses += len(missing)
+            self.saved_seconds += (len(keys) - len(missing)) * cost_seconds
+        return results
+
+    def put_many(self, items: List[Tuple[bytes, Dict]]):
+        for key, result in items:
+            self._remember(key, result)
+        if self.disk_path and items:
+            self._disk_put(items)
+
+    def _remember(self, key: bytes, result: Dict):
+        if self.max_bytes <= 0:
+            return
+        size = ENTRY_OVERHEAD_BYTES + len(key) + sum(len(str(v)) for v in result.values())
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (dict(result), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def _disk_get(self, keys: List[bytes]) -> Dict[bytes, Dict]:
+        found = {}
+        try:
+            with connect(self.disk_path) as conn:
+                # Stay well under SQLite's bound-parameter limit
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT key, result FROM sentiment_cache WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    found.update({row["key"]: json.loads(row["result"]) for row in rows})
+        except sqlite3.Error as e:
+            with self._lock:
+                self.disk_errors += 1
+            logger.warning(f"Sentiment cache read failed: {str(e)}")
+        return found
+
+    def _disk_put(self, items: List[Tuple[bytes, Dict]]):
+        now = time.time()
+        try:
+            with connect(self.disk_path) as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, result, created_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(result), now) for key, result in items]
+                )
+                with self._lock:
+                    self._disk_inserts += len(items)
+                    prune = self._disk_inserts >= DISK_PRUNE_INTERVAL
+                    if prune:
+                        self._disk_inserts = 0
+                if prune:
+                    conn.execute(
+                        "DELETE FROM sentiment_cache WHERE key IN ("
+                        "SELECT key FROM sentiment_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_max_entries,)
+                    )
+        except sqlite3.Error as e:
+            with self._lock:
+                self.disk_errors += 1
+            logger.warning(f"Sentiment cache write failed: {str(e)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "disk_enabled": bool(self.disk_path),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_errors": self.disk_errors,
+                "saved_seconds": self.saved_seconds,
+            }
+
+
+# Global instance
+sentiment_cache = SentimentCache(
+    max_bytes=config.SENTIMENT_CACHE_BYTES,
+    disk_path=config.SENTIMENT_CACHE_DB,
+    disk_max_entries=config.SENTIMENT_CACHE_DISK_ENTRIES
+)
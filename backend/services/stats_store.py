@@ -0,0 +1,434 @@
+import argparse
+import asyncio
+import json
+import math
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import logging
+
+from postgrest.exceptions import APIError
+
+from core import config
+from core.sqlite import connect
+from services.journal_queries import fetch_page
+from services.sentiment import sentiment_analyzer
+
+logger = logging.getLogger(__name__)
+
+# Columns needed to (re)build an aggregate; never the entry content
+STATS_COLUMNS = "id, sentiment, mood_category, created_at"
+# Trend compares the last 7 entries with the 7 before them
+TREND_WINDOW = 7
+FETCH_CHUNK_SIZE = 1000
+# SQL function in database_schema.sql that aggregates a user's entries server-side
+AGGREGATE_RPC = "get_journal_aggregate"
+# Builds retried when writes keep landing while the database is read
+BUILD_ATTEMPTS = 3
+# State of a row whose aggregate is being built
+BUILDING = "null"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    rebuilt_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    seq INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _timestamp(created_at: str) -> float:
+    return datetime.fromisoformat(created_at.replace('Z', '+00:00')).timestamp()
+
+
+def _trend(recent_avg: float, older_avg: float) -> str:
+    return "improving" if recent_avg > older_avg + 0.1 else "declining" if recent_avg < older_avg - 0.1 else "stable"
+
+
+class UserAggregate:
+    """Running statistics over one user's journal entries.
+
+    Mean and variance use Welford's algorithm, which also supports removing
+    a value. ``recent`` holds the newest entries as ``[timestamp, id,
+    sentiment, created_at]``, newest first; it is always a prefix of the
+    user's full history, so once deletes shrink it below the trend window
+    it has to be refilled from the database.
+    """
+
+    def __init__(self, capacity: int = 32):
+        self.capacity = capacity
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.mood_counts: Dict[str, int] = {}
+        self.polarity_counts: Dict[str, int] = {}
+        self.recent: List[list] = []
+
+    @classmethod
+    def from_entries(cls, entries: List[Dict], capacity: int = 32) -> "UserAggregate":
+        aggregate = cls(capacity)
+        for entry in sorted(entries, key=lambda e: (_timestamp(e["created_at"]), e["id"])):
+            aggregate.add(entry)
+        return aggregate
+
+    @classmethod
+    def from_summary(cls, summary: Dict, capacity: int = 32) -> "UserAggregate":
+        """Build from the output of the get_journal_aggregate SQL function"""
+        aggregate = cls(capacity)
+        aggregate.count = summary["total_entries"]
+        aggregate.mean = float(summary["average_sentiment"] or 0.0)
+        aggregate.m2 = float(summary["sentiment_m2"] or 0.0)
+        aggregate.mood_counts = dict(summary["mood_counts"] or {})
+        aggregate.polarity_counts = dict(summary["polarity_counts"] or {})
+        aggregate.refill(summary["recent_entries"] or [])
+        return aggregate
+
+    @classmethod
+    def from_state(cls, state: Dict) -> "UserAggregate":
+        aggregate = cls(state["capacity"])
+        aggregate.count = state["count"]
+        aggregate.mean = state["mean"]
+        aggregate.m2 = state["m2"]
+        aggregate.mood_counts = state["mood_counts"]
+        aggregate.polarity_counts = state["polarity_counts"]
+        aggregate.recent = state["recent"]
+        return aggregate
+
+    def to_state(self) -> Dict:
+        return {
+            "capacity": self.capacity,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "mood_counts": self.mood_counts,
+            "polarity_counts": self.polarity_counts,
+            "recent": self.recent,
+        }
+
+    @staticmethod
+    def _bump(counts: Dict[str, int], key: str, delta: int):
+        counts[key] = counts.get(key, 0) + delta
+        if counts[key] <= 0:
+            del counts[key]
+
+    def _add_value(self, entry: Dict):
+        x = entry["sentiment"]
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self._bump(self.mood_counts, entry["mood_category"], 1)
+        self._bump(self.polarity_counts, sentiment_analyzer.get_sentiment_label(x), 1)
+
+    def _remove_value(self, entry: Dict):
+        x = entry["sentiment"]
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        else:
+            old_mean = self.mean
+            self.mean = (self.count * old_mean - x) / (self.count - 1)
+            self.m2 = max(self.m2 - (x - self.mean) * (x - old_mean), 0.0)
+            self.count -= 1
+        self._bump(self.mood_counts, entry["mood_category"], -1)
+        self._bump(self.polarity_counts, sentiment_analyzer.get_sentiment_label(x), -1)
+
+    def add(self, entry: Dict):
+        complete = len(self.recent) == self.count
+        self._add_value(entry)
+        item = [_timestamp(entry["created_at"]), entry["id"], entry["sentiment"], entry["created_at"]]
+        # Only entries newer than the oldest buffered one keep the buffer a prefix
+        if complete or (self.recent and item[:2] > self.recent[-1][:2]):
+            self.recent.append(item)
+            self.recent.sort(key=lambda r: (r[0], r[1]), reverse=True)
+            del self.recent[self.capacity:]
+
+    def remove(self, entry: Dict):
+        self._remove_value(entry)
+        self.recent = [r for r in self.recent if r[1] != entry["id"]]
+
+    def replace(self, old: Dict, new: Dict):
+        self._remove_value(old)
+        self._add_value(new)
+        for r in self.recent:
+            if r[1] == old["id"]:
+                r[2] = new["sentiment"]
+
+    @property
+    def needs_refill(self) -> bool:
+        return len(self.recent) < min(self.count, 2 * TREND_WINDOW)
+
+    def refill(self, newest_entries: List[Dict]):
+        """Replace the recent buffer with the newest entries fetched from the database"""
+        self.recent = [
+            [_timestamp(e["created_at"]), e["id"], e["sentiment"], e["created_at"]]
+            for e in newest_entries
+        ]
+        self.recent.sort(key=lambda r: (r[0], r[1]), reverse=True)
+        del self.recent[self.capacity:]
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def _recent_averages(self):
+        recent = self.recent[:TREND_WINDOW] if self.count >= TREND_WINDOW else self.recent
+        older = self.recent[TREND_WINDOW:2 * TREND_WINDOW] if self.count >= 2 * TREND_WINDOW else []
+        recent_avg = sum(r[2] for r in recent) / len(recent)
+        older_avg = sum(r[2] for r in older) / len(older) if older else recent_avg
+        return recent_avg, older_avg
+
+    def to_stats(self) -> Dict:
+        """Fields of UserStatsResponse"""
+        if not self.count:
+            return {
+                "total_entries": 0,
+                "average_sentiment": 0.0,
+                "positive_entries": 0,
+                "negative_entries": 0,
+                "neutral_entries": 0,
+                "recent_trend": "stable",
+                "mood_stability": "stable",
+            }
+        recent_avg, older_avg = self._recent_averages()
+        return {
+            "total_entries": self.count,
+            "average_sentiment": self.mean,
+            "positive_entries": self.mood_counts.get("positive", 0),
+            "negative_entries": self.mood_counts.get("negative", 0),
+            "neutral_entries": self.mood_counts.get("neutral", 0),
+            "recent_trend": _trend(recent_avg, older_avg),
+            "mood_stability": "stable" if self.std < 0.3 else "variable",
+            "last_entry_date": datetime.fromisoformat(self.recent[0][3].replace('Z', '+00:00')),
+        }
+
+    def to_insights(self) -> Dict:
+        """Fields of SentimentInsightsResponse"""
+        if not self.count:
+            return {"status": "no_data", "message": "No journal entries found"}
+        recent_avg, older_avg = self._recent_averages()
+        return {
+            "status": "success",
+            "total_entries": self.count,
+            "average_sentiment": self.mean,
+            "sentiment_std": self.std,
+            "sentiment_distribution": dict(self.polarity_counts),
+            "recent_average": recent_avg,
+            "trend": _trend(recent_avg, older_avg),
+            "mood_stability": "stable" if self.std < 0.3 else "variable",
+        }
+
+
+class StatsStore:
+    """Per-user aggregates in a local SQLite file shared by every worker.
+
+    Writes update an existing aggregate in place. A user with no aggregate
+    yet is left alone and gets one built by a full scan on their next read.
+
+    Every write bumps the row's ``seq``. A build first leaves a placeholder
+    row, so writes during the scan bump it too, and only stores its result
+    if ``seq`` is unchanged; otherwise it cannot tell whether the scan saw
+    those writes, and scans again. Refills are stored the same way.
+    """
+
+    def __init__(self, path: str, recent_capacity: int = 32):
+        self.path = path
+        self.recent_capacity = max(recent_capacity, 2 * TREND_WINDOW)
+        with connect(self.path) as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(user_stats)")}
+            if "seq" not in columns:
+                conn.execute("ALTER TABLE user_stats ADD COLUMN seq INTEGER NOT NULL DEFAULT 0")
+
+    def snapshot(self, user_id: str) -> Tuple[Optional[UserAggregate], Optional[int]]:
+        """(aggregate, seq); the aggregate is None while missing or being built"""
+        with connect(self.path) as conn:
+            row = conn.execute("SELECT state, seq FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+        if row is None:
+            return None, None
+        state = json.loads(row["state"])
+        return (UserAggregate.from_state(state) if state is not None else None), row["seq"]
+
+    def get(self, user_id: str) -> Optional[UserAggregate]:
+        return self.snapshot(user_id)[0]
+
+    def begin_build(self, user_id: str) -> int:
+        """Make sure the user has a row, so writes bump its seq, and return that seq"""
+        now = time.time()
+        with connect(self.path, immediate=True) as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO user_stats (user_id, state, rebuilt_at, updated_at) VALUES (?, ?, ?, ?)",
+                (user_id, BUILDING, now, now)
+            )
+            return conn.execute("SELECT seq FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()["seq"]
+
+    def save_if_unchanged(self, user_id: str, aggregate: UserAggregate, seq: int, rebuilt: bool = False) -> bool:
+        """Store the aggregate unless a write (or drop) changed the row since ``seq`` was read"""
+        now = time.time()
+        with connect(self.path, immediate=True) as conn:
+            row = conn.execute("SELECT seq FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+            if row is None or row["seq"] != seq:
+                return False
+            conn.execute(
+                "UPDATE user_stats SET state = ?, updated_at = ?, seq = seq + 1"
+                + (", rebuilt_at = ?" if rebuilt else "") + " WHERE user_id = ?",
+                (json.dumps(aggregate.to_state()), now) + ((now,) if rebuilt else ()) + (user_id,)
+            )
+        return True
+
+    def drop(self, user_id: str):
+        with connect(self.path) as conn:
+            conn.execute("DELETE FROM user_stats WHERE user_id = ?", (user_id,))
+
+    def users(self) -> List[str]:
+        with connect(self.path) as conn:
+            return [row["user_id"] for row in conn.execute("SELECT user_id FROM user_stats")]
+
+    def _apply(self, user_id: str, change: Callable[[UserAggregate], None]):
+        """Read-modify-write one aggregate under the SQLite write lock"""
+        try:
+            with connect(self.path, immediate=True) as conn:
+                row = conn.execute("SELECT state FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+                if row is None:
+                    return
+                state = json.loads(row["state"])
+                if state is None:
+                    # Being built: the build sees the bump and scans again
+                    conn.execute("UPDATE user_stats SET seq = seq + 1 WHERE user_id = ?", (user_id,))
+                    return
+                aggregate = UserAggregate.from_state(state)
+                change(aggregate)
+                conn.execute(
+                    "UPDATE user_stats SET state = ?, updated_at = ?, seq = seq + 1 WHERE user_id = ?",
+                    (json.dumps(aggregate.to_state()), time.time(), user_id)
+                )
+        except Exception as e:
+            # A missed update would leave the aggregate wrong; rebuild it on next read instead
+            logger.error(f"Error updating stats for {user_id}, dropping aggregate: {str(e)}")
+            self.drop(user_id)
+
+    def record_create(self, user_id: str, entry: Dict):
+        self._apply(user_id, lambda aggregate: aggregate.add(entry))
+
+    def record_update(self, user_id: str, old: Dict, new: Dict):
+        self._apply(user_id, lambda aggregate: aggregate.replace(old, new))
+
+    def record_delete(self, user_id: str, entry: Dict):
+        self._apply(user_id, lambda aggregate: aggregate.remove(entry))
+
+
+async def _fetch_entries(db, user_id: str, limit: Optional[int] = None) -> List[Dict]:
+    """Fetch the user's entries newest first, in keyset pages, without their content"""
+    entries: List[Dict] = []
+    cursor = None
+    while limit is None or len(entries) < limit:
+        size = FETCH_CHUNK_SIZE if limit is None else min(FETCH_CHUNK_SIZE, limit - len(entries))
+        rows, cursor = await fetch_page(db, user_id, STATS_COLUMNS, size, cursor=cursor)
+        entries.extend(rows)
+        if cursor is None:
+            break
+    return entries
+
+
+async def _fetch_summary(db, user_id: str) -> Optional[Dict]:
+    """Aggregate the user's entries in SQL. Returns None if the function is not installed."""
+    try:
+        result = await db.rpc(AGGREGATE_RPC, {
+            "user_uuid": user_id,
+            "recent_limit": stats_store.recent_capacity
+        }).execute()
+    except APIError as e:
+        if e.code not in ("PGRST202", "42883"):
+            raise
+        # Schema predates the function; a full scan gives the same answer
+        logger.warning(f"{AGGREGATE_RPC} is not installed, aggregating client-side: {str(e)}")
+        return None
+    return result.data
+
+
+async def compute_user_stats(user_id: str, db) -> UserAggregate:
+    """Compute a user's aggregate from the database, in SQL where possible"""
+    if config.STATS_SQL_AGGREGATES:
+        summary = await _fetch_summary(db, user_id)
+        if summary is not None:
+            return UserAggregate.from_summary(summary, stats_store.recent_capacity)
+    entries = await _fetch_entries(db, user_id)
+    return UserAggregate.from_entries(entries, stats_store.recent_capacity)
+
+
+async def rebuild_user_stats(user_id: str, db) -> UserAggregate:
+    """Recompute a user's aggregate from the database and store it"""
+    for _ in range(BUILD_ATTEMPTS):
+        seq = await asyncio.to_thread(stats_store.begin_build, user_id)
+        aggregate = await compute_user_stats(user_id, db)
+        if await asyncio.to_thread(stats_store.save_if_unchanged, user_id, aggregate, seq, True):
+            return aggregate
+    # Writes kept landing during the scan; serve this result and leave the
+    # placeholder for the next read to build
+    logger.warning(f"Stats for {user_id} changed during every rebuild, not storing")
+    return aggregate
+
+
+async def load_user_stats(user_id: str, db) -> UserAggregate:
+    """Return the user's aggregate, building or refilling it from the database if needed"""
+    if config.STATS_SOURCE == "database":
+        # No local state: every read is one aggregate query
+        return await compute_user_stats(user_id, db)
+    for _ in range(BUILD_ATTEMPTS):
+        aggregate, seq = await asyncio.to_thread(stats_store.snapshot, user_id)
+        if aggregate is None:
+            return await rebuild_user_stats(user_id, db)
+        if not aggregate.needs_refill:
+            return aggregate
+        aggregate.refill(await _fetch_entries(db, user_id, limit=aggregate.capacity))
+        if await asyncio.to_thread(stats_store.save_if_unchanged, user_id, aggregate, seq):
+            return aggregate
+    return aggregate
+
+
+async def reconcile(user_ids: List[str], db) -> Dict[str, Dict]:
+    """Rebuild each user's aggregate and report any drift from the stored one"""
+    report = {}
+    for user_id in user_ids:
+        stored = await asyncio.to_thread(stats_store.get, user_id)
+        rebuilt = await rebuild_user_stats(user_id, db)
+        drift = {}
+        if stored is not None:
+            before, after = stored.to_stats(), rebuilt.to_stats()
+            drift = {
+                key: {"stored": before.get(key), "actual": after.get(key)}
+                for key in after
+                if not (before.get(key) == after.get(key) or (
+                    isinstance(after.get(key), float) and math.isclose(before.get(key), after.get(key), abs_tol=1e-9)
+                ))
+            }
+        report[user_id] = {"drift": drift, "entries": rebuilt.count}
+    return report
+
+
+# Global instance
+stats_store = StatsStore(config.STATS_DB, config.STATS_RECENT_CAPACITY)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-user journal statistics from the database")
+    parser.add_argument("command", choices=["rebuild", "reconcile"])
+    parser.add_argument("user_ids", nargs="*", help="Users to process (default: every user in the store)")
+    args = parser.parse_args()
+
+    async def main():
+        from core.database import db
+        user_ids = args.user_ids or stats_store.users()
+        try:
+            if args.command == "rebuild":
+                for user_id in user_ids:
+                    aggregate = await rebuild_user_stats(user_id, db)
+                    print(f"{user_id}: {aggregate.count} entries")
+            else:
+                for user_id, result in (await reconcile(user_ids, db)).items():
+                    print(f"{user_id}: {result['entries']} entries, drift={json.dumps(result['drift'], default=str)}")
+        finally:
+            await db.close()
+
+    asyncio.run(main())
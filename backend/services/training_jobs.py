@@ -0,0 +1,283 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional
+import logging
+
+from core import config
+from core.sqlite import connect
+from services.online_training import online_trainer
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS training_jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0.0,
+    stage TEXT,
+    message TEXT,
+    accuracy REAL,
+    training_samples INTEGER,
+    test_samples INTEGER,
+    classification_report TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    fetch_seconds REAL,
+    train_seconds REAL
+);
+-- At most one queued/running job per user, across every worker process
+CREATE UNIQUE INDEX IF NOT EXISTS idx_training_jobs_active_user
+    ON training_jobs(user_id) WHERE status IN ('queued', 'running');
+CREATE INDEX IF NOT EXISTS idx_training_jobs_user_created
+    ON training_jobs(user_id, created_at DESC);
+"""
+
+
+class TrainingQueueFull(Exception):
+    """Raised when too many training jobs are already pending"""
+
+
+class JobStore:
+    """SQLite-backed training job records, shared by every worker on the box"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return connect(self.path)
+
+    @staticmethod
+    def _to_dict(row: Optional[sqlite3.Row]) -> Optional[Dict]:
+        if row is None:
+            return None
+        job = dict(row)
+        if job["classification_report"]:
+            job["classification_report"] = json.loads(job["classification_report"])
+        return job
+
+    def create(self, user_id: str) -> Dict:
+        """Create a queued job, or return the user's active job if there is one"""
+        job_id = uuid.uuid4().hex
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT INTO training_jobs (id, user_id, status, stage, owner_pid, created_at) "
+                    "VALUES (?, ?, 'queued', 'queued', ?, ?)",
+                    (job_id, user_id, os.getpid(), time.time())
+                )
+        except sqlite3.IntegrityError:
+            active = self.active_job(user_id)
+            if active is not None:
+                active["joined"] = True
+                return active
+            return self.create(user_id)
+        job = self.get(job_id)
+        job["joined"] = False
+        return job
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM training_jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def active_job(self, user_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM training_jobs WHERE user_id = ? AND status IN ('queued', 'running')",
+                (user_id,)
+            ).fetchone()
+        return self._to_dict(row)
+
+    def count_active(self) -> int:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT COUNT(*) FROM training_jobs WHERE status IN ('queued', 'running')"
+            ).fetchone()[0]
+
+    def update(self, job_id: str, **fields):
+        if "classification_report" in fields and fields["classification_report"] is not None:
+            fields["classification_report"] = json.dumps(fields["classification_report"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE training_jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def recover_stale(self):
+        """Fail active jobs whose owning process is gone (e.g. after a crash)"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, owner_pid FROM training_jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+        for row in rows:
+            if not _pid_alive(row["owner_pid"]):
+                self.update(
+                    row["id"], status="error", stage="failed", finished_at=time.time(),
+                    message="Training was interrupted by a server restart"
+                )
+
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_training_job(db_path: str, job_id: str, user_id: str, journal_entries: List[Dict]) -> Dict:
+    """Train one user's model (runs in a pool worker) and record progress in the job store"""
+    from services.model_registry import model_registry
+
+    store = JobStore(db_path)
+    store.update(job_id, stage="training", progress=0.3)
+    started = time.perf_counter()
+    result = model_registry.train(user_id, journal_entries)
+    store.update(job_id, stage="saved", progress=0.95)
+    result["train_seconds"] = time.perf_counter() - started
+    return result
+
+
+class TrainingQueue:
+    """In-process training job queue with a bounded worker pool.
+
+    Submitting returns immediately with a job id; a user who already has a
+    queued or running job joins it instead of starting another one.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 1, max_pending: int = 100):
+        self.store = store
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: Optional[Executor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks = set()
+
+    def _create_executor(self) -> Executor:
+        if self.workers <= 0:
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="training")
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    async def start(self):
+        if self._executor is not None:
+            return
+        self.store.recover_stale()
+        self._executor = self._create_executor()
+        self._slots = asyncio.Semaphore(max(1, self.workers))
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor = None
+
+    async def submit(self, user_id: str, db) -> Dict:
+        """Queue a training job for the user, or join the one already in progress"""
+        if self._executor is None:
+            await self.start()
+
+        active = self.store.active_job(user_id)
+        if active is not None:
+            active["joined"] = True
+            return active
+        if self.store.count_active() >= self.max_pending:
+            raise TrainingQueueFull("Too many training jobs pending")
+
+        job = self.store.create(user_id)
+        if not job["joined"]:
+            task = asyncio.create_task(self._run(job["id"], user_id, db))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(self, job_id: str, user_id: str, db):
+        try:
+            async with self._slots:
+                self.store.update(job_id, status="running", stage="fetching", progress=0.1, started_at=time.time())
+
+                fetch_started = time.perf_counter()
+                result = await db.table("journals")\
+                    .select("content, sentiment")\
+                    .eq("user_id", user_id)\
+                    .execute()
+                fetch_seconds = time.perf_counter() - fetch_started
+
+                if not result.data:
+                    self.store.update(
+                        job_id, status="no_data", stage="done", progress=1.0, finished_at=time.time(),
+                        fetch_seconds=fetch_seconds,
+                        message="No journal entries found. Create some entries first."
+                    )
+                    return
+
+                loop = asyncio.get_running_loop()
+                training_result = await loop.run_in_executor(
+                    self._executor, run_training_job, self.store.path, job_id, user_id, result.data
+                )
+                if training_result["status"] == "success":
+                    # The online learner continues from the new model, not its old state
+                    online_trainer.forget(user_id)
+
+            self.store.update(
+                job_id,
+                status=training_result["status"],
+                stage="done",
+                progress=1.0,
+                finished_at=time.time(),
+                fetch_seconds=fetch_seconds,
+                train_seconds=training_result.get("train_seconds"),
+                accuracy=training_result.get("accuracy"),
+                training_samples=training_result.get("training_samples"),
+                test_samples=training_result.get("test_samples"),
+                classification_report=training_result.get("classification_report"),
+                message=training_result.get("message")
+            )
+        except asyncio.CancelledError:
+            self.store.update(job_id, status="error", stage="failed", finished_at=time.time(),
+                              message="Training was cancelled by a server shutdown")
+            raise
+        except Exception as e:
+            logger.error(f"Training job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status="error", stage="failed", finished_at=time.time(), message=str(e))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        return self.store.get(job_id)
+
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "running_tasks": len(self._tasks),
+            "active_jobs": self.store.count_active(),
+        }
+
+
+# Global instance
+training_queue = TrainingQueue(
+    store=JobStore(config.TRAINING_JOB_DB),
+    workers=config.TRAINING_WORKERS,
+    max_pending=config.TRAINING_MAX_PENDING
+)
@@ -0,0 +1,69 @@
+"""Shared fixtures. The app reads its configuration on import, so the
+environment is set here, before any test imports an app module: a scratch
+working directory, in-process inference and training, caches off."""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict
+
+import jwt
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks.run import configure_environment
+
+WORKDIR = tempfile.mkdtemp(prefix="sentiment-journal-tests-")
+configure_environment(WORKDIR)
+# Model bundles live in the working directory
+os.chdir(WORKDIR)
+
+
+def make_token(user_id: str, secret: str = None, **claims) -> str:
+    """HS256 access token shaped like Supabase's, valid for an hour unless overridden"""
+    from core import config
+    payload = {"sub": user_id, "aud": config.SUPABASE_JWT_AUDIENCE, "exp": int(time.time()) + 3600,
+               "role": "authenticated", **claims}
+    return jwt.encode(payload, secret or config.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+def auth_headers(user_id: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {make_token(user_id)}"}
+
+
+def nltk_installed() -> bool:
+    from services import nlp_resources
+    return not nlp_resources.missing_resources()
+
+
+requires_nltk = pytest.mark.skipif(
+    not nltk_installed(), reason="NLTK data not installed (python -m services.nlp_resources --download)"
+)
+
+
+@pytest.fixture
+def fake_db():
+    """A fresh in-memory Supabase behind the app's database client"""
+    from benchmarks.fake_db import FakeSupabase
+    from core.database import db
+    fake = FakeSupabase()
+    fake.install(db)
+    return fake
+
+
+@pytest.fixture(scope="session")
+def client():
+    """TestClient over the real app, with its lifespan running"""
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def user_id() -> str:
+    """A new user per test, so the app's per-user stores never leak between tests"""
+    return str(uuid.uuid4())
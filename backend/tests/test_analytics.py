@@ -0,0 +1,126 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from services.analytics import Series, bucket_starts, lttb, timeseries
+
+
+def series(rows):
+    return Series.from_rows([
+        {"created_at": created_at, "sentiment": sentiment, "mood_category": "neutral"}
+        for created_at, sentiment in rows
+    ])
+
+
+def starts(bucket, *values):
+    return [str(start) for start in bucket_starts(series((value, 0.0) for value in values).times, bucket)]
+
+
+def utc(year, month, day):
+    return datetime(year, month, day, tzinfo=timezone.utc)
+
+
+def test_day_buckets_cross_years_and_leap_days():
+    assert starts("day", "2023-12-31T23:59:59.999999Z", "2024-01-01T00:00:00Z", "2024-02-29T12:00:00Z") == [
+        "2023-12-31", "2024-01-01", "2024-02-29"
+    ]
+
+
+def test_week_buckets_start_on_monday_across_years():
+    # 2020-12-28 is a Monday, and ISO week 53 of 2020 runs into 2021
+    assert starts("week", "2020-12-27T23:00:00Z", "2020-12-28T00:00:00Z", "2020-12-31T12:00:00Z",
+                  "2021-01-03T23:59:59Z", "2021-01-04T00:00:00Z") == [
+        "2020-12-21", "2020-12-28", "2020-12-28", "2020-12-28", "2021-01-04"
+    ]
+    # Before the epoch too
+    assert starts("week", "1969-12-31T00:00:00Z") == ["1969-12-29"]
+
+
+def test_month_buckets_cross_years():
+    assert starts("month", "2023-12-31T23:59:59Z", "2024-01-01T00:00:00Z", "2024-12-31T00:00:00Z") == [
+        "2023-12", "2024-01", "2024-12"
+    ]
+
+
+def test_offsets_are_bucketed_in_utc():
+    # 23:30 on New Year's Eve in New York is already January in UTC
+    assert starts("month", "2023-12-31T23:30:00-05:00") == ["2024-01"]
+    assert starts("day", "2024-01-01T00:30:00+01:00") == ["2023-12-31"]
+
+
+def test_unknown_bucket():
+    with pytest.raises(ValueError):
+        bucket_starts(np.array([], dtype="datetime64[us]"), "year")
+
+
+def test_week_spanning_new_year_is_one_bucket():
+    buckets, downsampled = timeseries(series([
+        ("2024-01-02T08:00:00Z", 0.4),
+        ("2023-12-30T08:00:00Z", -0.5),
+        ("2024-01-01T08:00:00Z", 0.2),
+        ("2023-12-25T08:00:00Z", -0.2),
+    ]), bucket="week", window=2)
+    assert not downsampled
+    assert [(bucket["start"], bucket["count"]) for bucket in buckets] == [
+        (utc(2023, 12, 25), 2), (utc(2024, 1, 1), 2)
+    ]
+    assert buckets[0]["mean"] == pytest.approx(-0.35)
+    assert buckets[1]["mean"] == pytest.approx(0.3)
+    assert (buckets[1]["min"], buckets[1]["max"]) == (0.2, 0.4)
+    assert buckets[1]["rolling_mean"] == pytest.approx(-0.025)
+
+
+def test_rolling_mean_counts_empty_months_across_years():
+    buckets, _ = timeseries(series([
+        ("2023-11-15T00:00:00Z", -0.6),
+        ("2024-01-15T00:00:00Z", 0.3),
+        ("2024-01-20T00:00:00Z", 0.5),
+    ]), bucket="month", window=2)
+    assert [bucket["start"] for bucket in buckets] == [utc(2023, 11, 1), utc(2024, 1, 1)]
+    # December 2023 is empty, so a two-month window at January reaches back to December only
+    assert buckets[1]["rolling_mean"] == pytest.approx(0.4)
+
+    buckets, _ = timeseries(series([
+        ("2023-11-15T00:00:00Z", -0.6),
+        ("2024-01-15T00:00:00Z", 0.3),
+        ("2024-01-20T00:00:00Z", 0.5),
+    ]), bucket="month", window=3)
+    assert buckets[1]["rolling_mean"] == pytest.approx(0.2 / 3)
+
+
+@pytest.mark.parametrize("count, threshold", [(10, 3), (100, 7), (1000, 50), (1001, 999), (5000, 333)])
+def test_lttb_keeps_endpoints(count, threshold):
+    rng = random.Random(count)
+    x = np.arange(count, dtype=np.float64)
+    y = np.array([rng.uniform(-1, 1) for _ in range(count)])
+    kept = lttb(x, y, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == count - 1
+    assert (np.diff(kept) > 0).all()
+
+
+def test_lttb_keeps_spikes():
+    y = np.zeros(200)
+    y[57], y[140] = 1.0, -1.0
+    kept = lttb(np.arange(200), y, 10).tolist()
+    assert {0, 57, 140, 199} <= set(kept)
+
+
+def test_lttb_returns_everything_when_there_is_room():
+    assert lttb(np.arange(5), np.zeros(5), 5).tolist() == [0, 1, 2, 3, 4]
+    assert lttb(np.arange(5), np.zeros(5), 2).tolist() == [0, 1, 2, 3, 4]
+
+
+def test_downsampled_timeseries_keeps_first_and_last_buckets():
+    first = datetime(2022, 12, 20, 12, tzinfo=timezone.utc)
+    rng = random.Random(0)
+    rows = [((first + timedelta(days=day)).isoformat(), rng.uniform(-1, 1)) for day in range(400)]
+    full, _ = timeseries(series(rows), bucket="day")
+    buckets, downsampled = timeseries(series(rows), bucket="day", points=30)
+    assert downsampled
+    assert len(buckets) == 30
+    assert buckets[0] == full[0]
+    assert buckets[-1] == full[-1]
+    assert buckets[-1]["start"] == utc(2024, 1, 23)
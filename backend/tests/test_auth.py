@@ -0,0 +1,84 @@
+import asyncio
+import time
+
+import pytest
+
+from core import config
+from core.auth import AuthenticationError, TokenVerifier
+from tests.conftest import make_token
+
+
+@pytest.fixture
+def verifier():
+    # No auth server, so every token has to verify locally
+    return TokenVerifier(
+        supabase_url=None,
+        api_key=None,
+        jwt_secret=config.SUPABASE_JWT_SECRET,
+        audience=config.SUPABASE_JWT_AUDIENCE
+    )
+
+
+def verify(verifier, token):
+    return asyncio.run(verifier.verify(token))
+
+
+def test_valid_token_verifies_locally(verifier, user_id):
+    user = verify(verifier, make_token(user_id, email="me@example.com"))
+    assert user["id"] == user_id
+    assert user["email"] == "me@example.com"
+    assert verifier.local_verifications == 1
+    assert verifier.remote_verifications == 0
+
+
+def test_expired_token_is_rejected(verifier, user_id):
+    with pytest.raises(AuthenticationError):
+        verify(verifier, make_token(user_id, exp=int(time.time()) - 60))
+    assert verifier.rejections == 1
+
+
+def test_bad_signature_is_rejected(verifier, user_id):
+    with pytest.raises(AuthenticationError):
+        verify(verifier, make_token(user_id, secret="not-the-project-secret-" + "x" * 16))
+
+
+def test_wrong_audience_is_rejected(verifier, user_id):
+    with pytest.raises(AuthenticationError):
+        verify(verifier, make_token(user_id, aud="anon"))
+
+
+def test_malformed_token_is_rejected(verifier):
+    with pytest.raises(AuthenticationError):
+        verify(verifier, "not-a-jwt")
+
+
+def test_verified_token_is_served_from_cache(verifier, user_id):
+    token = make_token(user_id)
+    first = verify(verifier, token)
+    second = verify(verifier, token)
+    assert second == first
+    assert verifier.cache.hits == 1
+    assert verifier.local_verifications == 1
+
+
+def test_cache_never_outlives_the_token(verifier, user_id):
+    token = make_token(user_id, exp=int(time.time()) + 2)
+    verify(verifier, token)
+    entry = verifier.cache._entries[token]
+    assert entry[1] <= time.time() + 2
+
+
+def test_rejected_token_is_not_cached(verifier, user_id):
+    token = make_token(user_id, aud="anon")
+    for _ in range(2):
+        with pytest.raises(AuthenticationError):
+            verify(verifier, token)
+    assert verifier.cache.stats()["size"] == 0
+    assert verifier.rejections == 2
+
+
+def test_api_rejects_invalid_tokens(client, fake_db, user_id):
+    assert client.get("/journals", headers={"Authorization": f"Bearer {make_token(user_id)}"}).status_code == 200
+    expired = make_token(user_id, exp=int(time.time()) - 60)
+    assert client.get("/journals", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+    assert client.get("/journals", headers={"Authorization": "Basic abc"}).status_code == 401
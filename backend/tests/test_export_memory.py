@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import BACKEND_DIR
+
+# ~4 KB entries: 3,000 of them export as ~12 MB, 12,000 as ~49 MB
+CONTENT = "Dear diary, today was long and I have a lot to say about it. " * 65
+SMALL, LARGE = 3000, 12000
+
+# Runs in a fresh interpreter, so its peak RSS is its own. The fake shares
+# one content string across rows, so the journal itself costs little
+# memory. The ASGI app is driven directly because TestClient buffers whole
+# response bodies.
+CHILD = """
+import asyncio, gc, json, sys, time
+import jwt
+from benchmarks.fake_db import FakeSupabase
+from core import config
+from core.database import db
+import main
+
+def memory_kb(field):
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith(field + ":"))
+
+
+entries, content = int(sys.argv[1]), sys.argv[2]
+fake = FakeSupabase()
+fake.install(db)
+fake.add_entries("export-user", [
+    {"content": content, "sentiment": 0.5, "mood_category": "positive",
+     "created_at": f"2024-01-01T00:00:{i % 60:02d}.{i:06d}+00:00"}
+    for i in range(entries)
+])
+
+
+async def export(path, user_id):
+    token = jwt.encode({"sub": user_id, "aud": config.SUPABASE_JWT_AUDIENCE, "exp": int(time.time()) + 600},
+                       config.SUPABASE_JWT_SECRET, algorithm="HS256")
+    received = {"bytes": 0, "status": None}
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"format=ndjson",
+             "root_path": "", "headers": [(b"authorization", f"Bearer {token}".encode())],
+             "client": ("127.0.0.1", 1), "server": ("testserver", 80)}
+    requested = False
+    async def receive():
+        nonlocal requested
+        if requested:
+            # The client stays connected until the response is complete
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+    async def send(message):
+        if message["type"] == "http.response.start":
+            received["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            # Count and drop each chunk, as a client saving to disk would
+            received["bytes"] += len(message.get("body", b""))
+    await main.app(scope, receive, send)
+    return received
+
+
+async def measure():
+    # A first small export loads everything a request touches lazily
+    fake.add_entries("warm-up-user", [{"content": content, "sentiment": 0.5, "mood_category": "positive"}] * 10)
+    await export("/journals/export", "warm-up-user")
+    gc.collect()
+    # Reset the peak to the current RSS, so setup does not mask the export
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = memory_kb("VmRSS")
+    received = await export("/journals/export", "export-user")
+    return {**received, "rss_before_kb": before, "rss_peak_kb": memory_kb("VmHWM")}
+
+print(json.dumps(asyncio.run(measure())))
+"""
+
+
+def export_peak_rss(entries: int) -> dict:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [BACKEND_DIR, os.environ.get("PYTHONPATH")]))}
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, str(entries), CONTENT],
+        env=env, capture_output=True, text=True, timeout=300, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    assert result["status"] == 200
+    assert result["bytes"] > entries * len(CONTENT)
+    result["growth"] = (result["rss_peak_kb"] - result["rss_before_kb"]) * 1024
+    return result
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/clear_refs"), reason="needs Linux /proc to reset peak RSS")
+def test_export_peak_rss_does_not_grow_with_journal_size():
+    small, large = export_peak_rss(SMALL), export_peak_rss(LARGE)
+    # Holding even a quarter of the extra rows at once would blow this budget
+    extra = large["bytes"] - small["bytes"]
+    assert large["growth"] < small["growth"] + extra / 4, (
+        f"peak RSS grew {small['growth'] / 1e6:.1f} MB exporting {small['bytes'] / 1e6:.1f} MB "
+        f"and {large['growth'] / 1e6:.1f} MB exporting {large['bytes'] / 1e6:.1f} MB"
+    )
@@ -0,0 +1,119 @@
+import pytest
+
+from tests.conftest import auth_headers
+
+TEXTS = ["a wonderful happy day", "terrible awful morning", "an ordinary day", "great lunch with friends"]
+
+
+def read_paths(entry_id: int):
+    return ["/journals", "/journals?limit=2", "/stats", "/insights", "/analytics/timeseries", f"/journal/{entry_id}"]
+
+
+def current_etags(client, headers, paths):
+    etags = {}
+    for path in paths:
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, path
+        etags[path] = response.headers["ETag"]
+        assert client.get(path, headers={**headers, "If-None-Match": etags[path]}).status_code == 304, path
+    return etags
+
+
+def assert_invalidated(client, headers, etags):
+    for path, etag in etags.items():
+        response = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200, path
+        assert response.headers["ETag"] != etag, path
+
+
+def assert_still_current(client, headers, etags):
+    for path, etag in etags.items():
+        assert client.get(path, headers={**headers, "If-None-Match": etag}).status_code == 304, path
+
+
+@pytest.fixture
+def journal(client, fake_db, user_id):
+    headers = auth_headers(user_id)
+    ids = [client.post("/journal", json={"content": text}, headers=headers).json()["id"] for text in TEXTS]
+    return headers, ids
+
+
+def create(client, headers, ids):
+    assert client.post("/journal", json={"content": "a calm evening"}, headers=headers).status_code == 200
+
+
+def update(client, headers, ids):
+    assert client.put(f"/journal/{ids[0]}", json={"content": "a miserable day"}, headers=headers).status_code == 200
+
+
+def delete(client, headers, ids):
+    assert client.delete(f"/journal/{ids[0]}", headers=headers).status_code == 200
+
+
+def import_entries(client, headers, ids):
+    upload = b'{"content": "imported and happy"}\n{"content": "imported and sad"}\n'
+    response = client.post(
+        "/journals/import?format=ndjson", files={"file": ("entries.ndjson", upload)}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["imported"] == 2
+
+
+@pytest.mark.parametrize("mutate", [create, update, delete, import_entries])
+def test_mutations_change_etags(client, journal, mutate):
+    headers, ids = journal
+    etags = current_etags(client, headers, read_paths(ids[-1]))
+    mutate(client, headers, ids)
+    assert_invalidated(client, headers, etags)
+
+
+def test_unchanged_update_keeps_etags(client, journal):
+    headers, ids = journal
+    etags = current_etags(client, headers, read_paths(ids[-1]))
+    assert client.put(f"/journal/{ids[0]}", json={}, headers=headers).status_code == 200
+    assert_still_current(client, headers, etags)
+
+
+def test_failed_delete_keeps_etags(client, journal):
+    headers, ids = journal
+    etags = current_etags(client, headers, read_paths(ids[-1]))
+    assert client.delete(f"/journal/{max(ids) + 1000}", headers=headers).status_code == 404
+    assert_still_current(client, headers, etags)
+
+
+def test_etags_are_per_user(client, journal, user_id):
+    headers, ids = journal
+    etags = current_etags(client, headers, ["/journals", "/stats"])
+    other = auth_headers(f"{user_id}-other")
+    client.post("/journal", json={"content": "another user's day"}, headers=other)
+    assert_still_current(client, headers, etags)
+
+
+def test_cached_reads_skip_the_database(client, journal, fake_db, monkeypatch):
+    from core.http_cache import response_cache
+    monkeypatch.setattr(response_cache, "ttl", 60.0)
+    headers, ids = journal
+    paths = read_paths(ids[-1])
+    bodies = {}
+    etags = {}
+    for path in paths:
+        response = client.get(path, headers=headers)
+        bodies[path], etags[path] = response.content, response.headers["ETag"]
+
+    fake_db.reset_counters()
+    for path in paths:
+        assert client.get(path, headers={**headers, "If-None-Match": etags[path]}).status_code == 304, path
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, path
+        assert response.content == bodies[path], path
+        assert response.headers["ETag"] == etags[path], path
+    assert fake_db.requests == 0
+
+    # A write moves every read to a new version, which has to query again
+    update(client, headers, ids)
+    fake_db.reset_counters()
+    for path in paths:
+        response = client.get(path, headers=headers)
+        assert response.headers["ETag"] != etags[path], path
+    assert fake_db.requests > 0
+    assert client.get(f"/journal/{ids[0]}", headers=headers).json()["content"] == "a miserable day"
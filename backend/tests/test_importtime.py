@@ -0,0 +1,13 @@
+"""Importing the API must not load the numeric and NLP stacks"""
+from benchmarks.importtime import LAZY_MODULES, measure, problems
+
+
+def test_import_main_loads_no_heavy_modules():
+    timings = measure("main")
+    assert "main" in timings
+    assert problems(timings, "main") == []
+
+
+def test_heavy_modules_are_checked():
+    assert {"numpy", "sklearn", "nltk", "textblob"} <= set(LAZY_MODULES)
+    assert problems({"main": (0, 1), "numpy": (0, 1)}, "main") == ["numpy is imported eagerly"]
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from services.inference import InferenceEngine
+from services.sentiment_cache import SentimentCache
+
+
+class DyingExecutor:
+    """A process pool whose workers die once ``die`` is called"""
+
+    def __init__(self):
+        self.submitted = []
+        self.shutdowns = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(Future())
+        return self.submitted[-1]
+
+    def die(self):
+        for future in self.submitted:
+            future.set_exception(BrokenProcessPool("A child process terminated abruptly"))
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shutdowns.append((wait, cancel_futures))
+
+
+def test_stop_fails_queued_requests():
+    async def scenario():
+        engine = InferenceEngine(workers=0, max_batch_size=1, batch_window_ms=0)
+        await engine.start()
+        # Hold the only slot: the batcher keeps one request, the other stays queued
+        await engine._slots.acquire()
+        requests = [asyncio.create_task(engine.predict_prepared("calm day", 0.0)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        await engine.stop()
+        return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert len(results) == 2
+    for result in results:
+        assert isinstance(result, RuntimeError)
+        assert str(result) == "Inference engine stopped"
+
+
+def test_broken_pool_is_shut_down_and_replaced_once():
+    async def scenario():
+        engine = InferenceEngine(workers=2)
+        broken = DyingExecutor()
+        replacements = []
+
+        def create_executor():
+            replacements.append(DyingExecutor())
+            return replacements[-1]
+
+        engine._executor = broken
+        engine._create_executor = create_executor
+        engine._slots = asyncio.Semaphore(2)
+        loop = asyncio.get_running_loop()
+        batches = [[(("user", "text"), False, loop.create_future())] for _ in range(2)]
+        for _ in batches:
+            await engine._slots.acquire()
+        # Both batches are running on the pool when it breaks
+        dispatches = asyncio.gather(*(engine._dispatch(batch) for batch in batches))
+        await asyncio.sleep(0.01)
+        broken.die()
+        await dispatches
+        return engine, broken, replacements, batches
+
+    engine, broken, replacements, batches = asyncio.run(scenario())
+    assert broken.shutdowns == [(False, True)]
+    assert len(replacements) == 1
+    assert engine._executor is replacements[0]
+    assert engine.failed_batches == 2
+    for batch in batches:
+        with pytest.raises(BrokenProcessPool):
+            batch[0][2].result()
+
+
+def test_model_stats_come_from_the_workers():
+    from services.model_registry import model_registry
+
+    async def scenario():
+        engine = InferenceEngine(workers=0)
+        await engine.predict_prepared("calm day", 0.2)
+        stats = engine.model_stats()
+        await engine.stop()
+        return stats, engine.model_stats()
+
+    stats, stopped = asyncio.run(scenario())
+    # The thread worker shares this process's registry
+    expected = model_registry.stats()
+    assert stats["workers"] == 1
+    for name in ("resident_models", "hits", "misses", "baseline_fallbacks", "loads", "evictions"):
+        assert stats[name] == expected[name], name
+    assert stopped["workers"] == 0
+
+
+def test_combine_stats_sums_workers():
+    from services.model_registry import combine_stats
+    worker = {
+        "resident_models": 2, "resident_bytes": 100, "max_models": 50, "max_bytes": 1000, "hits": 5,
+        "misses": 2, "baseline_fallbacks": 1, "loads": 2, "reloads": 0, "evictions": 1,
+        "total_load_seconds": 0.5, "average_load_seconds": 0.25, "max_load_seconds": 0.3,
+        "baseline_trained": True, "engine": "forest",
+    }
+    combined = combine_stats([worker, {**worker, "loads": 3, "total_load_seconds": 1.5, "max_load_seconds": 0.9}])
+    assert combined["workers"] == 2
+    assert combined["resident_models"] == 4 and combined["evictions"] == 2
+    assert combined["average_load_seconds"] == pytest.approx(2.0 / 5)
+    assert combined["max_load_seconds"] == 0.9
+    assert combined["max_models"] == 50
+    assert combine_stats([])["workers"] == 0
+
+
+class RecordingCache(SentimentCache):
+    """A disk-backed result cache recording which threads touch SQLite"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = set()
+
+    def _disk_get(self, keys):
+        self.threads.add(threading.get_ident())
+        return super()._disk_get(keys)
+
+    def _disk_put(self, items):
+        self.threads.add(threading.get_ident())
+        super()._disk_put(items)
+
+
+def test_cache_disk_tier_stays_off_the_loop(tmp_path, monkeypatch):
+    from services.model_registry import model_registry
+    version_threads = set()
+    version_token = model_registry.version_token
+
+    def recording_version_token(user_id):
+        version_threads.add(threading.get_ident())
+        return version_token(user_id)
+
+    monkeypatch.setattr(model_registry, "version_token", recording_version_token)
+    cache = RecordingCache(max_bytes=0, disk_path=str(tmp_path / "cache.db"))
+
+    async def scenario():
+        engine = InferenceEngine(workers=0, cache=cache)
+        first = await engine.predict_many(["calm day", "long day"])
+        second = await engine.predict_many(["calm day", "long day"])
+        await engine.stop()
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(scenario())
+    assert second == first
+    assert cache.disk_hits == 2
+    assert cache.threads and loop_thread not in cache.threads
+    assert version_threads and loop_thread not in version_threads
@@ -0,0 +1,68 @@
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.admission import Saturated
+from services import journal_import
+from services.journal_import import import_entries
+
+ROWS = 10
+
+
+class ChunkAdmission:
+    """Admits the first ``admitted`` chunks, then reports the server busy"""
+
+    def __init__(self, admitted: int):
+        self.admitted = admitted
+        self.costs = []
+
+    @asynccontextmanager
+    async def admit(self, user_id, cost=1.0):
+        self.costs.append(cost)
+        if len(self.costs) > self.admitted:
+            raise Saturated("Server busy (inference), try again later", 1)
+        yield
+
+
+def records(threads):
+    for row in range(1, ROWS + 1):
+        threads.add(threading.get_ident())
+        yield row, {"content": f"imported day {row}"}, None
+
+
+def run_import(admission, monkeypatch, user_id):
+    from core.database import db
+    monkeypatch.setattr(journal_import, "inference_admission", admission)
+    threads = set()
+
+    async def scenario():
+        report = await import_entries(db, user_id, records(threads), chunk_size=4)
+        return threading.get_ident(), report
+
+    loop_thread, report = asyncio.run(scenario())
+    assert threads and loop_thread not in threads
+    return report
+
+
+def test_each_chunk_is_admitted(fake_db, user_id, monkeypatch):
+    admission = ChunkAdmission(admitted=3)
+    report = run_import(admission, monkeypatch, user_id)
+    assert report["imported"] == ROWS and report["failed"] == 0
+    # Only the first chunk spends a rate-limit token
+    assert admission.costs == [1.0, 0.0, 0.0]
+    assert len(fake_db.rows_by_user[user_id]) == ROWS
+
+
+def test_rejected_chunk_stops_the_import(fake_db, user_id, monkeypatch):
+    report = run_import(ChunkAdmission(admitted=1), monkeypatch, user_id)
+    assert report["imported"] == 4
+    assert [result["row"] for result in report["results"] if result["status"] == "error"] == [5, 6, 7, 8]
+    assert len(fake_db.rows_by_user[user_id]) == 4
+
+
+def test_rejected_first_chunk_fails_the_import(fake_db, user_id, monkeypatch):
+    with pytest.raises(Saturated):
+        run_import(ChunkAdmission(admitted=0), monkeypatch, user_id)
+    assert not fake_db.rows_by_user.get(user_id)
@@ -0,0 +1,53 @@
+import threading
+from contextlib import asynccontextmanager
+
+import pytest
+
+from core.admission import RateLimited, Saturated
+from tests.conftest import auth_headers
+
+
+class Rejecting:
+    """Turns every request away, recording the event loop's thread"""
+
+    def __init__(self, error):
+        self.error = error
+        self.degraded = 0
+        self.loop_threads = set()
+
+    @asynccontextmanager
+    async def admit(self, user_id, cost=1.0):
+        self.loop_threads.add(threading.get_ident())
+        raise self.error
+        yield
+
+
+@pytest.mark.parametrize("error", [
+    Saturated("Server busy (inference), try again later", 1),
+    RateLimited("Too many inference requests, slow down", 1),
+])
+def test_rejected_writes_degrade_to_the_lexicon(client, fake_db, user_id, monkeypatch, error):
+    from routers import journals
+    from services.sentiment import sentiment_analyzer
+    admission = Rejecting(error)
+    scored_on = set()
+    predict_polarity = sentiment_analyzer.predict_polarity
+
+    def recording_predict_polarity(texts, *args, **kwargs):
+        scored_on.add(threading.get_ident())
+        return predict_polarity(texts, *args, **kwargs)
+
+    monkeypatch.setattr(journals, "inference_admission", admission)
+    monkeypatch.setattr(sentiment_analyzer, "predict_polarity", recording_predict_polarity)
+    headers = auth_headers(user_id)
+
+    created = client.post("/journal", json={"content": "a wonderful happy day"}, headers=headers)
+    assert created.status_code == 200, created.text
+    assert created.json()["mood_category"] == "positive"
+    updated = client.put(f"/journal/{created.json()['id']}", json={"content": "a terrible awful day"},
+                         headers=headers)
+    assert updated.status_code == 200, updated.text
+    assert updated.json()["mood_category"] == "negative"
+
+    assert admission.degraded == 2
+    assert scored_on and not scored_on & admission.loop_threads
@@ -0,0 +1,67 @@
+import importlib.util
+import json
+import os
+
+import pytest
+
+from services.polarity import TOLERANCE, VECTORIZE_MIN_TEXTS, LexiconScorer, polarity_scorer
+from tests.conftest import BACKEND_DIR
+
+GOLDEN = os.path.join(BACKEND_DIR, "benchmarks", "golden_polarity.jsonl")
+
+with open(GOLDEN, encoding="utf-8") as f:
+    CASES = [json.loads(line) for line in f if line.strip()]
+
+# The lexicon ships with TextBlob
+pytestmark = pytest.mark.skipif(importlib.util.find_spec("textblob") is None, reason="TextBlob not installed")
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: repr(case["text"][:30]))
+def test_polarity_matches_golden(case):
+    assert abs(polarity_scorer.polarity(case["text"]) - case["polarity"]) <= TOLERANCE
+
+
+def test_batch_polarity_matches_golden():
+    # Large enough for the vectorized path, then small enough for the per-text one
+    for cases in (CASES, CASES[:VECTORIZE_MIN_TEXTS - 1]):
+        scores = polarity_scorer.polarity_many([case["text"] for case in cases])
+        assert len(scores) == len(cases)
+        for case, score in zip(cases, scores):
+            assert abs(score - case["polarity"]) <= TOLERANCE, case["text"]
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Negation
+    ("Today was a good day.", 0.7),
+    ("Today was not a good day.", -0.35),
+    ("never good", -0.35),
+    ("not very good", -0.26923076923076916),
+    ("really not good", -0.35),
+    # Intensifiers
+    ("really good", 0.7),
+    ("very bad", -0.9099999999999998),
+    ("very very good", 0.9099999999999999),
+    ("great!", 1.0),
+    # Emoticons and irony
+    ("I love it :)", 0.5),
+    ("awful :(", -0.875),
+    ("<3", 1.0),
+    ("good (!)", 0.35),
+])
+def test_assessment_rules(text, expected):
+    assert abs(polarity_scorer.polarity(text) - expected) <= TOLERANCE
+    # The same text among plain ones still takes the sequential rules
+    batch = [text] + ["a calm day"] * VECTORIZE_MIN_TEXTS
+    assert abs(polarity_scorer.polarity_many(batch)[0] - expected) <= TOLERANCE
+
+
+def test_features_concatenate_across_sentences():
+    scorer = LexiconScorer()
+    sentences = ["Not a good start.", "Then it got really better :)", "Great evening!"]
+    flags, polarity, intensity = [], [], []
+    for sentence in sentences:
+        features = scorer.features(sentence)
+        flags += features[0]
+        polarity += features[1]
+        intensity += features[2]
+    assert abs(scorer.assess(flags, polarity, intensity) - scorer.polarity(" ".join(sentences))) <= TOLERANCE
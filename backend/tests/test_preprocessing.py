@@ -0,0 +1,27 @@
+import json
+import os
+
+import pytest
+
+from services.sentiment import SentimentAnalyzer
+from tests.conftest import requires_nltk
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "preprocess_golden.jsonl")
+
+with open(GOLDEN, encoding="utf-8") as f:
+    CASES = [json.loads(line) for line in f if line.strip()]
+
+pytestmark = requires_nltk
+
+
+@pytest.mark.parametrize("case", CASES, ids=lambda case: repr(case["text"][:30]))
+def test_preprocess_text_matches_golden(case):
+    # Terms under NLTK 3.9.1's English stopwords and WordNet, as word_tokenize
+    # produced them; models trained before the fast path must keep seeing them
+    assert SentimentAnalyzer().preprocess_text(case["text"]) == case["expected"]
+
+
+def test_preprocess_many_matches_preprocess_text():
+    analyzer = SentimentAnalyzer()
+    texts = [case["text"] for case in CASES]
+    assert list(analyzer.preprocess_many(texts)) == [case["expected"] for case in CASES]
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from services.search_index import SearchIndex
+
+TEXTS = ["work meeting ran late", "walk in the park", "project meeting at work", "dinner with family"]
+
+
+class LowercaseAnalyzer:
+    """Whitespace preprocessing, recording which threads it runs on"""
+
+    def __init__(self):
+        self.threads = set()
+
+    def preprocess_text(self, text: str) -> str:
+        self.threads.add(threading.get_ident())
+        return text.lower()
+
+
+def test_index_work_stays_off_the_loop(tmp_path, fake_db, user_id):
+    from core.database import db
+    fake_db.add_entries(user_id, [{"content": text, "sentiment": 0.0, "mood_category": "neutral"} for text in TEXTS])
+    analyzer = LowercaseAnalyzer()
+    index = SearchIndex(str(tmp_path / "search.db"), analyzer)
+
+    async def scenario():
+        loop_thread = threading.get_ident()
+        first = await index.search(user_id, "meeting", 10, db)
+        # Writes and drops from threads while searches are in flight
+        searches = [index.search(user_id, "work meeting", 10, db) for _ in range(20)]
+        writes = [asyncio.to_thread(index.record_upsert, user_id, {"id": 100 + i, "content": "another work meeting"})
+                  for i in range(5)]
+        results = await asyncio.gather(*searches, *writes, asyncio.to_thread(index.invalidate, "someone-else"))
+        return loop_thread, first, results[:20]
+
+    loop_thread, first, results = asyncio.run(scenario())
+    assert sorted(entry_id for entry_id, _ in first) == [1, 3]
+    for hits in results:
+        assert {1, 3} <= {entry_id for entry_id, _ in hits}
+    assert loop_thread not in analyzer.threads
+    assert index.stats()["builds"] == 1
+
+    hits = asyncio.run(index.search(user_id, "work meeting", 10, db))
+    assert {entry_id for entry_id, _ in hits} == {1, 3, 100, 101, 102, 103, 104}
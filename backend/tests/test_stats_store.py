@@ -0,0 +1,180 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from models import SentimentInsightsResponse, UserStatsResponse
+from services.sentiment import sentiment_analyzer
+from services.stats_store import StatsStore, UserAggregate
+from tests.conftest import auth_headers
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def make_entry(entry_id: int, rng: random.Random) -> dict:
+    sentiment = round(rng.uniform(-1, 1), 3)
+    return {
+        "id": entry_id,
+        "sentiment": sentiment,
+        "mood_category": "positive" if sentiment > 0.1 else "negative" if sentiment < -0.1 else "neutral",
+        # Some entries share a timestamp, so ties are broken by id
+        "created_at": (START + timedelta(hours=rng.randrange(200))).isoformat(),
+    }
+
+
+def assert_same(incremental: dict, full: dict):
+    assert incremental.keys() == full.keys()
+    for key, value in full.items():
+        if isinstance(value, float):
+            assert incremental[key] == pytest.approx(value, abs=1e-9), key
+        else:
+            assert incremental[key] == value, key
+
+
+def newest_first(entries) -> list:
+    return sorted(entries.values(), key=lambda e: (e["created_at"], e["id"]), reverse=True)
+
+
+def baseline_stats(newest: list) -> dict:
+    """What /stats computed from the full newest-first list before aggregates were stored"""
+    if not newest:
+        return UserAggregate().to_stats()
+    sentiments = [entry["sentiment"] for entry in newest]
+    labels = [entry["mood_category"] for entry in newest]
+    recent = newest[:7] if len(newest) >= 7 else newest
+    older = newest[7:14] if len(newest) >= 14 else []
+    recent_avg = float(np.mean([entry["sentiment"] for entry in recent]))
+    older_avg = float(np.mean([entry["sentiment"] for entry in older])) if older else recent_avg
+    return {
+        "total_entries": len(newest),
+        "average_sentiment": float(np.mean(sentiments)),
+        "positive_entries": labels.count("positive"),
+        "negative_entries": labels.count("negative"),
+        "neutral_entries": labels.count("neutral"),
+        "recent_trend": "improving" if recent_avg > older_avg + 0.1
+        else "declining" if recent_avg < older_avg - 0.1 else "stable",
+        "mood_stability": "stable" if np.std(sentiments) < 0.3 else "variable",
+        "last_entry_date": datetime.fromisoformat(newest[0]["created_at"].replace("Z", "+00:00")),
+    }
+
+
+def assert_matches_full_scan(aggregate: UserAggregate, entries):
+    newest = newest_first(entries)
+    assert_same(aggregate.to_stats(), baseline_stats(newest))
+    assert_same(aggregate.to_insights(), sentiment_analyzer.get_sentiment_insights(newest))
+
+
+def served(store: StatsStore, user_id: str, entries) -> UserAggregate:
+    """The stored aggregate, refilled as load_user_stats would"""
+    aggregate = store.get(user_id)
+    if aggregate.needs_refill:
+        aggregate.refill(newest_first(entries)[:aggregate.capacity])
+    return aggregate
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_incremental_aggregate_matches_full_scan(tmp_path, seed):
+    rng = random.Random(seed)
+    store = StatsStore(str(tmp_path / "stats.db"))
+    entries = {i: make_entry(i, rng) for i in range(1, 41)}
+    seq = store.begin_build("u")
+    assert store.save_if_unchanged("u", UserAggregate.from_entries(list(entries.values())), seq, rebuilt=True)
+
+    next_id = len(entries) + 1
+    for _ in range(300):
+        operation = rng.choice(("create", "update", "delete")) if entries else "create"
+        if operation == "create":
+            entries[next_id] = make_entry(next_id, rng)
+            store.record_create("u", entries[next_id])
+            next_id += 1
+        elif operation == "update":
+            old = entries[rng.choice(list(entries))]
+            new = {**old, **{k: v for k, v in make_entry(old["id"], rng).items() if k != "created_at"}}
+            entries[old["id"]] = new
+            store.record_update("u", old, new)
+        else:
+            deleted = entries.pop(rng.choice(list(entries)))
+            store.record_delete("u", deleted)
+
+        assert_matches_full_scan(served(store, "u", entries), entries)
+
+
+def test_deleting_everything_leaves_an_empty_aggregate(tmp_path):
+    rng = random.Random(0)
+    store = StatsStore(str(tmp_path / "stats.db"))
+    entries = {i: make_entry(i, rng) for i in range(1, 6)}
+    seq = store.begin_build("u")
+    store.save_if_unchanged("u", UserAggregate.from_entries(list(entries.values())), seq, rebuilt=True)
+    for entry in list(entries.values()):
+        store.record_delete("u", entry)
+    assert store.get("u").to_stats() == UserAggregate().to_stats()
+
+
+def entry(entry_id: int, sentiment: float, hour: int) -> dict:
+    return {
+        "id": entry_id,
+        "sentiment": sentiment,
+        "mood_category": sentiment_analyzer.get_sentiment_label(sentiment),
+        "created_at": (START + timedelta(hours=hour)).isoformat(),
+    }
+
+
+@pytest.mark.parametrize("sentiments", [
+    # Sums of tenths that are not exact in binary
+    [0.1, 0.2, 0.3, 0.1, 0.2, 0.3, 0.1, 0.2, 0.3, 0.1, 0.2, 0.3, 0.1, 0.2, 0.3],
+    # Identical values, where removing one must leave a zero (not negative) variance
+    [0.7] * 15,
+    # Large and tiny magnitudes together
+    [1.0, -1.0, 1e-9, -1e-9, 0.999999, -0.999999, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5, 0.5],
+])
+def test_float_results_survive_updates_and_deletes(tmp_path, sentiments):
+    store = StatsStore(str(tmp_path / "stats.db"))
+    entries = {i: entry(i, sentiment, i) for i, sentiment in enumerate(sentiments, start=1)}
+    seq = store.begin_build("u")
+    store.save_if_unchanged("u", UserAggregate.from_entries(list(entries.values())), seq, rebuilt=True)
+
+    # Update an entry away and back again
+    for entry_id in (3, 8):
+        old = entries[entry_id]
+        moved = {**old, "sentiment": -old["sentiment"] + 0.3,
+                 "mood_category": sentiment_analyzer.get_sentiment_label(-old["sentiment"] + 0.3)}
+        store.record_update("u", old, moved)
+        entries[entry_id] = moved
+        assert_matches_full_scan(served(store, "u", entries), entries)
+        store.record_update("u", moved, old)
+        entries[entry_id] = old
+        assert_matches_full_scan(served(store, "u", entries), entries)
+
+    # Delete from the newest end, the oldest end and the middle
+    for entry_id in (len(sentiments), 1, len(sentiments) // 2):
+        store.record_delete("u", entries.pop(entry_id))
+        aggregate = served(store, "u", entries)
+        assert_matches_full_scan(aggregate, entries)
+        assert aggregate.to_insights()["sentiment_std"] >= 0.0
+
+
+def test_stats_endpoint_matches_full_scan_after_writes(client, fake_db, user_id):
+    headers = auth_headers(user_id)
+    texts = ["a wonderful happy day", "terrible awful morning", "an ordinary day", "great lunch with friends",
+             "sad and tired", "nothing much happened", "best weekend ever", "horrible commute"]
+    ids = [client.post("/journal", json={"content": text}, headers=headers).json()["id"] for text in texts]
+    # The first read builds the aggregate; later writes update it in place
+    assert client.get("/stats", headers=headers).status_code == 200
+
+    def check():
+        newest = newest_first(fake_db.rows_by_user[user_id])
+        stats = UserStatsResponse(**baseline_stats(newest)).model_dump(mode="json")
+        insights = SentimentInsightsResponse(**sentiment_analyzer.get_sentiment_insights(newest)).model_dump(mode="json")
+        assert_same(client.get("/stats", headers=headers).json(), stats)
+        assert_same(client.get("/insights", headers=headers).json(), insights)
+
+    client.post("/journal", json={"content": "a lovely calm evening"}, headers=headers)
+    check()
+    client.put(f"/journal/{ids[0]}", json={"content": "a miserable day after all"}, headers=headers)
+    check()
+    client.delete(f"/journal/{ids[1]}", headers=headers)
+    check()
+    for entry_id in ids[2:]:
+        client.delete(f"/journal/{entry_id}", headers=headers)
+    check()